@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from common import ensure_dir, fsync_dir, now_utc_iso
+from layout import doc_ids, log_ids, read_segment_member, work_ids
+from router import acquire_router_lock, bridge_dirs, load_index, save_index
+from search_index import SEARCH_DB_NAME, SearchIndex
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".gz"
+INDEX_SUFFIX = ".idx.jsonl"
+
+
+def repo_root_from_here() -> Path:
+    return Path(__file__).resolve().parents[2]
+
+
+def segment_max_bytes() -> int:
+    try:
+        mb = int(os.environ.get("BRIDGE_ARCHIVE_SEGMENT_MB", "64"))
+    except ValueError:
+        mb = 64
+    return max(1, mb) * 1024 * 1024
+
+
+def segment_paths(archive_dir: Path, seq: int) -> Tuple[Path, Path]:
+    stem = f"{SEGMENT_PREFIX}{seq:06d}"
+    return archive_dir / f"{stem}{SEGMENT_SUFFIX}", archive_dir / f"{stem}{INDEX_SUFFIX}"
+
+
+def list_segments(archive_dir: Path) -> List[int]:
+    seqs: List[int] = []
+    for p in archive_dir.glob(f"{SEGMENT_PREFIX}*{INDEX_SUFFIX}"):
+        raw = p.name[len(SEGMENT_PREFIX) : -len(INDEX_SUFFIX)]
+        if raw.isdigit():
+            seqs.append(int(raw))
+    return sorted(seqs)
+
+
+class SegmentWriter:
+    """Appends one gzip member per archived file; the sidecar index records each member's byte range."""
+
+    def __init__(self, archive_dir: Path) -> None:
+        ensure_dir(archive_dir)
+        self.archive_dir = archive_dir
+        self.max_bytes = segment_max_bytes()
+        seqs = list_segments(archive_dir)
+        self.seq = seqs[-1] if seqs else 1
+        self._open()
+
+    def _open(self) -> None:
+        self.seg_path, self.idx_path = segment_paths(self.archive_dir, self.seq)
+        self.seg = self.seg_path.open("ab")
+        self.idx = self.idx_path.open("a", encoding="utf-8")
+
+    def _rotate_if_full(self) -> None:
+        if self.seg.tell() < self.max_bytes:
+            return
+        self.close()
+        self.seq += 1
+        self._open()
+
+    def append(self, data: bytes, entry: Dict[str, Any]) -> Dict[str, Any]:
+        self._rotate_if_full()
+        member = gzip.compress(data, compresslevel=6, mtime=0)
+        offset = self.seg.tell()
+        self.seg.write(member)
+        record = {
+            **entry,
+            "segment": self.seg_path.name,
+            "offset": offset,
+            "length": len(member),
+            "size": len(data),
+            "archived_at": now_utc_iso(),
+        }
+        self.idx.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    def sync(self) -> None:
+        for fh in (self.seg, self.idx):
+            fh.flush()
+            os.fsync(fh.fileno())
+        fsync_dir(self.archive_dir)
+
+    def close(self) -> None:
+        self.sync()
+        self.seg.close()
+        self.idx.close()
+
+
+def iter_candidates(
+    base: Path, kind: str, cutoff: float, works: Dict[str, Tuple[str, str]]
+) -> Iterator[Tuple[Path, Dict[str, Any]]]:
+    for dirpath, _, filenames in os.walk(base):
+        for name in filenames:
+            if name.startswith("."):
+                continue
+            path = Path(dirpath) / name
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            # Ids come from the doc frontmatter or the log's work file; names alone split ids containing `_`.
+            parsed = log_ids(name, works) if kind == "log" else doc_ids(path)
+            if parsed is None:
+                continue
+            _, thread_id, task_id = parsed
+            yield path, {"name": name, "kind": kind, "thread_id": thread_id, "task_id": task_id}
+
+
+def prune_empty_dirs(base: Path) -> None:
+    for dirpath, _, _ in sorted(os.walk(base), key=lambda row: len(row[0]), reverse=True):
+        p = Path(dirpath)
+        if p == base:
+            continue
+        try:
+            p.rmdir()
+        except OSError:
+            pass
+
+
+def locator(archive_dir: Path, rec: Dict[str, Any]) -> str:
+    # Parsed back by layout.LOCATOR_RE.
+    return f"{archive_dir / str(rec['segment'])}@{rec['offset']}+{rec['length']}"
+
+
+def relocate_outputs(bridge_base: Path, moved: Dict[str, str]) -> Tuple[int, int]:
+    """Point processed_index outputs and search rows of packed docs at their segment locators."""
+    state_dir = bridge_base / "state"
+    idx = load_index(state_dir)
+    outputs = 0
+    for rec in idx.get("processed", {}).values():
+        if isinstance(rec, dict) and rec.get("output") in moved:
+            rec["output"] = moved[rec["output"]]
+            outputs += 1
+    if outputs:
+        save_index(state_dir, idx)
+    rows = 0
+    if (state_dir / SEARCH_DB_NAME).is_file():
+        index = SearchIndex(state_dir)
+        try:
+            for old, new in moved.items():
+                rows += index.conn.execute("UPDATE docs SET path = ? WHERE path = ?", (new, old)).rowcount
+            index.conn.commit()
+        finally:
+            index.close()
+    return outputs, rows
+
+
+def pack(bridge_base: Path, older_than_days: float, dry_run: bool = False, batch: int = 500) -> Dict[str, int]:
+    """Callers hold router.lock: the router must not write the index, nor another pack the segments."""
+    cutoff = time.time() - older_than_days * 86400
+    counts = {"result": 0, "error": 0, "log": 0, "bytes": 0, "outputs": 0, "search_rows": 0}
+    archive_dir = bridge_base / "archive"
+    writer = None if dry_run else SegmentWriter(archive_dir)
+    pending: List[Path] = []
+    moved: Dict[str, str] = {}
+    works = work_ids(bridge_base / "state")
+
+    def commit() -> None:
+        # Originals are removed only after the segment and its index are durable.
+        if writer is None or not pending:
+            return
+        writer.sync()
+        for p in pending:
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+        pending.clear()
+
+    try:
+        for sub, kind in (("done", "result"), ("error", "error"), ("logs", "log")):
+            base = bridge_base / sub
+            if not base.is_dir():
+                continue
+            for path, entry in iter_candidates(base, kind, cutoff, works):
+                data = path.read_bytes()
+                counts[kind] += 1
+                counts["bytes"] += len(data)
+                if writer is None:
+                    print(f"[dry-run] {path}")
+                    continue
+                entry["source"] = str(path.relative_to(bridge_base))
+                rec = writer.append(data, entry)
+                pending.append(path)
+                if kind != "log":
+                    moved[str(path)] = locator(archive_dir, rec)
+                if len(pending) >= batch:
+                    commit()
+            commit()
+            if writer is not None:
+                prune_empty_dirs(base)
+    finally:
+        if writer is not None:
+            commit()
+            writer.close()
+            if moved:
+                counts["outputs"], counts["search_rows"] = relocate_outputs(bridge_base, moved)
+    return counts
+
+
+def iter_index(archive_dir: Path) -> Iterator[Dict[str, Any]]:
+    for seq in reversed(list_segments(archive_dir)):
+        _, idx_path = segment_paths(archive_dir, seq)
+        with idx_path.open("r", encoding="utf-8", errors="replace") as fh:
+            rows = [line for line in fh if line.strip()]
+        for line in reversed(rows):
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def lookup(archive_dir: Path, thread_id: str, task_id: str, kind: str | None = None) -> List[Dict[str, Any]]:
+    found: List[Dict[str, Any]] = []
+    for rec in iter_index(archive_dir):
+        if str(rec.get("thread_id")) != thread_id or str(rec.get("task_id")) != task_id:
+            continue
+        if kind and rec.get("kind") != kind:
+            continue
+        found.append(rec)
+    return found
+
+
+def read_member(archive_dir: Path, rec: Dict[str, Any]) -> bytes:
+    data = read_segment_member(archive_dir / str(rec["segment"]), int(rec["offset"]), int(rec["length"]))
+    if str(rec.get("name", "")).endswith(".gz"):
+        # Attempt logs written with BRIDGE_LOG_COMPRESS=1 are archived as-is.
+        data = gzip.decompress(data)
+    return data
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compact old bridge results/logs into compressed archive segments.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("pack")
+    p.add_argument("--older-than-days", type=float, default=14)
+    p.add_argument("--dry-run", action="store_true")
+
+    g = sub.add_parser("get")
+    g.add_argument("--thread-id", required=True)
+    g.add_argument("--task-id", required=True)
+    g.add_argument("--kind", choices=("result", "error", "log"), default=None)
+    g.add_argument("--name", default="", help="특정 파일명만 출력")
+    g.add_argument("--list", action="store_true", help="본문 대신 매칭 목록만 출력")
+
+    args = parser.parse_args()
+    bridge_base = repo_root_from_here() / "bridge"
+    archive_dir = bridge_base / "archive"
+
+    if args.cmd == "pack":
+        lock = None
+        if not args.dry_run:
+            dirs = bridge_dirs(repo_root_from_here())
+            ensure_dir(dirs["locks"])
+            lock = acquire_router_lock(dirs)
+            if lock is None:
+                print("[archive] router.lock is held (router or another pack running); retry between ticks")
+                return 1
+        try:
+            counts = pack(bridge_base, max(0.0, args.older_than_days), dry_run=args.dry_run)
+        finally:
+            if lock is not None:
+                lock.close()
+        print(
+            f"[archive] results={counts['result']} errors={counts['error']} "
+            f"logs={counts['log']} bytes={counts['bytes']} "
+            f"index_outputs={counts['outputs']} search_rows={counts['search_rows']}"
+        )
+        return 0
+
+    matches = lookup(archive_dir, args.thread_id, args.task_id, args.kind)
+    if args.name:
+        matches = [m for m in matches if m.get("name") == args.name]
+    if not matches:
+        print("[archive] not found", file=sys.stderr)
+        return 1
+    if args.list:
+        for m in matches:
+            print(f"{m['kind']}\t{m['name']}\t{m['segment']}@{m['offset']}+{m['length']}")
+        return 0
+    if not args.kind and not args.name:
+        docs = [m for m in matches if m.get("kind") in {"result", "error"}]
+        matches = sorted(docs, key=lambda m: m.get("kind") != "result")[:1] or matches[:1]
+    for m in matches:
+        print(f"==> {m['name']} ({m['segment']})")
+        print(read_member(archive_dir, m).decode("utf-8", errors="replace"))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
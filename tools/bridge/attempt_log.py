@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import gzip
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import IO, Callable, Dict, List, Set, Tuple
+
+from common import OutputLog, ensure_dir
+
+ELIDED_MARKER = "\n\n... [bridge: {n} bytes elided] ...\n\n"
+
+
+def log_max_bytes() -> int:
+    try:
+        return max(0, int(os.environ.get("BRIDGE_LOG_MAX_BYTES", str(2 * 1024 * 1024))))
+    except ValueError:
+        return 2 * 1024 * 1024
+
+
+def log_compress() -> bool:
+    return os.environ.get("BRIDGE_LOG_COMPRESS", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def log_retention_days() -> float:
+    try:
+        return max(0.0, float(os.environ.get("BRIDGE_LOG_RETENTION_DAYS", "0")))
+    except ValueError:
+        return 0.0
+
+
+class AttemptLogWriter:
+    """Streams one attempt log to disk, keeping at most the first and last max_bytes/2 bytes."""
+
+    def __init__(self, path: Path, max_bytes: int | None = None, compress: bool | None = None) -> None:
+        self.compress = log_compress() if compress is None else compress
+        self.path = path.with_name(path.name + ".gz") if self.compress else path
+        limit = log_max_bytes() if max_bytes is None else max_bytes
+        self.head_limit = limit - limit // 2 if limit else 0
+        self.tail_limit = limit // 2 if limit else 0
+        self.written = 0
+        self.total = 0
+        self._tail = bytearray()
+        ensure_dir(self.path.parent)
+        self._tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self._fh: IO[bytes] = gzip.open(self._tmp, "wb", compresslevel=6) if self.compress else self._tmp.open("wb")
+
+    def write(self, data: str | bytes) -> None:
+        chunk = data.encode("utf-8", errors="replace") if isinstance(data, str) else data
+        if not chunk:
+            return
+        self.total += len(chunk)
+        if not self.head_limit:
+            self._fh.write(chunk)
+            self.written += len(chunk)
+            return
+        room = self.head_limit - self.written
+        if room > 0:
+            self._fh.write(chunk[:room])
+            self.written += min(room, len(chunk))
+            chunk = chunk[room:]
+        if chunk:
+            self._tail += chunk
+            # Trim only once the window doubles: streamed line by line, a per-write trim would memmove it each time.
+            if len(self._tail) > 2 * self.tail_limit:
+                del self._tail[: len(self._tail) - self.tail_limit]
+
+    @property
+    def elided(self) -> int:
+        return max(0, self.total - self.written - min(len(self._tail), self.tail_limit))
+
+    def close(self) -> Path:
+        if len(self._tail) > self.tail_limit:
+            del self._tail[: len(self._tail) - self.tail_limit]
+        if self.elided:
+            self._fh.write(ELIDED_MARKER.format(n=self.elided).encode("utf-8"))
+        if self._tail:
+            self._fh.write(bytes(self._tail))
+        self._fh.close()
+        os.replace(self._tmp, self.path)
+        return self.path
+
+
+def write_attempt_log(path: Path, text: str) -> Path:
+    writer = AttemptLogWriter(path)
+    writer.write(text)
+    return writer.close()
+
+
+class _MemorySink:
+    """AttemptLogWriter stand-in when the caller asked for no log files: the stream is kept as text."""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self._parts: List[bytes] = []
+
+    def write(self, data: str | bytes) -> None:
+        chunk = data.encode("utf-8", errors="replace") if isinstance(data, str) else data
+        self.total += len(chunk)
+        self._parts.append(chunk)
+
+    def close(self) -> str:
+        return b"".join(self._parts).decode("utf-8", errors="replace")
+
+
+class LoggedRun:
+    """A finished (or killed) worker process whose output went to its attempt logs while it printed."""
+
+    def __init__(
+        self,
+        out: AttemptLogWriter | _MemorySink,
+        err: AttemptLogWriter | _MemorySink,
+        returncode: int | None,
+        timed_out: bool,
+        kept: List[bytes],
+        seen: Set[str],
+    ) -> None:
+        self._out = out
+        self._err = err
+        self.returncode = returncode
+        self.timed_out = timed_out
+        self.seen = seen
+        self._kept = kept
+
+    @property
+    def stdout(self) -> str:
+        return b"".join(self._kept).decode("utf-8", errors="replace")
+
+    def close(self, stderr_note: str = "") -> Tuple[str | OutputLog, str | OutputLog]:
+        """(stdout, stderr) as OutputLog handles, or text when run without logs; the note ends stderr."""
+        if stderr_note:
+            self._err.write(("\n" if self._err.total else "") + stderr_note)
+        return _finish(self._out), _finish(self._err)
+
+
+def _finish(sink: AttemptLogWriter | _MemorySink) -> str | OutputLog:
+    if isinstance(sink, _MemorySink):
+        return sink.close()
+    return OutputLog(sink.close(), sink.total)
+
+
+def run_logged(
+    cmd: List[str],
+    *,
+    cwd: Path,
+    timeout_s: float,
+    stdin_text: str = "",
+    env: Dict[str, str] | None = None,
+    logs: Tuple[Path, Path] | None = None,
+    keep_stdout: bool = True,
+    on_stdout_line: Callable[[str], None] | None = None,
+    watch: Tuple[str, ...] = (),
+) -> LoggedRun:
+    """Runs a worker CLI and streams stdout/stderr into the (stdout, stderr) attempt logs as it prints.
+
+    Memory is the log writers' head/tail window plus what the caller keeps: all of stdout with keep_stdout,
+    or whatever on_stdout_line holds on to. Lower-cased `watch` substrings are matched per stderr line and
+    reported in `seen`, so stderr never has to be read back whole.
+    """
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    out: AttemptLogWriter | _MemorySink = AttemptLogWriter(logs[0]) if logs else _MemorySink()
+    err: AttemptLogWriter | _MemorySink = AttemptLogWriter(logs[1]) if logs else _MemorySink()
+    kept: List[bytes] = []
+    seen: Set[str] = set()
+
+    def pump_stdout() -> None:
+        try:
+            if on_stdout_line is None:
+                for chunk in iter(lambda: proc.stdout.read1(65536), b""):
+                    out.write(chunk)
+                    if keep_stdout:
+                        kept.append(chunk)
+                return
+            for line in proc.stdout:
+                out.write(line)
+                if keep_stdout:
+                    kept.append(line)
+                on_stdout_line(line.decode("utf-8", errors="replace"))
+        except (OSError, ValueError):
+            pass
+
+    def pump_stderr() -> None:
+        try:
+            for line in proc.stderr:
+                err.write(line)
+                if watch:
+                    low = line.decode("utf-8", errors="replace").lower()
+                    seen.update(w for w in watch if w in low)
+        except (OSError, ValueError):
+            pass
+
+    def feed_stdin() -> None:
+        try:
+            if stdin_text:
+                proc.stdin.write(stdin_text.encode("utf-8"))
+        except (OSError, ValueError):
+            # The CLI exited or closed stdin early; its exit code tells the rest.
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    threads = [threading.Thread(target=fn, daemon=True) for fn in (pump_stdout, pump_stderr, feed_stdin)]
+    for t in threads:
+        t.start()
+    timed_out = False
+    try:
+        proc.wait(timeout=timeout_s)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        timed_out = True
+    for t in threads:
+        t.join(timeout=5)
+    # A grandchild that inherited the pipes can keep them open after the CLI exits; stop reading there.
+    for fh in (proc.stdout, proc.stderr):
+        try:
+            fh.close()
+        except OSError:
+            pass
+    for t in threads:
+        t.join(timeout=1)
+    return LoggedRun(out, err, proc.returncode if not timed_out else None, timed_out, kept, seen)
+
+
+def resolve_attempt_log(path: Path) -> Path | None:
+    if path.exists():
+        return path
+    gz = path.with_name(path.name + ".gz")
+    if gz.exists():
+        return gz
+    return None
+
+
+def read_attempt_log(path: Path) -> str:
+    found = resolve_attempt_log(path)
+    if found is None:
+        return ""
+    if found.suffix == ".gz":
+        with gzip.open(found, "rb") as fh:
+            return fh.read().decode("utf-8", errors="replace")
+    return found.read_text(encoding="utf-8", errors="replace")
+
+
+def prune_attempt_logs(logs_dir: Path, retention_days: float | None = None) -> int:
+    days = log_retention_days() if retention_days is None else retention_days
+    if days <= 0 or not logs_dir.is_dir():
+        return 0
+    cutoff = time.time() - days * 86400
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(logs_dir, topdown=False):
+        for name in filenames:
+            if ".attempt" not in name:
+                continue
+            p = Path(dirpath) / name
+            try:
+                if p.stat().st_mtime < cutoff:
+                    p.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        if Path(dirpath) != logs_dir and not os.listdir(dirpath):
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+    return removed
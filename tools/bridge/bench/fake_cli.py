@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""Deterministic stand-in for the codex and gemini CLIs used by the bridge benchmarks.
+
+Invoked as `fake_cli.py codex exec --json ... <prompt>` or `fake_cli.py gemini -p <prompt> ...`. A codex prompt of `-`
+is read from stdin and `@PATH` from a file; gemini prepends piped stdin to `-p` like the real CLI.
+Behaviour is driven by environment variables so the router runs unchanged:
+
+  BENCH_SEED            base seed (default 1)
+  BENCH_LATENCY         fixed:MS | uniform:LO,HI | exp:MEAN | lognormal:MEDIAN,SIGMA (default fixed:50)
+  BENCH_FAIL_RATE       probability an attempt fails (default 0)
+  BENCH_FAIL_MODE       non_zero | stream | empty (default non_zero)
+  BENCH_OUTPUT_BYTES    approximate size of the final answer (default 512)
+  BENCH_JSONL_EVENTS    filler events in the codex JSONL stream (default 4)
+  BENCH_STATE_DIR       directory for per-prompt attempt counters (default: no counters)
+
+A `[bench] latency_ms=N fail=0|1 fail_attempts=K` line inside the prompt overrides the sampled values for that
+task (fail_attempts fails attempts 1..K and needs BENCH_STATE_DIR). For gemini, `followup_latency_ms` and
+`followup_fail_attempts` are echoed into the answer so the router's codex follow-up picks them up.
+A coalesced codex prompt (`[SUBTASK <id>]` blocks) gets one `=== SUBTASK <id> ===` section per block, except
+blocks containing `[bench] skip_section=1`; a `fail=1` in any block fails the whole combined run.
+With `pad_bytes=N pad_sha=HEX` the prompt must carry the `[bench-pad]` block intact, or the call fails with
+`prompt_truncated`. Each call appends how the prompt arrived (argv, stdin or file) to BENCH_STATE_DIR/prompt_via.log.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+OVERRIDE_RE = re.compile(r"\[bench\]([^\n]*)")
+SUBTASK_RE = re.compile(r"^\[SUBTASK (\S+)\]$", re.M)
+PAD_RE = re.compile(r"^\[bench-pad\]\n(.*?)\n\[/bench-pad\]$", re.M | re.S)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _attempt_no(state_dir: str, digest: str) -> int:
+    if not state_dir:
+        return 1
+    path = Path(state_dir) / f"{digest}.count"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # O_APPEND writes are atomic for one byte, so concurrent retries of the same prompt still count correctly.
+    fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, b".")
+    finally:
+        os.close(fd)
+    return path.stat().st_size
+
+
+def sample_latency_ms(spec: str, rng: random.Random) -> float:
+    kind, _, raw = spec.partition(":")
+    params = [float(x) for x in raw.split(",") if x.strip()] if raw else []
+    if kind == "uniform" and len(params) == 2:
+        return rng.uniform(params[0], params[1])
+    if kind == "exp" and params:
+        return rng.expovariate(1.0 / max(params[0], 1e-6))
+    if kind == "lognormal" and len(params) == 2:
+        return rng.lognormvariate(math.log(max(params[0], 1e-6)), params[1])
+    if kind == "fixed" and params:
+        return params[0]
+    return 50.0
+
+
+def extract_prompt(role: str, argv: list[str]) -> tuple[str, str]:
+    """(prompt, how it arrived: argv | stdin | file)."""
+    via = "argv"
+    if role == "gemini":
+        for i, arg in enumerate(argv):
+            if arg == "-p" and i + 1 < len(argv):
+                prompt = argv[i + 1]
+                # Like the real CLI, piped stdin comes first and -p is appended to it.
+                if not sys.stdin.isatty():
+                    piped = sys.stdin.read()
+                    if piped:
+                        prompt = f"{piped}\n\n{prompt}"
+                        via = "stdin"
+                break
+        else:
+            prompt = argv[-1] if argv else ""
+    else:
+        prompt = argv[-1] if argv else ""
+    if prompt == "-":
+        prompt = sys.stdin.read()
+        via = "stdin"
+    elif prompt.startswith("@") and os.path.isfile(prompt[1:]):
+        # `fake_cli.py codex @{prompt_file}` reads the router's temp prompt file.
+        with open(prompt[1:], encoding="utf-8") as fh:
+            prompt = fh.read()
+        via = "file"
+    return prompt, via
+
+
+def _record_via(state_dir: str, via: str) -> None:
+    if not state_dir:
+        return
+    Path(state_dir).mkdir(parents=True, exist_ok=True)
+    fd = os.open(str(Path(state_dir) / "prompt_via.log"), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, f"{via}\n".encode("ascii"))
+    finally:
+        os.close(fd)
+
+
+def pad_error(prompt: str, overrides: dict[str, str]) -> str | None:
+    """Why the `[bench-pad]` block run_bench --prompt-bytes put in the body did not arrive intact, if it didn't."""
+    if "pad_sha" not in overrides:
+        return None
+    m = PAD_RE.search(prompt)
+    if not m:
+        return "bench: prompt_truncated pad block missing"
+    data = m.group(1).encode("utf-8")
+    if str(len(data)) != overrides.get("pad_bytes") or hashlib.sha256(data).hexdigest()[:16] != overrides["pad_sha"]:
+        return f"bench: prompt_truncated pad_bytes={len(data)} expected={overrides.get('pad_bytes')}"
+    return None
+
+
+def parse_overrides(prompt: str) -> dict[str, str]:
+    found: dict[str, str] = {}
+    for m in OVERRIDE_RE.finditer(prompt):
+        for part in m.group(1).split():
+            k, sep, v = part.partition("=")
+            if sep:
+                found[k] = v
+    return found
+
+
+def filler(n: int, rng: random.Random) -> str:
+    words = ["router", "bridge", "worker", "queue", "retry", "latency", "codex", "gemini", "result", "index"]
+    out: list[str] = []
+    size = 0
+    while size < n:
+        w = words[rng.randrange(len(words))]
+        out.append(w)
+        size += len(w) + 1
+    return " ".join(out)[:n]
+
+
+def codex_output(answer: str, events: int, rng: random.Random, prompt_len: int) -> str:
+    lines = [json.dumps({"type": "thread.started", "thread_id": f"bench-{rng.randrange(1 << 30)}"}), json.dumps({"type": "turn.started"})]
+    for i in range(events):
+        lines.append(json.dumps({"type": "item.completed", "item": {"id": f"item_{i}", "type": "reasoning", "text": filler(160, rng)}}))
+    lines.append(json.dumps({"type": "item.completed", "item": {"id": "item_final", "type": "agent_message", "text": answer}}, ensure_ascii=False))
+    usage = {"input_tokens": prompt_len // 4, "cached_input_tokens": prompt_len // 16, "output_tokens": max(1, len(answer) // 4)}
+    lines.append(json.dumps({"type": "turn.completed", "usage": usage}))
+    return "\n".join(lines) + "\n"
+
+
+def gemini_answer(body: str, overrides: dict[str, str]) -> str:
+    carry = " ".join(f"{k[len('followup_'):]}={v}" for k, v in overrides.items() if k.startswith("followup_"))
+    if carry:
+        body += f"\n[bench] {carry}"
+    return (
+        "# TASK\n벤치마크 작업을 수행한다.\n\n"
+        "# CONTEXT\n- 합성 부하 테스트\n\n"
+        "# REQUIREMENTS\n- 결과를 요약한다\n\n"
+        "# OUTPUT\n- RESULT, TEST, NEXT\n\n"
+        f"# NOTES\n```\n{body}\n```\n"
+    )
+
+
+def batch_answer(prompt: str, body: str) -> str:
+    blocks = list(SUBTASK_RE.finditer(prompt))
+    sections = []
+    for i, m in enumerate(blocks):
+        end = blocks[i + 1].start() if i + 1 < len(blocks) else len(prompt)
+        if "skip_section=1" in prompt[m.end() : end]:
+            continue
+        sections.append(f"=== SUBTASK {m.group(1)} ===\n# RESULT\n{body}\n\n# TEST\n- bench\n\n# NEXT\n- none")
+    return "\n\n".join(sections)
+
+
+def main() -> int:
+    if len(sys.argv) < 2 or sys.argv[1] not in {"codex", "gemini"}:
+        print("usage: fake_cli.py codex|gemini ...", file=sys.stderr)
+        return 2
+    role = sys.argv[1]
+    argv = sys.argv[2:]
+    prompt, via = extract_prompt(role, argv)
+    _record_via(os.environ.get("BENCH_STATE_DIR", ""), via)
+
+    digest = hashlib.sha256(f"{role}\0{prompt}".encode("utf-8")).hexdigest()[:24]
+    attempt = _attempt_no(os.environ.get("BENCH_STATE_DIR", ""), digest)
+    seed = f"{os.environ.get('BENCH_SEED', '1')}:{digest}:{attempt}"
+    rng = random.Random(hashlib.sha256(seed.encode("utf-8")).digest())
+
+    overrides = parse_overrides(prompt)
+    broken = pad_error(prompt, overrides)
+    if broken:
+        print(broken, file=sys.stderr)
+        return 1
+    if "latency_ms" in overrides:
+        latency_ms = float(overrides["latency_ms"])
+    else:
+        latency_ms = sample_latency_ms(os.environ.get("BENCH_LATENCY", "fixed:50"), rng)
+    if "fail_attempts" in overrides:
+        fail = attempt <= int(overrides["fail_attempts"])
+    elif "fail" in overrides:
+        fail = overrides["fail"] == "1"
+    else:
+        fail = rng.random() < _env_float("BENCH_FAIL_RATE", 0.0)
+
+    time.sleep(max(0.0, latency_ms) / 1000.0)
+
+    mode = os.environ.get("BENCH_FAIL_MODE", "non_zero")
+    if fail and mode == "non_zero":
+        print(f"bench: injected failure attempt={attempt}", file=sys.stderr)
+        return 1
+
+    size = int(_env_float("BENCH_OUTPUT_BYTES", 512))
+    body = filler(size, rng)
+    if role == "gemini":
+        text = "" if fail and mode == "empty" else gemini_answer(body, overrides)
+        fmt = argv[argv.index("--output-format") + 1] if "--output-format" in argv[:-1] else "text"
+        if fmt == "json":
+            tokens = {"prompt": len(prompt) // 4, "candidates": max(1, len(text) // 4), "cached": 0, "thoughts": 16}
+            text = json.dumps({"response": text, "stats": {"models": {"fake-gemini": {"api": {"totalRequests": 1}, "tokens": tokens}}}}, ensure_ascii=False)
+        sys.stdout.write(text)
+        return 0
+
+    if fail and mode == "empty":
+        answer = ""
+    elif SUBTASK_RE.search(prompt):
+        answer = batch_answer(prompt, body)
+    else:
+        answer = f"# RESULT\n{body}\n\n# TEST\n- bench\n\n# NEXT\n- none"
+    out = codex_output(answer, int(_env_float("BENCH_JSONL_EVENTS", 4)), rng, len(prompt))
+    if fail and mode == "stream":
+        out += json.dumps({"type": "error", "message": "stream disconnected before completion"}) + "\n"
+    sys.stdout.write(out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
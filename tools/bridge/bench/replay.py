@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+from run_bench import BRIDGE_TOOLS, ROUTER, _epoch, bench_env, prepare_root, summarize
+
+from common import load_json, now_utc_iso, now_utc_stamp, read_frontmatter, render_markdown, save_json, write_text
+from layout import iter_docs
+
+NO_SERVICE_CODES = {"invalid_workfile", "duplicate_task", "parse_error"}
+
+
+@dataclass
+class Job:
+    key: str
+    thread_id: str
+    task_id: str
+    target: str
+    assign: str
+    arrival: float
+    service_ms: float
+    attempts: int
+    failed: bool
+    queue_wait_ms: float | None = None
+    followup: "Job | None" = None
+
+
+def _doc_meta(path: object) -> Dict[str, Any]:
+    try:
+        return read_frontmatter(Path(str(path)))
+    except (OSError, ValueError, TypeError):
+        return {}
+
+
+def job_from_record(key: str, rec: Dict[str, Any]) -> Job | None:
+    parts = key.split("::")
+    if len(parts) != 3:
+        return None
+    thread_id, task_id, target = parts
+    if rec.get("error_code") in NO_SERVICE_CODES:
+        return None
+    attempts = int(rec.get("attempts") or 0)
+    exec_ms = rec.get("exec_ms")
+    if exec_ms is None:
+        # Records written before timing fields existed: fall back to the result doc.
+        doc = _doc_meta(rec.get("output"))
+        exec_ms = doc.get("elapsed_ms")
+        attempts = attempts or int(doc.get("retries") or doc.get("retry_count") or 1)
+    if exec_ms is None:
+        return None
+    attempts = max(1, attempts)
+    end = _epoch(rec.get("at"))
+    arrival = _epoch(rec.get("created_at"))
+    picked = _epoch(rec.get("picked_at"))
+    if arrival is None and end is not None:
+        arrival = end - float(exec_ms) / 1000.0
+    if arrival is None:
+        return None
+    return Job(
+        key=key,
+        thread_id=thread_id,
+        task_id=task_id,
+        target=target,
+        assign=str(rec.get("assign") or ""),
+        arrival=arrival,
+        service_ms=float(exec_ms) / attempts,
+        attempts=attempts,
+        failed=rec.get("status") != "done",
+        queue_wait_ms=(picked - arrival) * 1000.0 if picked is not None else None,
+    )
+
+
+def jobs_from_docs(bridge_dir: Path, known: set[str]) -> List[Job]:
+    jobs: List[Job] = []
+    for sub, glob, failed in (("done", "*.result.md", False), ("error", "*.error.md", True)):
+        for path in iter_docs(bridge_dir / sub, glob):
+            meta = _doc_meta(path)
+            key = f"{meta.get('thread_id')}::{meta.get('task_id')}::{meta.get('from')}"
+            end = _epoch(meta.get("created_at"))
+            if key in known or end is None or meta.get("error_code") in NO_SERVICE_CODES:
+                continue
+            known.add(key)
+            attempts = max(1, int(meta.get("retries") or meta.get("retry_count") or 1))
+            elapsed = float(meta.get("elapsed_ms") or 0)
+            jobs.append(
+                Job(
+                    key=key,
+                    thread_id=str(meta.get("thread_id")),
+                    task_id=str(meta.get("task_id")),
+                    target=str(meta.get("from")),
+                    assign=str(meta.get("assign") or ""),
+                    arrival=end - elapsed / 1000.0,
+                    service_ms=elapsed / attempts,
+                    attempts=attempts,
+                    failed=failed,
+                )
+            )
+    return jobs
+
+
+def load_workload(source: Path, since: float | None, until: float | None, thread_id: str | None) -> List[Job]:
+    bridge_dir = source / "bridge"
+    idx = load_json(bridge_dir / "state" / "processed_index.json", {"processed": {}})
+    jobs: Dict[str, Job] = {}
+    for key, rec in idx.get("processed", {}).items():
+        if isinstance(rec, dict):
+            job = job_from_record(key, rec)
+            if job is not None:
+                jobs[key] = job
+    for job in jobs_from_docs(bridge_dir, set(jobs)):
+        jobs[job.key] = job
+
+    # A successful gemini task spawns its codex follow-up inside the router, so replay carries the
+    # follow-up's service time on the gemini job instead of dropping a second, independent arrival.
+    for job in list(jobs.values()):
+        if job.target == "gemini" and not job.failed:
+            follow = jobs.pop(f"{job.thread_id}::{job.task_id}::codex", None)
+            job.followup = follow
+
+    selected = [
+        j
+        for j in jobs.values()
+        if (since is None or j.arrival >= since)
+        and (until is None or j.arrival < until)
+        and (thread_id is None or j.thread_id == thread_id)
+    ]
+    selected.sort(key=lambda j: j.arrival)
+    return selected
+
+
+def bench_line(job: Job, speed: float) -> str:
+    parts = [f"latency_ms={job.service_ms / speed:.1f}"]
+    parts.append("fail=1" if job.failed else f"fail_attempts={job.attempts - 1}")
+    if job.followup is not None:
+        parts.append(f"followup_latency_ms={job.followup.service_ms / speed:.1f}")
+        parts.append(f"followup_fail_attempts={job.followup.attempts if job.followup.failed else job.followup.attempts - 1}")
+    return "[bench] " + " ".join(parts)
+
+
+def render_job(job: Job, speed: float) -> str:
+    meta: Dict[str, Any] = {
+        "kind": "work",
+        "thread_id": job.thread_id,
+        "task_id": job.task_id,
+        "from": "human",
+        "to": job.target,
+        "assign": job.assign or ("@직원1" if job.target == "gemini" else "@직원2"),
+        "priority": "high",
+        "status": "new",
+        "timeout_s": max(30, int(job.service_ms / speed / 1000.0 * 4) + 5),
+        "max_retries": job.attempts,
+        "created_at": now_utc_iso(),
+    }
+    if job.target == "gemini":
+        meta["codex_assign"] = "@직원2"
+        if job.followup is not None:
+            meta["codex_max_retries"] = job.followup.attempts
+    body = f"# TASK\n리플레이 {job.key}\n\n# CONTEXT\n{bench_line(job, speed)}\n"
+    return render_markdown(meta, body)
+
+
+def wait_drained(root: Path, expected: int, deadline: float) -> int:
+    idx_path = root / "bridge" / "state" / "processed_index.json"
+    done = 0
+    while time.monotonic() < deadline:
+        done = len(load_json(idx_path, {"processed": {}}).get("processed", {}))
+        if done >= expected and not any((root / "bridge" / "inbox").glob("*.work.md")):
+            break
+        time.sleep(0.2)
+    return done
+
+
+def replay(jobs: List[Job], args: argparse.Namespace) -> Dict[str, Any]:
+    base = Path(tempfile.mkdtemp(prefix="bridge-replay-"))
+    try:
+        root = prepare_root(base)
+        env = bench_env(base, args)
+        daemon = subprocess.Popen(
+            [sys.executable, str(ROUTER), "--root", str(root), "daemon", "--interval", str(args.interval), "--workers", str(args.workers)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        inbox = root / "bridge" / "inbox"
+        t0 = jobs[0].arrival if jobs else 0.0
+        started = time.monotonic()
+        lag: List[float] = []
+        try:
+            for job in jobs:
+                due = started + (job.arrival - t0) / args.speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                lag.append(max(0.0, -delay) * 1000.0)
+                stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+                write_text(inbox / f"{stamp}_{job.thread_id}_{job.task_id}_to_{job.target}.work.md", render_job(job, args.speed))
+            expected = len(jobs) + sum(1 for j in jobs if j.followup is not None)
+            finished = wait_drained(root, expected, time.monotonic() + args.drain_timeout)
+        finally:
+            daemon.send_signal(signal.SIGINT)
+            try:
+                daemon.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                daemon.kill()
+        wall_s = time.monotonic() - started
+        report = measure(root, args.workers)
+        report.update({"expected": expected, "finished": finished, "wall_s": round(wall_s, 3), "drop_lag_ms": summarize(lag)})
+        return report
+    finally:
+        if args.keep:
+            print(f"[replay] kept={base}")
+        else:
+            shutil.rmtree(base, ignore_errors=True)
+
+
+def measure(root: Path, workers: int) -> Dict[str, Any]:
+    idx = load_json(root / "bridge" / "state" / "processed_index.json", {"processed": {}})
+    waits: List[float] = []
+    busy_s = 0.0
+    first: float | None = None
+    last: float | None = None
+    statuses: Dict[str, int] = {}
+    for rec in idx.get("processed", {}).values():
+        created, picked, end = _epoch(rec.get("created_at")), _epoch(rec.get("picked_at")), _epoch(rec.get("at"))
+        status = str(rec.get("status") or "unknown")
+        statuses[status] = statuses.get(status, 0) + 1
+        if created is None or picked is None or end is None:
+            continue
+        waits.append(max(0.0, picked - created) * 1000.0)
+        busy_s += max(0.0, end - picked)
+        first = created if first is None else min(first, created)
+        last = end if last is None else max(last, end)
+    span = (last - first) if first is not None and last is not None else 0.0
+    return {
+        "status": statuses,
+        "queue_wait_ms": summarize(waits),
+        "makespan_s": round(span, 3),
+        "utilization": round(busy_s / (workers * span), 4) if span > 0 else None,
+    }
+
+
+def source_profile(jobs: List[Job]) -> Dict[str, Any]:
+    gaps = [(b.arrival - a.arrival) * 1000.0 for a, b in zip(jobs, jobs[1:])]
+    targets: Dict[str, int] = {}
+    for job in jobs:
+        targets[job.target] = targets.get(job.target, 0) + 1
+    return {
+        "jobs": len(jobs),
+        "followups": sum(1 for j in jobs if j.followup is not None),
+        "targets": targets,
+        "span_s": round(jobs[-1].arrival - jobs[0].arrival, 3) if jobs else 0.0,
+        "interarrival_ms": summarize(gaps),
+        "service_ms": summarize([j.service_ms for j in jobs]),
+        "queue_wait_ms": summarize([j.queue_wait_ms for j in jobs if j.queue_wait_ms is not None]),
+    }
+
+
+def _iso_epoch(value: str) -> float | None:
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded bridge workload against fake workers")
+    parser.add_argument("--source", default=str(BRIDGE_TOOLS.parents[1]), help="bridge/ 를 포함한 원본 루트 (기본: 저장소 루트)")
+    parser.add_argument("--since", default="", help="ISO 시각 이후 도착한 작업만")
+    parser.add_argument("--until", default="", help="ISO 시각 이전 도착한 작업만")
+    parser.add_argument("--thread-id", default=None)
+    parser.add_argument("--limit", type=int, default=0, help="앞에서부터 N개만 (0=전체)")
+    parser.add_argument("--speed", default="10", help="재생 배속, 쉼표로 여러 개 (예: 1,10,100)")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("BRIDGE_WORKERS", "4")))
+    parser.add_argument("--interval", type=float, default=0.5, help="리플레이 대상 daemon --interval")
+    parser.add_argument("--drain-timeout", type=float, default=600, help="마지막 투입 후 처리 완료 대기 상한(초)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output-bytes", type=int, default=512)
+    parser.add_argument("--out", default="", help="결과 JSON 경로 (기본: $TMPDIR/bridge-bench/replay_<stamp>.json)")
+    parser.add_argument("--dry-run", action="store_true", help="원본 분포만 출력")
+    parser.add_argument("--keep", action="store_true", help="임시 루트를 지우지 않음")
+    parser.set_defaults(latency="fixed:0", fail_rate=0.0, fail_mode="non_zero", jsonl_events=4)
+    args = parser.parse_args()
+
+    jobs = load_workload(Path(args.source), _iso_epoch(args.since), _iso_epoch(args.until), args.thread_id)
+    if args.limit > 0:
+        jobs = jobs[: args.limit]
+    profile = source_profile(jobs)
+    print(
+        f"[replay] source jobs={profile['jobs']} followups={profile['followups']} span_s={profile['span_s']} "
+        f"service_p50={profile['service_ms']['p50']} service_p95={profile['service_ms']['p95']} "
+        f"queue_wait_p95={profile['queue_wait_ms']['p95']}"
+    )
+    if not jobs:
+        print("[replay] nothing to replay")
+        return 1
+    if args.dry_run:
+        return 0
+
+    runs: List[Dict[str, Any]] = []
+    for raw in args.speed.split(","):
+        if not raw.strip():
+            continue
+        args.speed = float(raw)
+        row = {"speed": args.speed, "workers": args.workers, **replay(jobs, args)}
+        runs.append(row)
+        print(
+            f"[replay] speed={args.speed:g}x finished={row['finished']}/{row['expected']} wall_s={row['wall_s']} "
+            f"queue_wait_p50={row['queue_wait_ms']['p50']} queue_wait_p95={row['queue_wait_ms']['p95']} "
+            f"queue_wait_p99={row['queue_wait_ms']['p99']} utilization={row['utilization']}"
+        )
+
+    created = now_utc_stamp()
+    out = Path(args.out) if args.out else Path(tempfile.gettempdir()) / "bridge-bench" / f"replay_{created}.json"
+    save_json(out, {"created": created, "source": str(args.source), "profile": profile, "runs": runs})
+    print(f"[replay] saved={out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
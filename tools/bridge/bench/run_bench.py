@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+BRIDGE_TOOLS = BENCH_DIR.parent
+sys.path.insert(0, str(BRIDGE_TOOLS))
+
+from common import load_json, now_utc_stamp, render_markdown, save_json  # noqa: E402
+from prompt_transport import prompt_argv_max  # noqa: E402
+
+ROUTER = BRIDGE_TOOLS / "router.py"
+FAKE_CLI = BENCH_DIR / "fake_cli.py"
+
+
+def percentile(values: List[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return round(ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo), 2)
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": round(max(values), 2) if values else None,
+    }
+
+
+def _epoch(iso: object) -> float | None:
+    try:
+        dt = datetime.fromisoformat(str(iso))
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def prepare_root(base: Path) -> Path:
+    root = base / "root"
+    for name in ("inbox", "inprogress", "done", "error", "locks", "logs", "state"):
+        (root / "bridge" / name).mkdir(parents=True, exist_ok=True)
+    save_json(root / "bridge" / "state" / "health.json", {"ok": True, "reason": "bench"})
+    bin_dir = base / "bin"
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for role in ("codex", "gemini"):
+        wrapper = bin_dir / role
+        wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_CLI}" {role} "$@"\n', encoding="utf-8")
+        wrapper.chmod(0o755)
+    return root
+
+
+def bench_env(base: Path, args: argparse.Namespace, transport: str = "default") -> Dict[str, str]:
+    env = os.environ.copy()
+    for name in ("BRIDGE_CODEX_CMD", "BRIDGE_GEMINI_CMD", "BRIDGE_ROOT", "BRIDGE_TRACE", "BRIDGE_METRICS_PORT"):
+        env.pop(name, None)
+    env.update(
+        {
+            "PATH": f"{base / 'bin'}{os.pathsep}{env.get('PATH', '')}",
+            "OPENAI_API_KEY": env.get("OPENAI_API_KEY") or "bench",
+            "BRIDGE_ENABLE_WORKTREE": "0",
+            "BRIDGE_CODEX_AUTH_SYNC": "0",
+            "BENCH_SEED": str(args.seed),
+            "BENCH_LATENCY": args.latency,
+            "BENCH_FAIL_RATE": str(args.fail_rate),
+            "BENCH_FAIL_MODE": args.fail_mode,
+            "BENCH_OUTPUT_BYTES": str(args.output_bytes),
+            "BENCH_JSONL_EVENTS": str(args.jsonl_events),
+            "BENCH_STATE_DIR": str(base / "fake_state"),
+        }
+    )
+    if transport == "file":
+        # The custom-command path: the router writes the prompt to a temp file and substitutes its path.
+        env["BRIDGE_CODEX_CMD"] = "codex exec @{prompt_file}"
+        env["BRIDGE_GEMINI_CMD"] = "gemini -p @{prompt_file}"
+    return env
+
+
+def prompt_pad(n: int) -> str:
+    """About n bytes of mixed ASCII/UTF-8 lines; fake_cli checks it arrives byte for byte."""
+    lines: List[str] = []
+    size = 0
+    i = 0
+    while size < n:
+        line = f"{i:08d} 라우터 bridge payload line"
+        lines.append(line)
+        size += len(line.encode("utf-8")) + 1
+        i += 1
+    return "\n".join(lines)
+
+
+def generate_work(inbox: Path, args: argparse.Namespace, stage: int | None = None, depends: bool = True) -> int:
+    """Tasks form chains of --stages steps; each step depends_on the previous one of its chain.
+
+    stage limits the output to one step of every chain (manual staging); depends=False drops the edges.
+    """
+    rng = random.Random(args.seed)
+    created = datetime.now(timezone.utc)
+    stamp = created.strftime("%Y%m%dT%H%M%SZ")
+    stages = max(1, args.stages)
+    pad = ""
+    if args.prompt_bytes > 0:
+        block = prompt_pad(args.prompt_bytes)
+        data = block.encode("utf-8")
+        pad = f"\n[bench] pad_bytes={len(data)} pad_sha={hashlib.sha256(data).hexdigest()[:16]}\n[bench-pad]\n{block}\n[/bench-pad]\n"
+    written = 0
+    for i in range(args.tasks):
+        if args.target == "mixed":
+            target = "gemini" if rng.random() < args.gemini_share else "codex"
+        else:
+            target = args.target
+        step = i % stages
+        if stage is not None and step != stage:
+            continue
+        thread_id = f"bench-{i // stages % max(1, args.threads):03d}"
+        task_id = f"{i + 1:06d}"
+        meta: Dict[str, Any] = {
+            "kind": "work",
+            "thread_id": thread_id,
+            "task_id": task_id,
+            "from": "human",
+            "to": target,
+            "assign": "@직원1" if target == "gemini" else "@직원2",
+            "priority": "high",
+            "status": "new",
+            "timeout_s": args.timeout_s,
+            "max_retries": args.max_retries,
+            "created_at": (created + timedelta(microseconds=i)).isoformat(),
+        }
+        if target == "gemini":
+            meta["codex_assign"] = "@직원2"
+        if depends and step > 0:
+            meta["depends_on"] = f"{i:06d}"
+        body = f"# TASK\n벤치마크 작업 {task_id}\n\n# CONTEXT\n- seed={args.seed}\n{pad}"
+        path = inbox / f"{stamp}_{thread_id}_{task_id}_to_{target}.work.md"
+        path.write_text(render_markdown(meta, body), encoding="utf-8")
+        written += 1
+    return written
+
+
+def run_router(root: Path, workers: int, env: Dict[str, str], args: argparse.Namespace) -> Dict[str, Any]:
+    inbox = root / "bridge" / "inbox"
+    ticks = 0
+    max_rss_kb = 0
+    failed_ticks = 0
+    started = time.monotonic()
+    cmd = [args.python or sys.executable, str(ROUTER), "--root", str(root), "run-once", "--workers", str(workers)]
+    if args.profile:
+        cmd += ["--profile", args.profile]
+    while ticks < args.max_ticks and any(inbox.glob("*.work.md")):
+        ticks += 1
+        proc = subprocess.Popen(
+            cmd,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        # wait4 gives the child's own peak RSS (KiB on Linux), unlike RUSAGE_CHILDREN which only ever grows.
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        max_rss_kb = max(max_rss_kb, int(usage.ru_maxrss))
+        if proc.returncode != 0:
+            failed_ticks += 1
+    return {
+        "wall_s": round(time.monotonic() - started, 3),
+        "ticks": ticks,
+        "failed_ticks": failed_ticks,
+        "max_rss_kb": max_rss_kb,
+    }
+
+
+def collect(root: Path) -> Dict[str, Any]:
+    idx = load_json(root / "bridge" / "state" / "processed_index.json", {"processed": {}})
+    e2e: List[float] = []
+    queue_wait: List[float] = []
+    exec_ms: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    attempts: Dict[str, int] = {}
+    for rec in idx.get("processed", {}).values():
+        if not isinstance(rec, dict):
+            continue
+        status = str(rec.get("status") or "unknown")
+        statuses[status] = statuses.get(status, 0) + 1
+        if rec.get("error_code"):
+            code = str(rec["error_code"])
+            errors[code] = errors.get(code, 0) + 1
+        n = str(rec.get("attempts") or 0)
+        attempts[n] = attempts.get(n, 0) + 1
+        created, picked, done = _epoch(rec.get("created_at")), _epoch(rec.get("picked_at")), _epoch(rec.get("at"))
+        if created is not None and done is not None:
+            e2e.append((done - created) * 1000)
+        if created is not None and picked is not None:
+            queue_wait.append(max(0.0, picked - created) * 1000)
+        if isinstance(rec.get("exec_ms"), (int, float)):
+            exec_ms.append(float(rec["exec_ms"]))
+    return {
+        "finished": sum(statuses.values()),
+        # Work left in inprogress after the router exited means a task crashed instead of finishing.
+        "stranded": sum(1 for _ in (root / "bridge" / "inprogress").glob("*.work.md")),
+        "status": statuses,
+        "error_codes": errors,
+        "attempts": attempts,
+        "e2e_ms": summarize(e2e),
+        "queue_wait_ms": summarize(queue_wait),
+        "exec_ms": summarize(exec_ms),
+    }
+
+
+def prompt_via(base: Path) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    path = base / "fake_state" / "prompt_via.log"
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").split():
+            counts[line] = counts.get(line, 0) + 1
+    return counts
+
+
+def run_problems(row: Dict[str, Any]) -> List[str]:
+    """Router crashes that no latency or failure setting explains."""
+    problems: List[str] = []
+    if row["failed_ticks"]:
+        problems.append(f"failed_ticks={row['failed_ticks']}")
+    if row["stranded"]:
+        problems.append(f"stranded={row['stranded']}")
+    return problems
+
+
+def prompt_problems(row: Dict[str, Any], args: argparse.Namespace) -> List[str]:
+    """Why a --prompt-bytes run did not deliver every prompt whole over the expected path."""
+    problems: List[str] = []
+    if row["finished"] < args.tasks or row["status"].get("done", 0) != row["finished"]:
+        problems.append(f"status={row['status']} error_codes={row['error_codes']}")
+    for code in ("argv_too_long", "exec_error"):
+        if row["error_codes"].get(code):
+            problems.append(f"{code}={row['error_codes'][code]}")
+    if row["transport"] == "file":
+        expected = "file"
+    else:
+        expected = "stdin" if args.prompt_bytes > prompt_argv_max() else "argv"
+    # Gemini follow-ups carry only the answer, so they may still go over argv; every padded task must not.
+    if row["prompt_via"].get(expected, 0) < args.tasks:
+        problems.append(f"prompt_via={row['prompt_via']} expected {expected}>={args.tasks}")
+    return problems
+
+
+def chain_order(root: Path, stages: int) -> Dict[str, Any]:
+    """How the DAG run ordered the chains generate_work builds (task n depends on n-1 within a chain).
+
+    violations: dependents picked before their prerequisite finished. overlapped: dependents picked while
+    some other chain was still on the previous step, which staging by hand can never do.
+    """
+    idx = load_json(root / "bridge" / "state" / "processed_index.json", {"processed": {}})
+    finished_at: Dict[Tuple[str, str], float] = {}
+    picked: List[Tuple[str, str, float]] = []
+    for key, rec in idx.get("processed", {}).items():
+        thread_id, _, rest = key.partition("::")
+        task_id = rest.partition("::")[0]
+        if not isinstance(rec, dict) or not task_id.isdigit():
+            continue
+        at, picked_at = _epoch(rec.get("at")), _epoch(rec.get("picked_at"))
+        if at is not None:
+            # A gemini prerequisite also has its codex follow-up under the same ref; the later one counts.
+            finished_at[(thread_id, task_id)] = max(at, finished_at.get((thread_id, task_id), at))
+        if picked_at is not None:
+            picked.append((thread_id, task_id, picked_at))
+    step_done: Dict[int, float] = {}
+    for (_, task_id), at in finished_at.items():
+        step = (int(task_id) - 1) % stages
+        step_done[step] = max(at, step_done.get(step, at))
+    violations: List[str] = []
+    overlapped = 0
+    for thread_id, task_id, picked_at in picked:
+        n = int(task_id)
+        step = (n - 1) % stages
+        if step == 0:
+            continue
+        done = finished_at.get((thread_id, f"{n - 1:06d}"))
+        if done is None or picked_at < done:
+            violations.append(f"{thread_id}::{task_id}")
+        if picked_at < step_done.get(step - 1, 0.0):
+            overlapped += 1
+    return {"violations": sorted(set(violations)), "overlapped": overlapped}
+
+
+def staging_problems(runs: List[Dict[str, Any]], args: argparse.Namespace) -> List[str]:
+    """What --stages K (K > 1) must show: chains complete in order with steps overlapping across chains, and
+    with --staging both a DAG makespan no worse than staging by hand (within --makespan-slack; on a busy or
+    single-CPU host the fake CLIs make both runs CPU-bound)."""
+    problems: List[str] = []
+    manual = {(r["workers"], r["transport"]): r for r in runs if r["staging"] == "manual"}
+    for row in runs:
+        if row["staging"] != "dag":
+            continue
+        label = f"workers={row['workers']} transport={row['transport']}"
+        if row["finished"] < args.tasks:
+            problems.append(f"{label} finished={row['finished']}/{args.tasks}")
+        if row["error_codes"].get("dependency_failed") and not args.fail_rate:
+            problems.append(f"{label} dependency_failed={row['error_codes']['dependency_failed']}")
+        order = row.get("chain_order") or {}
+        if order.get("violations"):
+            problems.append(f"{label} picked_before_prerequisite={','.join(order['violations'][:5])}")
+        if not order.get("overlapped"):
+            # Every step waited for the whole previous one: the DAG ran no better than staging by hand.
+            problems.append(f"{label} no_chain_overlap")
+        other = manual.get((row["workers"], row["transport"]))
+        if other is not None and row["wall_s"] > other["wall_s"] * (1 + args.makespan_slack):
+            problems.append(f"{label} dag wall_s={row['wall_s']} above manual wall_s={other['wall_s']} (+{args.makespan_slack:.0%})")
+    return problems
+
+
+def bench_one(workers: int, args: argparse.Namespace, staging: str = "dag", transport: str = "default") -> Dict[str, Any]:
+    base = Path(tempfile.mkdtemp(prefix="bridge-bench-"))
+    via: Dict[str, int] = {}
+    try:
+        root = prepare_root(base)
+        env = bench_env(base, args, transport)
+        if staging == "manual":
+            # What people do without depends_on: submit one step of every chain, wait for it to drain, repeat.
+            run: Dict[str, Any] = {"wall_s": 0.0, "ticks": 0, "failed_ticks": 0, "max_rss_kb": 0}
+            for stage in range(max(1, args.stages)):
+                generate_work(root / "bridge" / "inbox", args, stage=stage, depends=False)
+                part = run_router(root, workers, env, args)
+                run = {
+                    "wall_s": round(run["wall_s"] + part["wall_s"], 3),
+                    "ticks": run["ticks"] + part["ticks"],
+                    "failed_ticks": run["failed_ticks"] + part["failed_ticks"],
+                    "max_rss_kb": max(run["max_rss_kb"], part["max_rss_kb"]),
+                }
+        else:
+            generate_work(root / "bridge" / "inbox", args)
+            run = run_router(root, workers, env, args)
+        stats = collect(root)
+        via = prompt_via(base)
+        order = chain_order(root, args.stages) if staging == "dag" and args.stages > 1 else None
+    finally:
+        if args.keep:
+            print(f"[bench] kept={base}")
+        else:
+            shutil.rmtree(base, ignore_errors=True)
+    run["throughput_per_s"] = round(stats["finished"] / run["wall_s"], 3) if run["wall_s"] else None
+    row = {"workers": workers, "staging": staging, "transport": transport, **run, **stats}
+    if args.prompt_bytes > 0:
+        row["prompt_via"] = via
+    if order is not None:
+        row["chain_order"] = order
+    return row
+
+
+def compare(current: List[Dict[str, Any]], baseline_path: Path) -> List[str]:
+    baseline = load_json(baseline_path, {})
+    prior = {(row.get("workers"), row.get("staging", "dag"), row.get("transport", "default")): row for row in baseline.get("runs", [])}
+    lines: List[str] = []
+    for row in current:
+        old = prior.get((row["workers"], row["staging"], row["transport"]))
+        if not old:
+            continue
+        for label, new_v, old_v in (
+            ("throughput_per_s", row.get("throughput_per_s"), old.get("throughput_per_s")),
+            ("e2e_p95_ms", row["e2e_ms"].get("p95"), old.get("e2e_ms", {}).get("p95")),
+            ("max_rss_kb", row.get("max_rss_kb"), old.get("max_rss_kb")),
+        ):
+            if not new_v or not old_v:
+                continue
+            delta = (new_v - old_v) / old_v * 100
+            lines.append(f"[compare] workers={row['workers']} staging={row['staging']} {label} {old_v} -> {new_v} ({delta:+.1f}%)")
+    return lines
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Synthetic load benchmark for the bridge router")
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--workers", default="1,4,8", help="쉼표로 구분한 --workers 값 목록")
+    parser.add_argument("--target", choices=["codex", "gemini", "mixed"], default="codex")
+    parser.add_argument("--gemini-share", type=float, default=0.2, help="--target mixed 일 때 gemini 비율")
+    parser.add_argument("--threads", type=int, default=50, help="작업을 나눠 담을 thread_id 수")
+    parser.add_argument("--stages", type=int, default=1, help="체인 길이: 각 단계가 앞 단계에 depends_on (1이면 의존성 없음)")
+    parser.add_argument(
+        "--staging",
+        choices=["dag", "manual", "both"],
+        default="dag",
+        help="dag: 전체를 depends_on으로 한 번에 제출 | manual: 단계별로 제출 후 drain 대기",
+    )
+    parser.add_argument("--makespan-slack", type=float, default=0.1, help="--staging both: dag wall_s가 manual보다 이 비율 넘게 길면 실패")
+    parser.add_argument("--prompt-bytes", type=int, default=0, help="work 본문에 붙일 검증용 패딩 크기(byte); fake CLI가 온전히 받았는지 확인")
+    parser.add_argument(
+        "--prompt-transport",
+        choices=["default", "file", "both"],
+        default="default",
+        help="default: 기본 codex/gemini 호출(큰 프롬프트는 stdin) | file: BRIDGE_*_CMD의 {prompt_file} 경로",
+    )
+    parser.add_argument("--latency", default="lognormal:50,0.5", help="fixed:MS | uniform:LO,HI | exp:MEAN | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-mode", choices=["non_zero", "stream", "empty"], default="non_zero")
+    parser.add_argument("--output-bytes", type=int, default=512)
+    parser.add_argument("--jsonl-events", type=int, default=4)
+    parser.add_argument("--timeout-s", type=int, default=60)
+    parser.add_argument("--max-retries", type=int, default=1)
+    parser.add_argument("--max-ticks", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--python", default="", help="라우터를 돌릴 인터프리터 (기본: 현재 인터프리터)")
+    parser.add_argument("--profile", default="", help="라우터 --profile 값 (예: cprofile,slow)")
+    parser.add_argument("--out", default="", help="결과 JSON 경로 (기본: $TMPDIR/bridge-bench/<stamp>.json)")
+    parser.add_argument("--compare", default="", help="비교할 이전 결과 JSON")
+    parser.add_argument("--keep", action="store_true", help="임시 루트를 지우지 않음")
+    args = parser.parse_args()
+
+    worker_counts = [int(x) for x in args.workers.split(",") if x.strip()]
+    stagings = ["dag", "manual"] if args.staging == "both" else [args.staging]
+    transports = ["default", "file"] if args.prompt_transport == "both" else [args.prompt_transport]
+    runs: List[Dict[str, Any]] = []
+    failed = False
+    for workers, staging, transport in ((w, st, tr) for w in worker_counts for st in stagings for tr in transports):
+        row = bench_one(workers, args, staging, transport)
+        runs.append(row)
+        print(
+            f"[bench] workers={workers} staging={staging} transport={transport} finished={row['finished']}/{args.tasks} "
+            f"wall_s={row['wall_s']} throughput={row['throughput_per_s']}/s e2e_p50={row['e2e_ms']['p50']} "
+            f"e2e_p95={row['e2e_ms']['p95']} e2e_p99={row['e2e_ms']['p99']} exec_p95={row['exec_ms']['p95']} rss_kb={row['max_rss_kb']}"
+        )
+        crashed = run_problems(row)
+        if crashed:
+            failed = True
+            print(f"[bench] router problems: {' '.join(crashed)}")
+        if args.prompt_bytes > 0:
+            problems = prompt_problems(row, args)
+            row["prompt_ok"] = not problems
+            failed = failed or bool(problems)
+            print(f"[bench] prompt_bytes={args.prompt_bytes} via={row['prompt_via']} ok={not problems} {' '.join(problems)}".rstrip())
+
+    if args.stages > 1:
+        problems = staging_problems(runs, args)
+        failed = failed or bool(problems)
+        print(f"[bench] stages={args.stages} ok={not problems} {' '.join(problems)}".rstrip())
+
+    config = {k: v for k, v in vars(args).items() if k not in {"out", "compare", "keep"}}
+    report = {"created": now_utc_stamp(), "python": sys.version.split()[0], "config": config, "runs": runs}
+    out = Path(args.out) if args.out else Path(tempfile.gettempdir()) / "bridge-bench" / f"{report['created']}.json"
+    save_json(out, report)
+    print(f"[bench] saved={out}")
+
+    if args.compare:
+        for line in compare(runs, Path(args.compare)):
+            print(line)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from codex_worker import build_batch_prompt, run_codex_once, split_batch_output
+from common import StageTimer, WorkerResult, parse_work_file, thread_task_key, validate_work_meta
+from metrics import REGISTRY
+from result_cache import cache_wanted
+
+# Frontmatter that decides where and how codex works; tasks share a run only when all of it matches.
+SCOPE_KEYS = ("thread_id", "assign", "response_lang", "work_mode", "scope_paths")
+
+
+def coalesce_enabled() -> bool:
+    return os.environ.get("BRIDGE_COALESCE", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _limit(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _eligible(path: Path, idx: Dict[str, Any], idx_lock: threading.Lock) -> Tuple[Tuple[str, ...], int] | None:
+    """(scope, body bytes) for a codex task that would run normally, or None to leave it on its own."""
+    try:
+        item = parse_work_file(path)
+    except Exception:
+        return None
+    meta = item.meta
+    if str(meta.get("to", "")).strip().lower() != "codex" or validate_work_meta(meta):
+        return None
+    # Dependents, crash-recovered retries and cacheable work keep their own single-task path.
+    if meta.get("depends_on") or meta.get("recovered_attempts") or cache_wanted("codex", meta):
+        return None
+    with idx_lock:
+        if thread_task_key(meta) in idx.get("processed", {}):
+            return None
+    return tuple(str(meta.get(k) or "") for k in SCOPE_KEYS), len(item.body.encode("utf-8"))
+
+
+def plan_batches(paths: List[Path], idx: Dict[str, Any], idx_lock: threading.Lock) -> List[List[Path]]:
+    """Group claimed paths into runs; order follows the first member of each group."""
+    if not coalesce_enabled():
+        return [[p] for p in paths]
+    max_tasks = _limit("BRIDGE_COALESCE_MAX_TASKS", 4)
+    max_bytes = _limit("BRIDGE_COALESCE_MAX_BYTES", 16000)
+    batches: List[List[Path]] = []
+    open_batch: Dict[Tuple[str, ...], Tuple[List[Path], int]] = {}
+    for path in paths:
+        found = _eligible(path, idx, idx_lock)
+        if found is None:
+            batches.append([path])
+            continue
+        scope, size = found
+        current = open_batch.get(scope)
+        if current is not None and len(current[0]) < max_tasks and current[1] + size <= max_bytes:
+            current[0].append(path)
+            open_batch[scope] = (current[0], current[1] + size)
+            continue
+        batch = [path]
+        batches.append(batch)
+        open_batch[scope] = (batch, size)
+    return batches
+
+
+def batch_logs(logs: Tuple[Path, Path]) -> Tuple[Path, Path]:
+    """`<stem>.attempt1.codex.stdout.log` -> `<stem>.attempt1.codex.batch.stdout.log` (and stderr)."""
+    return tuple(p.with_name(p.name.replace(".codex.std", ".codex.batch.std", 1)) for p in logs)  # type: ignore[return-value]
+
+
+def split_usage(usage: Dict[str, int] | None, task_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    """Combined-run tokens spread over the members; the first takes the remainders so the sum is exact."""
+    if not usage or not task_ids:
+        return {}
+    n = len(task_ids)
+    return {task_id: {k: v // n + (v % n if i == 0 else 0) for k, v in usage.items()} for i, task_id in enumerate(task_ids)}
+
+
+class CoalescedRun:
+    """One codex execution shared by a batch; every member takes its own section of the answer.
+
+    Members still go through process_claimed_work one by one, so validation, docs, the index and retries
+    stay per task. Only the first attempt is shared; when the combined run fails or leaves out a member's
+    section, that member runs the same attempt on its own, so its error doc is about its own work.
+    The combined run logs under its own `.batch.` names and works in the first member's worktree, which
+    every shared result reports as its work_dir. Its stage times, exec time and tokens are split evenly over
+    the members, including those that then run solo.
+    """
+
+    def __init__(self, paths: List[Path]) -> None:
+        self.refs: List[str] = []
+        self._subtasks: List[Tuple[str, str]] = []
+        for path in paths:
+            item = parse_work_file(path)
+            self.refs.append(f"{item.meta.get('thread_id')}::{item.meta.get('task_id')}")
+            self._subtasks.append((str(item.meta.get("task_id")), item.body))
+        self._lock = threading.Lock()
+        self._combined: WorkerResult | None = None
+        self._parts: Dict[str, str] = {}
+        self._stderr_tail = ""
+        self._share_ms = 0
+        self._stage_share: Dict[str, float] = {}
+        self._usage_shares: Dict[str, Dict[str, int]] = {}
+
+    def run(
+        self,
+        *,
+        repo_root: Path,
+        meta: Dict[str, Any],
+        timeout_s: int,
+        attempt: int,
+        env: Dict[str, str],
+        timer: StageTimer,
+        logs: Tuple[Path, Path] | None = None,
+    ) -> WorkerResult | None:
+        """This member's share of the combined run, or None when the attempt should run solo."""
+        if attempt > 1:
+            return None
+        with self._lock:
+            combined = self._combined
+            if combined is None:
+                # The first member's worktree and meta stand in for the batch; its logs get their own names
+                # so a solo re-run of the first member doesn't overwrite them. Its own timer (on the first
+                # member's trace lane) is split over all members below.
+                batch_timer = StageTimer(listener=timer.listener)
+                combined = run_codex_once(
+                    repo_root=repo_root,
+                    meta=meta,
+                    body="",
+                    timeout_s=timeout_s * len(self._subtasks),
+                    attempt=attempt,
+                    runtime_env=env,
+                    timer=batch_timer,
+                    prompt=build_batch_prompt(meta, self._subtasks),
+                    logs=batch_logs(logs) if logs is not None else None,
+                )
+                self._combined = combined
+                self._stderr_tail = combined.stderr_tail(80)
+                n = len(self._subtasks)
+                self._share_ms = combined.elapsed_ms // n
+                self._stage_share = {name: ms / n for name, ms in batch_timer.as_ms().items()}
+                self._usage_shares = split_usage(combined.usage, [task_id for task_id, _ in self._subtasks])
+                if combined.ok:
+                    self._parts = split_batch_output(combined.stdout)
+                else:
+                    print(f"[coalesce] combined run failed error_code={combined.error_code}; members run solo")
+        part = self._parts.get(str(meta.get("task_id")))
+        REGISTRY.inc("bridge_coalesce_total", {"result": "shared" if part is not None else "solo"})
+        if part is None:
+            return None
+        self._charge(timer)
+        # Each member's attempt logs get its own section, the batch logs keep the raw stream.
+        return combined.replace(
+            stdout=part,
+            elapsed_ms=self._share_ms,
+            stderr=self._stderr_tail,
+            raw_stdout="",
+            usage=self._usage_shares.get(str(meta.get("task_id"))),
+            work_dir=combined.work_dir,
+        )
+
+    def _charge(self, timer: StageTimer) -> None:
+        for name, ms in self._stage_share.items():
+            timer.add(name, ms)
+
+    def solo_share(self, meta: Dict[str, Any], attempt: int, timer: StageTimer) -> Tuple[int, Dict[str, int] | None]:
+        """(exec ms, tokens) of the combined attempt owed by a member that then ran it solo; its stage times go
+        on timer. Nothing when no combined run took place."""
+        if attempt != 1 or self._combined is None:
+            return 0, None
+        self._charge(timer)
+        return self._share_ms, self._usage_shares.get(str(meta.get("task_id")))
+
+    @property
+    def label(self) -> str:
+        return ",".join(self.refs)
@@ -1,16 +1,18 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import errno
 import json
 import os
-import shlex
+import re
 import shutil
-import subprocess
 import time
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Set, Tuple
 
-from common import WorkerResult, codex_auth_status, prepare_git_worktree
+from attempt_log import run_logged
+from common import USAGE_FIELDS, StageTimer, WorkerResult, codex_auth_status, prepare_git_worktree
+from prompt_transport import codex_transport, custom_transport
 
 PROFILE_PROMPTS = {
     "@직원1": "당신은 아키텍트/리뷰어입니다. 분석 중심으로 진행하고 코드 변경은 최소화하세요.",
@@ -19,6 +21,7 @@ PROFILE_PROMPTS = {
 }
 
 RETRYABLE_ERRORS = {"timeout", "stream_disconnected", "exec_error", "non_zero"}
+SUBTASK_MARKER_RE = re.compile(r"^=== SUBTASK (\S+) ===[ \t]*$", re.M)
 
 
 def _build_prompt(meta: Dict[str, object], body: str) -> str:
@@ -46,17 +49,62 @@ def _build_prompt(meta: Dict[str, object], body: str) -> str:
     )
 
 
-def _parse_codex_jsonl(text: str) -> tuple[str, list[str]]:
-    agent_messages: list[str] = []
-    stream_errors: list[str] = []
-    for line in text.splitlines():
+def build_batch_prompt(meta: Dict[str, object], subtasks: List[Tuple[str, str]]) -> str:
+    """One prompt for several (task_id, body) pairs of the same thread/assign/lang; see split_batch_output."""
+    assign = str(meta.get("assign", "@직원2"))
+    profile = PROFILE_PROMPTS.get(assign, PROFILE_PROMPTS["@직원2"])
+    response_lang = str(meta.get("response_lang", "ko")).strip().lower()
+    if response_lang == "en":
+        lang_rule = "Write all content in English."
+    else:
+        lang_rule = "모든 본문 내용은 한국어로 작성하세요."
+    parts = [
+        f"{profile}\n"
+        f"아래 {len(subtasks)}개의 하위 작업 파일을 순서대로 모두 처리하세요.\n"
+        "각 하위 작업의 결과는 반드시 `=== SUBTASK <task_id> ===` 한 줄로 시작하고, "
+        "그 아래에 RESULT, TEST, NEXT 섹션을 순서대로 작성하세요.\n"
+        "하위 작업을 건너뛰거나 합치지 마세요.\n"
+        f"{lang_rule}\n"
+        "불필요한 서론/메타설명 없이 결과만 작성하세요.\n\n"
+        f"[META]\nthread_id={meta.get('thread_id')}\n"
+        f"assign={assign}\n"
+        f"response_lang={response_lang}\n"
+        f"priority={meta.get('priority')}\n"
+    ]
+    for task_id, body in subtasks:
+        parts.append(f"\n[SUBTASK {task_id}]\n{body.strip()}\n")
+    return "".join(parts)
+
+
+def split_batch_output(text: str) -> Dict[str, str]:
+    """task_id -> section text from a combined answer; text before the first marker is dropped."""
+    marks = list(SUBTASK_MARKER_RE.finditer(text))
+    out: Dict[str, str] = {}
+    for i, m in enumerate(marks):
+        end = marks[i + 1].start() if i + 1 < len(marks) else len(text)
+        section = text[m.end() : end].strip()
+        if section:
+            out.setdefault(m.group(1), section)
+    return out
+
+
+class CodexStream:
+    """Incremental `codex exec --json` parser: keeps agent messages, stream errors and usage, not the events."""
+
+    def __init__(self) -> None:
+        self.agent_messages: list[str] = []
+        self.stream_errors: list[str] = []
+        self.usage: Dict[str, int] = {}
+
+    def feed(self, line: str) -> None:
+        # Most of the stream is reasoning and tool events; skip decoding lines that cannot matter.
+        if "agent_message" not in line and "turn.completed" not in line and '"error"' not in line:
+            return
         line = line.strip()
-        if not line:
-            continue
         try:
             event = json.loads(line)
         except json.JSONDecodeError:
-            continue
+            return
 
         event_type = event.get("type")
         if event_type == "item.completed":
@@ -64,17 +112,29 @@ def _parse_codex_jsonl(text: str) -> tuple[str, list[str]]:
             if item.get("type") == "agent_message":
                 msg = str(item.get("text", "")).strip()
                 if msg:
-                    agent_messages.append(msg)
+                    self.agent_messages.append(msg)
+        elif event_type == "turn.completed":
+            self.usage["turns"] = self.usage.get("turns", 0) + 1
+            for k, v in (event.get("usage") or {}).items():
+                if k in USAGE_FIELDS and isinstance(v, int):
+                    self.usage[k] = self.usage.get(k, 0) + v
         elif event_type == "error":
             msg = str(event.get("message", "")).strip()
             if msg:
-                stream_errors.append(msg)
-    return ("\n\n".join(agent_messages)).strip(), stream_errors
+                self.stream_errors.append(msg)
+
+    def result(self) -> tuple[str, list[str], Dict[str, int] | None]:
+        return ("\n\n".join(self.agent_messages)).strip(), self.stream_errors, self.usage or None
 
 
-def _has_auth_error(messages: list[str], stderr: str) -> bool:
-    text = "\n".join(messages + [stderr]).lower()
-    return "401 unauthorized" in text or "missing bearer" in text or "authentication" in text
+AUTH_ERROR_MARKERS = ("401 unauthorized", "missing bearer", "authentication")
+# stderr is matched line by line while it streams to the attempt log instead of being read back.
+STDERR_WATCH = AUTH_ERROR_MARKERS + ("stream disconnected",)
+
+
+def _has_auth_error(messages: list[str], stderr_seen: Set[str]) -> bool:
+    text = "\n".join(messages).lower()
+    return any(m in text or m in stderr_seen for m in AUTH_ERROR_MARKERS)
 
 
 def run_codex_once(
@@ -85,7 +145,11 @@ def run_codex_once(
     timeout_s: int,
     attempt: int,
     runtime_env: Dict[str, str],
+    timer: StageTimer | None = None,
+    prompt: str | None = None,
+    logs: Tuple[Path, Path] | None = None,
 ) -> WorkerResult:
+    timer = timer or StageTimer()
     start = time.monotonic()
     work_dir = repo_root
 
@@ -113,8 +177,11 @@ def run_codex_once(
     auth = codex_auth_status(codex_home)
     api_key_present = bool(env.get("OPENAI_API_KEY"))
 
-    prompt = _build_prompt(meta, body)
-    work_dir, wt_err = prepare_git_worktree(repo_root, meta)
+    if prompt is None:
+        with timer.span("prompt"):
+            prompt = _build_prompt(meta, body)
+    with timer.span("worktree"):
+        work_dir, wt_err = prepare_git_worktree(repo_root, meta)
     custom = os.environ.get("BRIDGE_CODEX_CMD", "").strip()
     use_json_stream = not custom
     if use_json_stream and not auth["auth_json"] and not api_key_present:
@@ -135,183 +202,93 @@ def run_codex_once(
         )
 
     if custom:
-        parts = shlex.split(custom)
-        cmd = [p.replace("{prompt}", prompt) for p in parts]
-        if "{prompt}" not in custom:
-            cmd.append(prompt)
+        transport = custom_transport(custom, prompt)
     else:
-        cmd = [
-            codex_bin,
-            "exec",
-            "--json",
-            "--ephemeral",
-            "--skip-git-repo-check",
-            "--full-auto",
+        transport = codex_transport(
+            [codex_bin, "exec", "--json", "--ephemeral", "--skip-git-repo-check", "--full-auto"],
             prompt,
-        ]
+        )
 
+    stream = CodexStream() if use_json_stream else None
     try:
-        proc = subprocess.run(
-            cmd,
-            cwd=work_dir,
-            env=env,
-            text=True,
-            capture_output=True,
-            timeout=timeout_s,
-            check=False,
-        )
-    except subprocess.TimeoutExpired as exc:
-        elapsed = int((time.monotonic() - start) * 1000)
-        stderr = (exc.stderr or "") if isinstance(exc.stderr, str) else ""
-        stdout = (exc.stdout or "") if isinstance(exc.stdout, str) else ""
-        return WorkerResult(
-            ok=False,
-            error_code="timeout",
-            error_stage="exec",
-            exit_code=None,
-            elapsed_ms=elapsed,
-            retry_count=attempt,
-            can_retry=True,
-            stdout=stdout,
-            stderr=stderr,
-            raw_stdout=stdout,
-            actor="codex",
-            work_dir=str(work_dir),
-        )
+        with timer.span("exec"):
+            # The prompt (or an empty stdin) is always piped so the CLI never waits on the router's own stdin.
+            run = run_logged(
+                transport.cmd,
+                cwd=work_dir,
+                env=env,
+                stdin_text=transport.stdin,
+                timeout_s=timeout_s,
+                logs=logs,
+                keep_stdout=stream is None,
+                on_stdout_line=stream.feed if stream is not None else None,
+                watch=STDERR_WATCH,
+            )
     except OSError as exc:
         elapsed = int((time.monotonic() - start) * 1000)
+        # E2BIG repeats on every attempt; BRIDGE_PROMPT_ARGV_MAX (or a {prompt} custom cmd) needs fixing.
+        too_long = exc.errno == errno.E2BIG
         return WorkerResult(
             ok=False,
-            error_code="exec_error",
+            error_code="argv_too_long" if too_long else "exec_error",
             error_stage="exec",
             exit_code=None,
             elapsed_ms=elapsed,
             retry_count=attempt,
-            can_retry=True,
+            can_retry=not too_long,
             stdout="",
             stderr=str(exc),
             raw_stdout="",
             actor="codex",
             work_dir=str(work_dir),
         )
+    finally:
+        transport.close()
 
     elapsed = int((time.monotonic() - start) * 1000)
-    raw_stdout = proc.stdout or ""
-    stdout = raw_stdout
-    stderr = proc.stderr or ""
-    if wt_err:
-        stderr = (stderr + "\n" if stderr else "") + f"[worktree] {wt_err}"
-
-    if use_json_stream:
-        parsed_msg, stream_errors = _parse_codex_jsonl(raw_stdout)
-        stdout = parsed_msg
-        if _has_auth_error(stream_errors, stderr):
-            return WorkerResult(
-                ok=False,
-                error_code="auth_failed",
-                error_stage="auth",
-                exit_code=proc.returncode,
-                elapsed_ms=elapsed,
-                retry_count=attempt,
-                can_retry=False,
-                stdout=stdout,
-                stderr=stderr + ("\n" if stderr and stream_errors else "") + "\n".join(stream_errors),
-                raw_stdout=raw_stdout,
-                actor="codex",
-                work_dir=str(work_dir),
-            )
-        if any("stream disconnected" in m.lower() for m in stream_errors):
-            return WorkerResult(
-                ok=False,
-                error_code="stream_disconnected",
-                error_stage="response_stream",
-                exit_code=proc.returncode,
-                elapsed_ms=elapsed,
-                retry_count=attempt,
-                can_retry=True,
-                stdout=stdout,
-                stderr=stderr + ("\n" if stderr and stream_errors else "") + "\n".join(stream_errors),
-                raw_stdout=raw_stdout,
-                actor="codex",
-                work_dir=str(work_dir),
-            )
-
-    if "stream disconnected" in stderr.lower() or "stream disconnected" in stdout.lower():
-        return WorkerResult(
-            ok=False,
-            error_code="stream_disconnected",
-            error_stage="response_stream",
-            exit_code=proc.returncode,
-            elapsed_ms=elapsed,
-            retry_count=attempt,
-            can_retry=True,
-            stdout=stdout,
-            stderr=stderr,
-            raw_stdout=raw_stdout,
-            actor="codex",
-            work_dir=str(work_dir),
-        )
-
-    if proc.returncode != 0:
-        if _has_auth_error([], stderr):
-            return WorkerResult(
-                ok=False,
-                error_code="auth_failed",
-                error_stage="auth",
-                exit_code=proc.returncode,
-                elapsed_ms=elapsed,
-                retry_count=attempt,
-                can_retry=False,
-                stdout=stdout,
-                stderr=stderr,
-                raw_stdout=raw_stdout,
-                actor="codex",
-                work_dir=str(work_dir),
-            )
-        return WorkerResult(
-            ok=False,
-            error_code="non_zero",
-            error_stage="exec",
-            exit_code=proc.returncode,
-            elapsed_ms=elapsed,
-            retry_count=attempt,
-            can_retry=True,
-            stdout=stdout,
-            stderr=stderr,
-            raw_stdout=raw_stdout,
-            actor="codex",
-            work_dir=str(work_dir),
-        )
+    notes = [f"[worktree] {wt_err}"] if wt_err else []
+    stdout = run.stdout if stream is None else ""
+    stream_errors: list[str] = []
+    usage: Dict[str, int] | None = None
+    if stream is not None:
+        with timer.span("jsonl"):
+            stdout, stream_errors, usage = stream.result()
 
-    if not stdout.strip():
-        return WorkerResult(
-            ok=False,
-            error_code="empty_output",
-            error_stage="postprocess",
-            exit_code=proc.returncode,
-            elapsed_ms=elapsed,
-            retry_count=attempt,
-            can_retry=False,
-            stdout=stdout,
-            stderr=stderr,
-            raw_stdout=raw_stdout,
-            actor="codex",
-            work_dir=str(work_dir),
-        )
+    # (error_code, error_stage, can_retry) of a failed attempt.
+    failure: Tuple[str, str, bool] | None = None
+    if run.timed_out:
+        failure = ("timeout", "exec", True)
+    elif stream is not None and _has_auth_error(stream_errors, run.seen):
+        failure = ("auth_failed", "auth", False)
+        notes.extend(stream_errors)
+    elif stream is not None and any("stream disconnected" in m.lower() for m in stream_errors):
+        failure = ("stream_disconnected", "response_stream", True)
+        notes.extend(stream_errors)
+    elif "stream disconnected" in run.seen or "stream disconnected" in stdout.lower():
+        failure = ("stream_disconnected", "response_stream", True)
+    elif run.returncode != 0:
+        failure = ("auth_failed", "auth", False) if _has_auth_error([], run.seen) else ("non_zero", "exec", True)
+    elif not stdout.strip():
+        failure = ("empty_output", "postprocess", False)
 
+    # Streaming wrote the log bodies during exec; `logs` is the tail flush and close.
+    with timer.span("logs"):
+        raw_stdout, stderr = run.close("\n".join(notes))
+    error_code, error_stage, can_retry = failure or (None, None, False)
     return WorkerResult(
-        ok=True,
-        error_code=None,
-        error_stage=None,
-        exit_code=proc.returncode,
+        ok=failure is None,
+        error_code=error_code,
+        error_stage=error_stage,
+        exit_code=run.returncode,
         elapsed_ms=elapsed,
         retry_count=attempt,
-        can_retry=False,
+        can_retry=can_retry,
         stdout=stdout,
         stderr=stderr,
         raw_stdout=raw_stdout,
         actor="codex",
         work_dir=str(work_dir),
+        usage=usage,
     )
 
 
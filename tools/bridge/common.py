@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import gzip
 import json
 import os
 import re
 import shutil
 import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import IO, Any, Callable, Dict, Iterator, List, Tuple
 
 REQUIRED_FRONTMATTER_KEYS = {
     "kind",
@@ -27,6 +33,8 @@ REQUIRED_FRONTMATTER_KEYS = {
 
 ALLOWED_TARGET_AGENTS = {"codex", "gemini"}
 
+FSYNC_MODES = {"off", "always", "group"}
+
 
 @dataclass
 class WorkItem:
@@ -35,20 +43,173 @@ class WorkItem:
     body: str
 
 
-@dataclass
+class OutputLog:
+    """A worker stream kept in its attempt log on disk; the text is read back only when asked for."""
+
+    __slots__ = ("path", "size")
+
+    def __init__(self, path: Path, size: int = 0) -> None:
+        self.path = path
+        self.size = size
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def __repr__(self) -> str:
+        return f"OutputLog({str(self.path)!r}, size={self.size})"
+
+    def _open(self) -> IO[bytes]:
+        return gzip.open(self.path, "rb") if self.path.suffix == ".gz" else self.path.open("rb")
+
+    def read(self) -> str:
+        try:
+            with self._open() as fh:
+                return fh.read().decode("utf-8", errors="replace")
+        except OSError:
+            return ""
+
+    def tail(self, max_lines: int = 40, max_bytes: int = 64 * 1024) -> str:
+        """Last max_lines lines, looking at no more than the last max_bytes of the stream."""
+        data = b""
+        try:
+            with self._open() as fh:
+                if self.path.suffix == ".gz":
+                    for chunk in iter(lambda: fh.read(max_bytes), b""):
+                        data = (data + chunk)[-max_bytes:]
+                else:
+                    fh.seek(0, os.SEEK_END)
+                    fh.seek(max(0, fh.tell() - max_bytes))
+                    data = fh.read()
+        except OSError:
+            return ""
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        if len(data) >= max_bytes and lines:
+            # The window started mid-line.
+            lines = lines[1:]
+        return "\n".join(lines[-max_lines:])
+
+
 class WorkerResult:
-    ok: bool
-    error_code: str | None
-    error_stage: str | None
-    exit_code: int | None
-    elapsed_ms: int
-    retry_count: int
-    can_retry: bool
-    stdout: str
-    stderr: str
-    raw_stdout: str = ""
-    actor: str = "codex"
-    work_dir: str = ""
+    """One worker attempt. `stdout` is the answer; `stderr` and `raw_stdout` are short strings, or OutputLog
+    handles when the worker streamed them straight into the attempt logs (see `spilled`)."""
+
+    __slots__ = (
+        "ok",
+        "error_code",
+        "error_stage",
+        "exit_code",
+        "elapsed_ms",
+        "retry_count",
+        "can_retry",
+        "stdout",
+        "stderr",
+        "raw_stdout",
+        "actor",
+        "work_dir",
+        "usage",
+    )
+
+    def __init__(
+        self,
+        ok: bool,
+        error_code: str | None,
+        error_stage: str | None,
+        exit_code: int | None,
+        elapsed_ms: int,
+        retry_count: int,
+        can_retry: bool,
+        stdout: str,
+        stderr: "str | OutputLog",
+        raw_stdout: "str | OutputLog" = "",
+        actor: str = "codex",
+        work_dir: str = "",
+        usage: Dict[str, int] | None = None,
+    ) -> None:
+        self.ok = ok
+        self.error_code = error_code
+        self.error_stage = error_stage
+        self.exit_code = exit_code
+        self.elapsed_ms = elapsed_ms
+        self.retry_count = retry_count
+        self.can_retry = can_retry
+        self.stdout = stdout
+        self.stderr = stderr
+        self.raw_stdout = raw_stdout
+        self.actor = actor
+        self.work_dir = work_dir
+        self.usage = usage
+
+    def __repr__(self) -> str:
+        return (
+            f"WorkerResult(ok={self.ok}, error_code={self.error_code!r}, actor={self.actor!r}, "
+            f"elapsed_ms={self.elapsed_ms}, stdout={len(self.stdout)} chars)"
+        )
+
+    def replace(self, **changes: Any) -> "WorkerResult":
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return WorkerResult(**fields)
+
+    @property
+    def spilled(self) -> bool:
+        """Both streams are already in the attempt logs, so the router has nothing left to write."""
+        return isinstance(self.stderr, OutputLog) and isinstance(self.raw_stdout, OutputLog)
+
+    def stderr_tail(self, max_lines: int = 40) -> str:
+        if isinstance(self.stderr, OutputLog):
+            return self.stderr.tail(max_lines)
+        return tail(self.stderr, max_lines)
+
+
+class StageTimer:
+    """Accumulates wall-clock milliseconds per named stage; repeated stages (retries) add up."""
+
+    def __init__(self, listener: Callable[[str, float, float], None] | None = None) -> None:
+        self._ms: Dict[str, float] = {}
+        self.listener = listener
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        wall = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add(name, elapsed * 1000.0)
+            if self.listener is not None:
+                self.listener(name, wall, elapsed)
+
+    def add(self, name: str, ms: float) -> None:
+        self._ms[name] = self._ms.get(name, 0.0) + max(0.0, ms)
+
+    def as_ms(self) -> Dict[str, int]:
+        return {name: int(round(ms)) for name, ms in self._ms.items()}
+
+
+def format_stages(stages: Dict[str, int]) -> str:
+    return ",".join(f"{name}={ms}" for name, ms in stages.items())
+
+
+def parse_stages(value: object) -> Dict[str, int]:
+    stages: Dict[str, int] = {}
+    for part in str(value or "").split(","):
+        name, sep, ms = part.partition("=")
+        if sep and ms.strip().isdigit():
+            stages[name.strip()] = int(ms)
+    return stages
+
+
+USAGE_FIELDS = ("input_tokens", "cached_input_tokens", "output_tokens", "reasoning_output_tokens", "turns")
+
+
+def merge_usage(total: Dict[str, int] | None, usage: Dict[str, int] | None) -> Dict[str, int] | None:
+    if not usage:
+        return total
+    merged = dict(total or {})
+    for k, v in usage.items():
+        merged[k] = merged.get(k, 0) + int(v)
+    return merged
 
 
 def now_utc_iso() -> str:
@@ -67,9 +228,209 @@ def read_text(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def write_text(path: Path, data: str) -> None:
+def fsync_mode() -> str:
+    mode = os.environ.get("BRIDGE_FSYNC", "group").strip().lower()
+    return mode if mode in FSYNC_MODES else "group"
+
+
+def fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class GroupCommitter:
+    """Batches fsync+rename of atomic writes issued within a short window into one flush.
+
+    Batches flush strictly in ticket order, so a later write of a path never lands before an earlier one.
+    A commit may carry a version: a versioned write older than one already queued or written for the same
+    path is dropped, which lets callers serialize a snapshot under their lock and commit it outside.
+    """
+
+    def __init__(self, window_ms: int) -> None:
+        self.window_s = max(0, window_ms) / 1000.0
+        self._cond = threading.Condition()
+        self._pending: list[Tuple[Path, Path, int | None]] = []
+        self._failed: Dict[Path, OSError] = {}
+        self._versions: Dict[Path, int] = {}
+        self._open_batch = 1
+        self._flushed = 0
+        self._leading = False
+
+    def commit(self, tmp: Path, final: Path, version: int | None = None) -> None:
+        with self._cond:
+            ticket = self._open_batch
+            self._pending.append((tmp, final, version))
+            leader = not self._leading
+            if leader:
+                self._leading = True
+            else:
+                while self._flushed < ticket:
+                    self._cond.wait()
+                self._raise_if_failed(tmp)
+                return
+
+        time.sleep(self.window_s)
+        with self._cond:
+            batch = self._pending
+            self._pending = []
+            self._open_batch += 1
+            self._leading = False
+            # Only one batch flushes at a time, and never ahead of an earlier ticket.
+            while self._flushed < ticket - 1:
+                self._cond.wait()
+
+        failed: Dict[Path, OSError] = {}
+        try:
+            failed = self._flush(batch)
+        finally:
+            with self._cond:
+                self._failed.update(failed)
+                self._flushed = ticket
+                self._cond.notify_all()
+        with self._cond:
+            self._raise_if_failed(tmp)
+
+    def _raise_if_failed(self, tmp: Path) -> None:
+        exc = self._failed.pop(tmp, None)
+        if exc is not None:
+            raise exc
+
+    def _flush(self, batch: list[Tuple[Path, Path, int | None]]) -> Dict[Path, OSError]:
+        newest: Dict[Path, int] = {}
+        for _, final, version in batch:
+            if version is not None:
+                newest[final] = max(version, newest.get(final, self._versions.get(final, 0)))
+        live: list[Tuple[Path, Path]] = []
+        for tmp, final, version in batch:
+            if version is not None and version < newest[final]:
+                # Superseded by a newer snapshot of the same file.
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+                continue
+            live.append((tmp, final))
+        self._versions.update(newest)
+        return self.sync_and_rename(live)
+
+    @staticmethod
+    def sync_and_rename(batch: list[Tuple[Path, Path]]) -> Dict[Path, OSError]:
+        failed: Dict[Path, OSError] = {}
+        last_tmp_for: Dict[Path, Path] = {final: tmp for tmp, final in batch}
+        parents: Dict[Path, None] = {}
+        for tmp, final in batch:
+            try:
+                # Only the newest version of a path rewritten within the window needs its data synced.
+                if last_tmp_for[final] == tmp:
+                    fd = os.open(str(tmp), os.O_RDONLY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                os.replace(tmp, final)
+                parents[final.parent] = None
+            except OSError as exc:
+                failed[tmp] = exc
+        for parent in parents:
+            fsync_dir(parent)
+        return failed
+
+
+_group_committer: GroupCommitter | None = None
+_group_committer_lock = threading.Lock()
+
+
+def group_committer() -> GroupCommitter:
+    global _group_committer
+    with _group_committer_lock:
+        if _group_committer is None:
+            try:
+                window_ms = int(os.environ.get("BRIDGE_GROUP_COMMIT_MS", "5"))
+            except ValueError:
+                window_ms = 5
+            _group_committer = GroupCommitter(window_ms)
+        return _group_committer
+
+
+_tmp_counter = 0
+_tmp_counter_lock = threading.Lock()
+
+
+def _tmp_path_for(path: Path) -> Path:
+    global _tmp_counter
+    with _tmp_counter_lock:
+        _tmp_counter += 1
+        n = _tmp_counter
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.{n}.tmp")
+
+
+def atomic_write_bytes(path: Path, data: bytes, mode: str | None = None, version: int | None = None) -> None:
+    """`version` only matters in group mode; see GroupCommitter."""
+    mode = mode or fsync_mode()
     ensure_dir(path.parent)
-    path.write_text(data, encoding="utf-8")
+    tmp = _tmp_path_for(path)
+    try:
+        with tmp.open("wb") as fh:
+            fh.write(data)
+            fh.flush()
+            if mode == "always":
+                os.fsync(fh.fileno())
+        if mode == "group":
+            group_committer().commit(tmp, path, version)
+            return
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    if mode == "always":
+        fsync_dir(path.parent)
+
+
+def write_text(path: Path, data: str) -> None:
+    atomic_write_bytes(path, data.encode("utf-8"))
+
+
+def atomic_write_many(items: list[Tuple[Path, bytes]], mode: str | None = None) -> None:
+    """Atomic writes of many files as one batch: one flush pass and one fsync per parent directory."""
+    mode = mode or fsync_mode()
+    batch: list[Tuple[Path, Path]] = []
+    try:
+        for path, data in items:
+            ensure_dir(path.parent)
+            tmp = _tmp_path_for(path)
+            batch.append((tmp, path))
+            with tmp.open("wb") as fh:
+                fh.write(data)
+        if mode == "off":
+            for tmp, path in batch:
+                os.replace(tmp, path)
+            return
+        failed = GroupCommitter.sync_and_rename(batch)
+    except BaseException:
+        for tmp, _ in batch:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+        raise
+    for tmp in failed:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+    if failed:
+        raise next(iter(failed.values()))
 
 
 def load_json(path: Path, default: Any) -> Any:
@@ -78,12 +439,18 @@ def load_json(path: Path, default: Any) -> Any:
     try:
         return json.loads(path.read_text(encoding="utf-8"))
     except json.JSONDecodeError:
+        # Keep the damaged file for inspection instead of silently overwriting it with the default.
+        aside = path.with_name(f"{path.name}.corrupt.{now_utc_stamp()}")
+        try:
+            path.rename(aside)
+        except OSError:
+            aside = path
+        print(f"[state] corrupt json: {path} -> {aside}", file=sys.stderr)
         return default
 
 
 def save_json(path: Path, data: Any) -> None:
-    ensure_dir(path.parent)
-    path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    write_text(path, json.dumps(data, indent=2, ensure_ascii=False) + "\n")
 
 
 def parse_scalar(value: str) -> Any:
@@ -100,6 +467,18 @@ def parse_scalar(value: str) -> Any:
     return raw
 
 
+def _parse_meta_lines(lines: List[str]) -> Dict[str, Any]:
+    meta: Dict[str, Any] = {}
+    for line in lines:
+        if not line.strip() or line.strip().startswith("#"):
+            continue
+        if ":" not in line:
+            raise ValueError(f"invalid frontmatter line: {line.rstrip()}")
+        key, value = line.split(":", 1)
+        meta[key.strip()] = parse_scalar(value)
+    return meta
+
+
 def parse_frontmatter(text: str) -> Tuple[Dict[str, Any], str]:
     lines = text.splitlines()
     if not lines or lines[0].strip() != "---":
@@ -113,19 +492,74 @@ def parse_frontmatter(text: str) -> Tuple[Dict[str, Any], str]:
     if end is None:
         raise ValueError("missing frontmatter end")
 
-    meta: Dict[str, Any] = {}
-    for line in lines[1:end]:
-        if not line.strip() or line.strip().startswith("#"):
-            continue
-        if ":" not in line:
-            raise ValueError(f"invalid frontmatter line: {line}")
-        key, value = line.split(":", 1)
-        meta[key.strip()] = parse_scalar(value)
-
+    meta = _parse_meta_lines(lines[1:end])
     body = "\n".join(lines[end + 1 :]).strip() + "\n"
     return meta, body
 
 
+# Headers are a few hundred bytes; anything past this is not a bridge doc.
+FRONTMATTER_MAX_BYTES = 1 << 20
+
+
+def read_frontmatter(path: Path) -> Dict[str, Any]:
+    """Meta of a frontmatter doc, read line by line up to the closing `---`; the body is never loaded."""
+    lines: List[str] = []
+    left = FRONTMATTER_MAX_BYTES
+    with path.open(encoding="utf-8") as fh:
+        first = fh.readline(left)
+        if first.strip() != "---":
+            raise ValueError("missing frontmatter start")
+        left -= len(first)
+        while left > 0:
+            line = fh.readline(left)
+            if not line:
+                break
+            if line.strip() == "---":
+                return _parse_meta_lines(lines)
+            lines.append(line)
+            left -= len(line)
+    raise ValueError("missing frontmatter end")
+
+
+class MetaCache:
+    """Frontmatter per path, reused while the file's inode, mtime and size are unchanged (LRU-bounded).
+
+    Result and error docs are written once, so repeated scans (submit_work waits, find_result) only stat them.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, path: Path) -> Dict[str, Any]:
+        st = path.stat()
+        sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+        key = str(path)
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and hit[0] == sig:
+                self._entries.move_to_end(key)
+                return dict(hit[1])
+        meta = read_frontmatter(path)
+        with self._lock:
+            self._entries[key] = (sig, meta)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return dict(meta)
+
+
+def _meta_cache_size() -> int:
+    try:
+        return int(os.environ.get("BRIDGE_META_CACHE_MAX", "4096"))
+    except ValueError:
+        return 4096
+
+
+META_CACHE = MetaCache(_meta_cache_size())
+
+
 def render_frontmatter(meta: Dict[str, Any]) -> str:
     ordered = []
     for key in sorted(meta.keys()):
@@ -168,14 +602,42 @@ def validate_work_meta(meta: Dict[str, Any]) -> list[str]:
 
     for numeric in ("timeout_s", "max_retries"):
         v = meta.get(numeric)
+        if is_auto(v):
+            continue
         if not isinstance(v, int):
             errors.append(f"invalid_{numeric}")
         elif v <= 0:
             errors.append(f"non_positive_{numeric}")
 
+    if "depends_on" in meta:
+        deps = parse_depends_on(meta.get("depends_on"), meta.get("thread_id"))
+        if any(not t or not k for t, k in deps):
+            errors.append("invalid_depends_on")
+        elif (str(meta.get("thread_id")), str(meta.get("task_id"))) in deps:
+            errors.append("invalid_depends_on:self")
+
     return errors
 
 
+def is_auto(value: object) -> bool:
+    """`timeout_s: auto` / `max_retries: auto` ask the router to pick the value from history."""
+    return isinstance(value, str) and value.strip().lower() == "auto"
+
+
+def parse_depends_on(value: object, thread_id: object) -> List[Tuple[str, str]]:
+    """`depends_on: "0001, other-thread::0003"` -> [(thread, task), ...]; bare ids refer to the same thread."""
+    if value is None or value == "":
+        return []
+    out: List[Tuple[str, str]] = []
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        dep_thread, sep, dep_task = part.rpartition("::")
+        out.append(((dep_thread if sep else str(thread_id)).strip(), dep_task.strip()))
+    return out
+
+
 def parse_work_file(path: Path) -> WorkItem:
     meta, body = parse_frontmatter(read_text(path))
     return WorkItem(path=path, meta=meta, body=body)
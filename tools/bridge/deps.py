@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+
+from common import ALLOWED_TARGET_AGENTS, parse_depends_on, read_frontmatter
+
+TaskRef = Tuple[str, str]
+
+
+class DependencyGate:
+    """Keeps `depends_on` work in the inbox until every prerequisite (thread, task) is done.
+
+    A prerequisite is done when the index has a done record for it and no work file for it is still
+    queued or running (a gemini task is only done once its codex follow-up is). A failed prerequisite,
+    or a dependency cycle among held work, admits the dependent so the router can fail it fast.
+    """
+
+    def __init__(self, idx: Dict[str, Any], idx_lock: threading.Lock) -> None:
+        self.idx = idx
+        self.idx_lock = idx_lock
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[TaskRef, List[TaskRef]]] = {}
+        self.running: Dict[str, TaskRef] = {}
+        self.held: Set[str] = set()
+        self.cycles: Dict[str, str] = {}
+        # Held work waiting on prerequisites nobody has submitted: no index record, nothing queued or running.
+        self.unknown: Dict[str, List[TaskRef]] = {}
+
+    def _read(self, path: Path) -> Tuple[TaskRef, List[TaskRef]]:
+        cached = self._meta.get(path.name)
+        if cached is None:
+            try:
+                meta = read_frontmatter(path)
+                ref = (str(meta.get("thread_id")), str(meta.get("task_id")))
+                cached = (ref, parse_depends_on(meta.get("depends_on"), meta.get("thread_id")))
+            except (OSError, ValueError):
+                # Unreadable files are claimed as usual and fail in the router's parse step.
+                cached = (("", ""), [])
+            self._meta[path.name] = cached
+        return cached
+
+    def _records(self, ref: TaskRef) -> List[Dict[str, Any]]:
+        processed = self.idx.get("processed", {})
+        with self.idx_lock:
+            recs = [processed.get(f"{ref[0]}::{ref[1]}::{target}") for target in sorted(ALLOWED_TARGET_AGENTS)]
+        return [r for r in recs if isinstance(r, dict)]
+
+    def prerequisite_state(self, ref: TaskRef, pending: Set[TaskRef]) -> str:
+        recs = self._records(ref)
+        if any(r.get("status") != "done" for r in recs):
+            return "failed"
+        if ref in pending or not recs:
+            return "wait"
+        return "done"
+
+    def select(self, paths: List[Path], related_only: bool = False) -> List[Path]:
+        """Inbox paths the router may claim now; the rest with unmet dependencies are recorded as held.
+
+        With related_only (re-scans inside a tick) only held work and the prerequisites it waits on are
+        considered, so unrelated files that arrive mid-tick wait for the next tick as before.
+        """
+        with self._lock:
+            entries = {p.name: (p, *self._read(p)) for p in paths}
+            pending = {ref for _, ref, _ in entries.values()} | set(self.running.values())
+            wanted: Set[TaskRef] = set()
+            for name in self.held:
+                if name in entries:
+                    wanted.update(entries[name][2])
+            admitted: List[Path] = []
+            held: Set[str] = set()
+            unknown: Dict[str, List[TaskRef]] = {}
+            for name, (path, ref, deps) in entries.items():
+                if related_only and name not in self.held and ref not in wanted:
+                    continue
+                states = [self.prerequisite_state(d, pending) for d in deps if d != ref]
+                if "wait" in states and "failed" not in states:
+                    held.add(name)
+                    missing = [d for d in deps if d != ref and d not in pending and not self._records(d)]
+                    if missing:
+                        unknown[name] = missing
+                else:
+                    admitted.append(path)
+            self.held = held
+            if not related_only:
+                self.unknown = unknown
+            if held and not admitted and not self.running:
+                admitted = [entries[name][0] for name in self._find_cycles(entries)]
+                self.held -= {p.name for p in admitted}
+            for path in admitted:
+                self.running[path.name] = entries[path.name][1]
+            return admitted
+
+    def _find_cycles(self, entries: Dict[str, Tuple[Path, TaskRef, List[TaskRef]]]) -> List[str]:
+        by_ref: Dict[TaskRef, List[str]] = {}
+        for name in self.held:
+            by_ref.setdefault(entries[name][1], []).append(name)
+        edges = {name: [n for d in entries[name][2] for n in by_ref.get(d, [])] for name in self.held}
+        on_cycle: List[str] = []
+        for start in sorted(edges):
+            stack = [(start, [start])]
+            seen: Set[str] = set()
+            while stack:
+                node, trail = stack.pop()
+                for nxt in edges.get(node, []):
+                    if nxt == start:
+                        refs = [f"{entries[n][1][0]}::{entries[n][1][1]}" for n in trail + [start]]
+                        self.cycles[start] = "dependency cycle: " + " -> ".join(refs)
+                        on_cycle.append(start)
+                        stack = []
+                        break
+                    if nxt not in seen:
+                        seen.add(nxt)
+                        stack.append((nxt, trail + [nxt]))
+        return on_cycle
+
+    def finished(self, name: str) -> None:
+        with self._lock:
+            self.running.pop(name, None)
+
+    def failure(self, name: str, meta: Dict[str, Any]) -> str | None:
+        """Why a claimed task must not run: a failed prerequisite or a dependency cycle."""
+        if name in self.cycles:
+            return self.cycles[name]
+        for ref in parse_depends_on(meta.get("depends_on"), meta.get("thread_id")):
+            for rec in self._records(ref):
+                if rec.get("status") != "done":
+                    return f"prerequisite {ref[0]}::{ref[1]} {rec.get('status')}:{rec.get('error_code') or 'unknown'}"
+        return None
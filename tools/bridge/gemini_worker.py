@@ -1,15 +1,18 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import errno
+import json
 import os
-import shlex
+import re
 import shutil
-import subprocess
 import time
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, List, Tuple
 
-from common import WorkerResult
+from attempt_log import run_logged
+from common import StageTimer, WorkerResult
+from prompt_transport import custom_transport, gemini_transport
 
 PROFILE_PROMPTS = {
     "@직원1": "당신은 기획/리뷰 역할입니다. 실행 지시를 명확하고 보수적으로 작성하세요.",
@@ -17,7 +20,102 @@ PROFILE_PROMPTS = {
     "@직원3": "당신은 QA 기획 역할입니다. 테스트 관점과 검증 조건을 우선 반영하세요.",
 }
 
-RETRYABLE_ERRORS = {"timeout", "exec_error", "non_zero"}
+# gemini_invalid_output: a malformed work body is retried on gemini instead of being handed to codex.
+RETRYABLE_ERRORS = {"timeout", "exec_error", "non_zero", "gemini_invalid_output"}
+
+WORK_SECTIONS = ("TASK", "CONTEXT", "REQUIREMENTS", "OUTPUT")
+SECTION_RE = re.compile(r"^#{1,3}\s*(TASK|CONTEXT|REQUIREMENTS|OUTPUT|NOTES)\b.*$", re.M | re.I)
+CODE_RE = re.compile(r"```.*?```|`[^`\n]*`", re.S)
+HANGUL_WORD_RE = re.compile(r"\S*[\uac00-\ud7a3]\S*")
+LATIN_WORD_RE = re.compile(r"(?<!\S)[A-Za-z][A-Za-z'-]*[.,:;!?)]*(?!\S)")
+
+
+def validation_enabled() -> bool:
+    # Opt-in: the language ratio can reject Korean bodies heavy on English identifiers and burn retries.
+    return os.environ.get("BRIDGE_GEMINI_VALIDATE", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def work_sections(text: str) -> List[Tuple[str, int, int]]:
+    """(NAME, heading start, heading end) for every work-body section heading, in order."""
+    return [(m.group(1).upper(), m.start(), m.end()) for m in SECTION_RE.finditer(text)]
+
+
+def has_work_sections(text: str) -> bool:
+    names = {name for name, _, _ in work_sections(text)}
+    return all(name in names for name in WORK_SECTIONS)
+
+
+def validate_work_body(text: str, response_lang: object) -> List[str]:
+    """Problems that make gemini output unfit as a codex work body; empty when it looks usable.
+
+    Checks the section headings the prompt asks for (presence and order), a minimum amount of content per
+    section, and that prose outside code is mostly in response_lang.
+    """
+    heads = work_sections(text)
+    names = [h[0] for h in heads]
+    problems = [f"missing_section:{name}" for name in WORK_SECTIONS if name not in names]
+    if problems:
+        return problems
+    firsts = [names.index(name) for name in WORK_SECTIONS]
+    if firsts != sorted(firsts):
+        problems.append("section_order")
+    min_task = int(_env_number("BRIDGE_GEMINI_MIN_TASK_CHARS", 8))
+    for i, (name, _, end) in enumerate(heads):
+        if name not in WORK_SECTIONS or names.index(name) != i:
+            continue
+        content = text[end : heads[i + 1][1] if i + 1 < len(heads) else len(text)].strip()
+        if not content:
+            problems.append(f"empty_section:{name}")
+        elif name == "TASK" and len(content) < min_task:
+            problems.append("short_section:TASK")
+    prose = CODE_RE.sub(" ", text)
+    # Word level: paths and identifiers (`router.py`, snake_case) count as neither language.
+    hangul, latin = len(HANGUL_WORD_RE.findall(prose)), len(LATIN_WORD_RE.findall(prose))
+    if hangul + latin:
+        ratio = hangul / (hangul + latin)
+        lang = str(response_lang or "ko").strip().lower()
+        if lang == "en" and ratio > _env_number("BRIDGE_GEMINI_MAX_HANGUL_EN", 0.1):
+            problems.append("language:en_expected")
+        elif lang != "en" and ratio < _env_number("BRIDGE_GEMINI_MIN_HANGUL_KO", 0.2):
+            problems.append("language:ko_expected")
+    return problems
+
+
+def gemini_output_format() -> str:
+    value = os.environ.get("BRIDGE_GEMINI_OUTPUT_FORMAT", "text").strip().lower()
+    return value if value in {"text", "json"} else "text"
+
+
+def _parse_gemini_json(text: str) -> tuple[str, Dict[str, int] | None] | None:
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or "response" not in data:
+        return None
+    usage: Dict[str, int] = {}
+    models: Dict[str, Any] = ((data.get("stats") or {}).get("models") or {})
+    for model in models.values():
+        tokens = model.get("tokens") or {}
+        api = model.get("api") or {}
+        for src, dst in (
+            ("prompt", "input_tokens"),
+            ("cached", "cached_input_tokens"),
+            ("candidates", "output_tokens"),
+            ("thoughts", "reasoning_output_tokens"),
+        ):
+            if isinstance(tokens.get(src), int):
+                usage[dst] = usage.get(dst, 0) + tokens[src]
+        if isinstance(api.get("totalRequests"), int):
+            usage["turns"] = usage.get("turns", 0) + api["totalRequests"]
+    return str(data.get("response") or ""), usage or None
 
 
 def _build_prompt(meta: Dict[str, object], body: str) -> str:
@@ -54,7 +152,10 @@ def run_gemini_once(
     body: str,
     timeout_s: int,
     attempt: int,
+    timer: StageTimer | None = None,
+    logs: Tuple[Path, Path] | None = None,
 ) -> WorkerResult:
+    timer = timer or StageTimer()
     start = time.monotonic()
     work_dir = repo_root
 
@@ -76,116 +177,91 @@ def run_gemini_once(
             work_dir=str(work_dir),
         )
 
-    prompt = _build_prompt(meta, body)
+    with timer.span("prompt"):
+        prompt = _build_prompt(meta, body)
     custom = os.environ.get("BRIDGE_GEMINI_CMD", "").strip()
     if custom:
-        parts = shlex.split(custom)
-        cmd = [p.replace("{prompt}", prompt) for p in parts]
-        if "{prompt}" not in custom:
-            cmd.append(prompt)
+        transport = custom_transport(custom, prompt)
     else:
-        cmd = [
+        transport = gemini_transport(
             gemini_bin,
-            "-p",
             prompt,
-            "--approval-mode",
-            "yolo",
-            "--output-format",
-            "text",
-        ]
+            ["--approval-mode", "yolo", "--output-format", gemini_output_format()],
+        )
 
     try:
-        proc = subprocess.run(
-            cmd,
-            cwd=work_dir,
-            text=True,
-            capture_output=True,
-            timeout=timeout_s,
-            check=False,
-        )
-    except subprocess.TimeoutExpired as exc:
-        elapsed = int((time.monotonic() - start) * 1000)
-        stderr = (exc.stderr or "") if isinstance(exc.stderr, str) else ""
-        stdout = (exc.stdout or "") if isinstance(exc.stdout, str) else ""
-        return WorkerResult(
-            ok=False,
-            error_code="timeout",
-            error_stage="exec",
-            exit_code=None,
-            elapsed_ms=elapsed,
-            retry_count=attempt,
-            can_retry=True,
-            stdout=stdout,
-            stderr=stderr,
-            raw_stdout=stdout,
-            actor="gemini",
-            work_dir=str(work_dir),
-        )
+        with timer.span("exec"):
+            # The prompt (or an empty stdin) is always piped so the CLI never waits on the router's own stdin.
+            run = run_logged(
+                transport.cmd,
+                cwd=work_dir,
+                stdin_text=transport.stdin,
+                timeout_s=timeout_s,
+                logs=logs,
+            )
     except OSError as exc:
         elapsed = int((time.monotonic() - start) * 1000)
+        # E2BIG repeats on every attempt; BRIDGE_PROMPT_ARGV_MAX (or a {prompt} custom cmd) needs fixing.
+        too_long = exc.errno == errno.E2BIG
         return WorkerResult(
             ok=False,
-            error_code="exec_error",
+            error_code="argv_too_long" if too_long else "exec_error",
             error_stage="exec",
             exit_code=None,
             elapsed_ms=elapsed,
             retry_count=attempt,
-            can_retry=True,
+            can_retry=not too_long,
             stdout="",
             stderr=str(exc),
             raw_stdout="",
             actor="gemini",
             work_dir=str(work_dir),
         )
+    finally:
+        transport.close()
 
     elapsed = int((time.monotonic() - start) * 1000)
-    stdout = (proc.stdout or "").strip()
-    stderr = proc.stderr or ""
-    if proc.returncode != 0:
-        return WorkerResult(
-            ok=False,
-            error_code="non_zero",
-            error_stage="exec",
-            exit_code=proc.returncode,
-            elapsed_ms=elapsed,
-            retry_count=attempt,
-            can_retry=True,
-            stdout=stdout,
-            stderr=stderr,
-            raw_stdout=proc.stdout or "",
-            actor="gemini",
-            work_dir=str(work_dir),
-        )
+    # Gemini's stdout is the answer itself (or its JSON envelope), so it is the one stream kept in memory.
+    stdout = run.stdout.strip()
+    usage: Dict[str, int] | None = None
+    if not run.timed_out and not custom and gemini_output_format() == "json" and stdout:
+        parsed = _parse_gemini_json(stdout)
+        if parsed is not None:
+            stdout, usage = parsed[0].strip(), parsed[1]
 
-    if not stdout:
-        return WorkerResult(
-            ok=False,
-            error_code="empty_output",
-            error_stage="postprocess",
-            exit_code=proc.returncode,
-            elapsed_ms=elapsed,
-            retry_count=attempt,
-            can_retry=False,
-            stdout=stdout,
-            stderr=stderr,
-            raw_stdout=proc.stdout or "",
-            actor="gemini",
-            work_dir=str(work_dir),
-        )
+    # (error_code, error_stage, can_retry) of a failed attempt.
+    failure: Tuple[str, str, bool] | None = None
+    note = ""
+    if run.timed_out:
+        failure = ("timeout", "exec", True)
+    elif run.returncode != 0:
+        failure = ("non_zero", "exec", True)
+    elif not stdout:
+        failure = ("empty_output", "postprocess", False)
+    else:
+        problems = validate_work_body(stdout, meta.get("response_lang")) if validation_enabled() else []
+        if problems:
+            failure = ("gemini_invalid_output", "validate", True)
+            note = "[validate] " + ",".join(problems)
 
+    # Streaming wrote the log bodies during exec; `logs` is the tail flush and close.
+    with timer.span("logs"):
+        raw_stdout, stderr = run.close(note)
+    error_code, error_stage, can_retry = failure or (None, None, False)
     return WorkerResult(
-        ok=True,
-        error_code=None,
-        error_stage=None,
-        exit_code=proc.returncode,
+        ok=failure is None,
+        error_code=error_code,
+        error_stage=error_stage,
+        exit_code=run.returncode,
         elapsed_ms=elapsed,
         retry_count=attempt,
-        can_retry=False,
+        can_retry=can_retry,
         stdout=stdout,
         stderr=stderr,
-        raw_stdout=proc.stdout or "",
+        raw_stdout=raw_stdout,
         actor="gemini",
         work_dir=str(work_dir),
+        usage=usage,
     )
 
 
@@ -10,7 +10,7 @@ import sys
 import time
 from pathlib import Path
 
-from common import codex_auth_status, runtime_env
+from common import codex_auth_status, runtime_env, save_json
 
 
 def repo_root_from_here() -> Path:
@@ -67,7 +67,7 @@ def main() -> int:
     report["checks"]["codex_exists"] = bool(codex_bin)
     if not codex_bin:
         report["reason"] = "codex_not_found"
-        (state_dir / "health.json").write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        save_json(state_dir / "health.json", report)
         print("[health] codex binary not found")
         return 1
 
@@ -81,7 +81,7 @@ def main() -> int:
     report["checks"]["gemini_required"] = require_gemini
     if require_gemini and not gemini_bin:
         report["reason"] = "gemini_not_found"
-        (state_dir / "health.json").write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        save_json(state_dir / "health.json", report)
         print("[health] gemini binary not found")
         return 1
 
@@ -108,7 +108,7 @@ def main() -> int:
 
     if use_json_stream and not auth["auth_json"] and not env.get("OPENAI_API_KEY"):
         report["reason"] = "codex_auth_missing"
-        (state_dir / "health.json").write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        save_json(state_dir / "health.json", report)
         print("[health] codex auth missing")
         return 1
     try:
@@ -124,13 +124,13 @@ def main() -> int:
     except subprocess.TimeoutExpired:
         report["reason"] = "codex_timeout"
         report["checks"]["smoke_timeout_s"] = 20
-        (state_dir / "health.json").write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        save_json(state_dir / "health.json", report)
         print("[health] codex smoke timeout")
         return 1
     except OSError as exc:
         report["reason"] = "codex_exec_error"
         report["checks"]["exec_error"] = str(exc)
-        (state_dir / "health.json").write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        save_json(state_dir / "health.json", report)
         print(f"[health] codex exec error: {exc}")
         return 1
 
@@ -151,25 +151,25 @@ def main() -> int:
 
     if has_auth_error(stream_errors, stderr):
         report["reason"] = "codex_auth_failed"
-        (state_dir / "health.json").write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        save_json(state_dir / "health.json", report)
         print("[health] codex auth failed")
         return 1
 
     if any("stream disconnected" in m.lower() for m in stream_errors):
         report["reason"] = "codex_stream_disconnected"
-        (state_dir / "health.json").write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        save_json(state_dir / "health.json", report)
         print("[health] codex stream disconnected")
         return 1
 
     if proc.returncode == 0 and stdout.strip():
         report["ok"] = True
         report["reason"] = "ok"
-        (state_dir / "health.json").write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        save_json(state_dir / "health.json", report)
         print("[health] ok")
         return 0
 
     report["reason"] = "codex_smoke_failed"
-    (state_dir / "health.json").write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    save_json(state_dir / "health.json", report)
     print("[health] failed")
     return 1
 
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Set, Tuple
+
+from common import is_auto
+from stats import iter_rows, percentile
+
+TaskRef = Tuple[str, str]
+
+# Used only when the index has no history at all for a target.
+DEFAULT_ATTEMPT_MS = {"codex": 120000.0, "gemini": 30000.0}
+MIN_SAMPLES = 5
+
+
+def backoff_ms(attempt: int) -> float:
+    # Mirrors the router's sleep after a failed, retryable attempt.
+    return min(2**attempt, 7) * 1000.0
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+@dataclass
+class AttemptModel:
+    ok_ms: List[float]
+    fail_ms: List[float]
+    p_fail: float
+    source: str
+
+    def sample(self, rng: random.Random, timeout_ms: float) -> Tuple[float, bool]:
+        if self.fail_ms and rng.random() < self.p_fail:
+            return min(rng.choice(self.fail_ms), timeout_ms), False
+        ms = rng.choice(self.ok_ms)
+        if ms > timeout_ms:
+            return timeout_ms, False
+        return ms, True
+
+    def expected(self, timeout_ms: float, max_retries: int) -> Tuple[float, float]:
+        """(expected ms including retries and backoff, probability that the task ends done)."""
+        ok = [min(v, timeout_ms) for v in self.ok_ms]
+        p_timeout = sum(1 for v in self.ok_ms if v > timeout_ms) / len(self.ok_ms)
+        p_fail = self.p_fail if self.fail_ms else 0.0
+        q = p_fail + (1 - p_fail) * p_timeout
+        mean_fail = sum(min(v, timeout_ms) for v in self.fail_ms) / len(self.fail_ms) if self.fail_ms else timeout_ms
+        mean_attempt = (1 - p_fail) * sum(ok) / len(ok) + p_fail * mean_fail
+        total = 0.0
+        for k in range(1, max(1, max_retries) + 1):
+            reach = q ** (k - 1)
+            total += reach * (mean_attempt + (backoff_ms(k - 1) if k > 1 else 0.0))
+        return total, 1 - q ** max(1, max_retries)
+
+
+class History:
+    """Per-attempt service times, failure and retry rates per (target, assign) from the processed index.
+
+    Successful attempt times come from records done on their first attempt (exec_ms is that attempt);
+    failed attempt times are the per-attempt mean of error records.
+    """
+
+    def __init__(self) -> None:
+        self.ok: Dict[Tuple[str, str], List[float]] = {}
+        self.fail: Dict[Tuple[str, str], List[float]] = {}
+        self.attempts: Dict[Tuple[str, str], List[int]] = {}
+        # records, first attempt failed, retry attempts made, records done on a retry
+        self.retries: Dict[Tuple[str, str], List[int]] = {}
+        self.done: Set[TaskRef] = set()
+        self.failed: Set[TaskRef] = set()
+
+    @classmethod
+    def from_index(cls, idx: Dict[str, Any], since: float | None = None) -> "History":
+        hist = cls()
+        for row in iter_rows(idx):
+            ref = (row["thread"], row["task"])
+            (hist.done if row["status"] == "done" else hist.failed).add(ref)
+            if since is not None and (row["at"] is None or row["at"] < since):
+                continue
+            n = row["attempts"]
+            if row["exec_ms"] is None or not n:
+                continue
+            done = row["status"] == "done"
+            for key in ((row["target"], row["assign"]), (row["target"], "*")):
+                counts = hist.attempts.setdefault(key, [0, 0])
+                counts[0] += 1 if done else 0
+                counts[1] += n - 1 if done else n
+                retry = hist.retries.setdefault(key, [0, 0, 0, 0])
+                retry[0] += 1
+                retry[1] += 1 if n > 1 or not done else 0
+                retry[2] += n - 1
+                retry[3] += 1 if done and n > 1 else 0
+                if done and n == 1:
+                    hist.ok.setdefault(key, []).append(float(row["exec_ms"]))
+                elif not done:
+                    hist.fail.setdefault(key, []).append(row["exec_ms"] / n)
+        return hist
+
+    def _key(self, target: str, assign: str, min_samples: int) -> Tuple[str, str] | None:
+        for key in ((target, assign), (target, "*")):
+            if len(self.ok.get(key, [])) >= min_samples:
+                return key
+        return None
+
+    def model(self, target: str, assign: str) -> AttemptModel:
+        key = self._key(target, assign, MIN_SAMPLES)
+        if key is not None:
+            ok = self.ok[key]
+            good, bad = self.attempts[key]
+            return AttemptModel(ok, self.fail.get(key, []), bad / (good + bad), f"{key[0]}/{key[1]} n={len(ok)}")
+        return AttemptModel([DEFAULT_ATTEMPT_MS.get(target, 60000.0)], [], 0.0, f"{target} default")
+
+    def tune(self, target: str, assign: str, want_timeout: bool, want_retries: bool) -> Dict[str, Any]:
+        """Values for `timeout_s: auto` / `max_retries: auto`; keys are absent when history is too thin."""
+        min_samples = int(_env_float("BRIDGE_AUTO_MIN_SAMPLES", 20))
+        key = self._key(target, assign, max(1, min_samples))
+        if key is None:
+            return {"basis": f"{target}/{assign}:default"}
+        out: Dict[str, Any] = {"basis": f"{key[0]}/{key[1]}", "n": len(self.ok[key])}
+        if want_timeout:
+            p99 = percentile(self.ok[key], 0.99) or 0.0
+            margin = _env_float("BRIDGE_AUTO_TIMEOUT_MARGIN", 1.5)
+            lo = _env_float("BRIDGE_AUTO_TIMEOUT_MIN_S", 60)
+            hi = _env_float("BRIDGE_AUTO_TIMEOUT_MAX_S", 1800)
+            out["p99_ms"] = int(p99)
+            out["timeout_s"] = int(min(hi, max(lo, p99 * margin / 1000.0)))
+        if want_retries:
+            records, first_fail, retry_attempts, retry_done = self.retries[key]
+            f1 = first_fail / records
+            out["first_fail"] = round(f1, 3)
+            cap = max(1, int(_env_float("BRIDGE_AUTO_RETRIES_MAX", 4)))
+            goal = _env_float("BRIDGE_AUTO_FAIL_TARGET", 0.02)
+            if not retry_attempts:
+                # Failures never got a retry, so there is no evidence either way; keep the submit default.
+                out["max_retries"] = min(cap, 3) if f1 > goal else 1
+                return out
+            r = retry_done / retry_attempts
+            out["retry_success"] = round(r, 3)
+            # Add attempts while the chance that all of them fail stays above the goal and retries still pay off.
+            n, p_all_fail = 1, f1
+            while p_all_fail > goal and n < cap and r >= 0.05:
+                p_all_fail *= 1 - r
+                n += 1
+            out["max_retries"] = n
+        return out
+
+    def limits(self, meta: Dict[str, Any], target: str) -> Tuple[int, int, Dict[str, Any] | None]:
+        """(timeout_s, max_retries, tuning record or None when neither field is auto)."""
+        want_timeout, want_retries = is_auto(meta.get("timeout_s")), is_auto(meta.get("max_retries"))
+        if not want_timeout and not want_retries:
+            return int(meta.get("timeout_s", 240)), int(meta.get("max_retries", 1)), None
+        tuned = self.tune(target, str(meta.get("assign") or ""), want_timeout, want_retries)
+        # Thin history falls back to the submit_work defaults.
+        timeout_s = tuned.setdefault("timeout_s", 240) if want_timeout else int(meta.get("timeout_s", 240))
+        max_retries = tuned.setdefault("max_retries", 3) if want_retries else int(meta.get("max_retries", 1))
+        return int(timeout_s), int(max_retries), tuned
+
+
+class AutoTuner:
+    """Caches one History per index for BRIDGE_AUTO_REFRESH_S so `auto` work does not rescan it per task."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._history: History | None = None
+        self._built = 0.0
+
+    def history(self, idx: Dict[str, Any], idx_lock: threading.Lock) -> History:
+        with self._lock:
+            if self._history is None or time.monotonic() - self._built > _env_float("BRIDGE_AUTO_REFRESH_S", 300):
+                with idx_lock:
+                    snapshot = {"processed": dict(idx.get("processed", {}))}
+                self._history = History.from_index(snapshot)
+                self._built = time.monotonic()
+            return self._history
+
+    def resolve(
+        self,
+        idx: Dict[str, Any],
+        idx_lock: threading.Lock,
+        meta: Dict[str, Any],
+        target: str,
+    ) -> Tuple[int, int, Dict[str, Any] | None]:
+        if not is_auto(meta.get("timeout_s")) and not is_auto(meta.get("max_retries")):
+            return int(meta.get("timeout_s", 240)), int(meta.get("max_retries", 1)), None
+        return self.history(idx, idx_lock).limits(meta, target)
+
+
+AUTO_TUNER = AutoTuner()
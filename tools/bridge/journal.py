@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict
+
+from common import ensure_dir, fsync_mode, now_utc_iso
+
+JOURNAL_NAME = "journal.jsonl"
+
+
+@dataclass
+class JournalEntry:
+    name: str
+    key: str = ""
+    claimed_at: str = ""
+    attempts: int = 0
+    completed: bool = False
+    status: str = ""
+    output: str = ""
+
+
+class Journal:
+    """Append-only write-ahead log of claim/attempt/complete events per inprogress file."""
+
+    def __init__(self, state_dir: Path) -> None:
+        self.path = state_dir / JOURNAL_NAME
+        self._lock = threading.Lock()
+        ensure_dir(state_dir)
+
+    def _append(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(line)
+                fh.flush()
+                if fsync_mode() != "off":
+                    os.fsync(fh.fileno())
+
+    def claim(self, name: str) -> None:
+        self._append({"ev": "claim", "name": name, "at": now_utc_iso()})
+
+    def attempt(self, name: str, key: str, attempt: int) -> None:
+        self._append({"ev": "attempt", "name": name, "key": key, "n": attempt, "at": now_utc_iso()})
+
+    def complete(self, name: str, status: str, output: str) -> None:
+        self._append({"ev": "complete", "name": name, "status": status, "output": output, "at": now_utc_iso()})
+
+    def replay(self) -> Dict[str, JournalEntry]:
+        return replay_journal(self.path)
+
+    def reset(self) -> None:
+        with self._lock:
+            with self.path.open("w", encoding="utf-8") as fh:
+                fh.flush()
+                os.fsync(fh.fileno())
+
+
+def replay_journal(path: Path) -> Dict[str, JournalEntry]:
+    entries: Dict[str, JournalEntry] = {}
+    if not path.exists():
+        return entries
+    with path.open("r", encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave the final line half-written; everything before it is intact.
+                continue
+            name = str(event.get("name", ""))
+            if not name:
+                continue
+            ev = event.get("ev")
+            entry = entries.get(name)
+            if ev == "claim" or entry is None:
+                entry = JournalEntry(name=name, claimed_at=str(event.get("at", "")))
+                entries[name] = entry
+            if ev == "attempt":
+                entry.key = str(event.get("key", entry.key))
+                entry.attempts = max(entry.attempts, int(event.get("n", 0) or 0))
+            elif ev == "complete":
+                entry.completed = True
+                entry.status = str(event.get("status", ""))
+                entry.output = str(event.get("output", ""))
+    return entries
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import gzip
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from common import ALLOWED_TARGET_AGENTS, load_json, read_frontmatter, slugify
+
+LAYOUT_PRESETS = {
+    "flat": "",
+    "date": "{yyyy}/{mm}/{dd}",
+    "date-thread": "{yyyy}/{mm}/{dd}/{thread}",
+    "thread-date": "{thread}/{yyyy}/{mm}/{dd}",
+}
+
+STAMP_RE = re.compile(r"^(\d{8}T\d{6}Z)_")
+# Names join thread and task ids with `_`, which ids may contain too; these guesses are only a fallback for
+# doc_ids/log_ids when the frontmatter or the processed index has nothing.
+DOC_NAME_RE = re.compile(r"^(\d{8}T\d{6}Z)_(.+?)_([^_]+)_from_([a-z]+)\.(result|error)\.md$")
+LOG_NAME_RE = re.compile(r"^(\d{8}T\d{6}Z)_(.+?)_([^_]+)(?:_\d{3})?_to_([a-z]+)\.work\.attempt\d+\.")
+# `<segment path>@<offset>+<length>`: where archive.py pack points processed_index outputs and search rows.
+LOCATOR_RE = re.compile(r"^(.+\.gz)@(\d+)\+(\d+)$")
+
+
+def layout_pattern(value: str | None = None) -> str:
+    raw = (value if value is not None else os.environ.get("BRIDGE_LAYOUT", "flat")).strip()
+    if raw in LAYOUT_PRESETS:
+        return LAYOUT_PRESETS[raw]
+    return raw.strip("/")
+
+
+def _stamp_datetime(stamp: str | None) -> datetime:
+    if stamp:
+        try:
+            return datetime.strptime(stamp, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    return datetime.now(timezone.utc)
+
+
+def shard_dir(base: Path, thread_id: object, stamp: str | None = None, pattern: str | None = None) -> Path:
+    pattern = layout_pattern() if pattern is None else pattern
+    if not pattern:
+        return base
+    when = _stamp_datetime(stamp)
+    rel = pattern.format(
+        yyyy=f"{when.year:04d}",
+        mm=f"{when.month:02d}",
+        dd=f"{when.day:02d}",
+        thread=slugify(thread_id, fallback="thread"),
+    )
+    return base / rel
+
+
+def parse_doc_name(name: str) -> Tuple[str, str, str] | None:
+    m = DOC_NAME_RE.match(name)
+    if not m:
+        return None
+    return m.group(1), m.group(2), m.group(3)
+
+
+def parse_log_name(name: str) -> Tuple[str, str, str] | None:
+    m = LOG_NAME_RE.match(name)
+    if not m:
+        return None
+    return m.group(1), m.group(2), m.group(3)
+
+
+def doc_ids(path: Path) -> Tuple[str, str, str] | None:
+    """(stamp, thread_id, task_id) of a result/error doc, ids taken from its frontmatter."""
+    parsed = parse_doc_name(path.name)
+    if parsed is None:
+        return None
+    try:
+        meta = read_frontmatter(path)
+    except (OSError, ValueError):
+        return parsed
+    if meta.get("thread_id") is None or meta.get("task_id") is None:
+        return parsed
+    return parsed[0], str(meta["thread_id"]), str(meta["task_id"])
+
+
+def work_ids(state_dir: Path) -> Dict[str, Tuple[str, str]]:
+    """Work-file stem -> (thread_id, task_id) for every work file the processed index recorded as a source."""
+    out: Dict[str, Tuple[str, str]] = {}
+    for key, rec in load_processed(state_dir).items():
+        parts = key.rsplit("::", 2)
+        if len(parts) != 3 or not isinstance(rec, dict) or not rec.get("source"):
+            continue
+        out[Path(str(rec["source"])).stem] = (parts[0], parts[1])
+    return out
+
+
+def log_ids(name: str, works: Dict[str, Tuple[str, str]]) -> Tuple[str, str, str] | None:
+    """(stamp, thread_id, task_id) of an attempt log, ids looked up by its work-file stem in works."""
+    parsed = parse_log_name(name)
+    if parsed is None:
+        return None
+    hit = works.get(name.split(".attempt", 1)[0])
+    return (parsed[0], *hit) if hit else parsed
+
+
+def thread_glob(pattern: str, thread_id: object) -> str:
+    # Date placeholders become wildcards so only the directories of one thread are listed.
+    return pattern.format(yyyy="*", mm="*", dd="*", thread=slugify(thread_id, fallback="thread"))
+
+
+def iter_docs(base: Path, name_glob: str, thread_id: object | None = None, pattern: str | None = None) -> Iterator[Path]:
+    pattern = layout_pattern() if pattern is None else pattern
+    # Flat files from before a layout switch stay readable until migrate_layout.py moves them.
+    yield from base.glob(name_glob)
+    if not pattern:
+        return
+    if thread_id is not None and "{thread}" in pattern:
+        shard_glob = thread_glob(pattern, thread_id)
+    else:
+        shard_glob = pattern.format(yyyy="*", mm="*", dd="*", thread="*")
+    yield from base.glob(f"{shard_glob}/{name_glob}")
+
+
+_PROCESSED_CACHE: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+_PROCESSED_LOCK = threading.Lock()
+
+
+def load_processed(state_dir: Path) -> Dict[str, Any]:
+    """The index's `processed` map, parsed again only when the file's inode, mtime or size changes.
+
+    submit_work --wait looks up every pending task on every poll; read-only callers share the parsed dict.
+    """
+    path = state_dir / "processed_index.json"
+    try:
+        st = path.stat()
+    except OSError:
+        return {}
+    sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+    key = str(path)
+    with _PROCESSED_LOCK:
+        hit = _PROCESSED_CACHE.get(key)
+        if hit is not None and hit[0] == sig:
+            return hit[1]
+    idx = load_json(path, default={"processed": {}})
+    processed = idx.get("processed", {}) if isinstance(idx, dict) else {}
+    with _PROCESSED_LOCK:
+        _PROCESSED_CACHE[key] = (sig, processed)
+    return processed
+
+
+def lookup_outputs(state_dir: Path, thread_id: str, task_id: str) -> List[Dict[str, Any]]:
+    processed = load_processed(state_dir)
+    found: List[Dict[str, Any]] = []
+    for target in sorted(ALLOWED_TARGET_AGENTS):
+        rec = processed.get(f"{thread_id}::{task_id}::{target}")
+        if isinstance(rec, dict):
+            found.append({"target": target, **rec})
+    return found
+
+
+def read_segment_member(segment: Path, offset: int, length: int) -> bytes:
+    with segment.open("rb") as fh:
+        fh.seek(offset)
+        member = fh.read(length)
+    return gzip.decompress(member)
+
+
+def read_locator(value: object) -> bytes | None:
+    """A packed doc's bytes, or None when value is not an archive locator."""
+    m = LOCATOR_RE.match(str(value or ""))
+    if not m:
+        return None
+    return read_segment_member(Path(m.group(1)), int(m.group(2)), int(m.group(3)))
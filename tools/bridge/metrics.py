@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from common import write_text
+
+LATENCY_BUCKETS_S = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 240, 600, 1800, 3600)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+HELP = {
+    "bridge_queue_depth": ("gauge", "Work files waiting per bridge queue directory."),
+    "bridge_claims_total": ("counter", "Work files claimed from inbox."),
+    "bridge_claim_rate_per_second": ("gauge", "Claims per second over the last tick."),
+    "bridge_attempts_total": ("counter", "Worker attempts started."),
+    "bridge_tasks_total": ("counter", "Work items finished by final status."),
+    "bridge_errors_total": ("counter", "Work items finished with an error, by error_code."),
+    "bridge_tokens_total": ("counter", "Model tokens and turns reported by workers, by kind."),
+    "bridge_ticks_total": ("counter", "Router ticks run."),
+    "bridge_last_tick_timestamp_seconds": ("gauge", "Unix time of the last finished tick."),
+    "bridge_queue_wait_seconds": ("histogram", "created_at to worker pick-up."),
+    "bridge_exec_seconds": ("histogram", "Worker subprocess time summed over attempts."),
+    "bridge_e2e_seconds": ("histogram", "created_at to final result/error write."),
+}
+
+
+def _labels(labels: Dict[str, object] | None) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Tuple[str, str] | None = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_S) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def inc(self, name: str, labels: Dict[str, object] | None = None, value: float = 1) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, labels: Dict[str, object] | None = None) -> None:
+        with self._lock:
+            self.gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def add(self, name: str, value: float, labels: Dict[str, object] | None = None) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self.gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Dict[str, object] | None = None) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram()
+            hist.observe(value)
+
+    def render(self) -> str:
+        out: List[str] = []
+        with self._lock:
+            names = sorted(set(self.counters) | set(self.gauges) | set(self.histograms))
+            for name in names:
+                kind, text = HELP.get(name, ("untyped", name))
+                out.append(f"# HELP {name} {text}")
+                out.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(self.counters.get(name, {}).items()):
+                    out.append(f"{name}{_fmt_labels(key)} {_fmt_value(value)}")
+                for key, value in sorted(self.gauges.get(name, {}).items()):
+                    out.append(f"{name}{_fmt_labels(key)} {_fmt_value(value)}")
+                for key, hist in sorted(self.histograms.get(name, {}).items()):
+                    for upper, count in zip(hist.buckets, hist.counts):
+                        out.append(f"{name}_bucket{_fmt_labels(key, ('le', _fmt_value(upper)))} {count}")
+                    out.append(f"{name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {hist.count}")
+                    out.append(f"{name}_sum{_fmt_labels(key)} {_fmt_value(round(hist.sum, 6))}")
+                    out.append(f"{name}_count{_fmt_labels(key)} {hist.count}")
+        return "\n".join(out) + "\n"
+
+    def write(self, path: Path) -> None:
+        write_text(path, self.render())
+
+
+REGISTRY = Metrics()
+
+
+def seconds_since(iso: object, now: datetime | None = None) -> float | None:
+    try:
+        then = datetime.fromisoformat(str(iso))
+    except (TypeError, ValueError):
+        return None
+    if then.tzinfo is None:
+        then = then.replace(tzinfo=timezone.utc)
+    delta = ((now or datetime.now(timezone.utc)) - then).total_seconds()
+    return max(0.0, delta)
+
+
+def serve_metrics(port: int, registry: Metrics = REGISTRY, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path.split("?", 1)[0] not in {"/metrics", "/"}:
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            return
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="bridge-metrics", daemon=True).start()
+    return server
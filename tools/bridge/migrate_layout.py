@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from common import ensure_dir, load_json, save_json
+from layout import doc_ids, layout_pattern, log_ids, shard_dir, STAMP_RE, work_ids
+from router import acquire_router_lock, bridge_dirs
+
+
+def repo_root_from_here() -> Path:
+    return Path(__file__).resolve().parents[2]
+
+
+def plan_moves(base: Path, pattern: str, works: Dict[str, Tuple[str, str]] | None) -> List[Tuple[Path, Path]]:
+    moves: List[Tuple[Path, Path]] = []
+    with os.scandir(base) as it:
+        for entry in it:
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            # Docs carry their ids in the frontmatter; logs (works given) are matched to their work file.
+            parsed = log_ids(entry.name, works) if works is not None else doc_ids(Path(entry.path))
+            if parsed is not None:
+                stamp, thread_id, _ = parsed
+            else:
+                m = STAMP_RE.match(entry.name)
+                if not m:
+                    continue
+                stamp, thread_id = m.group(1), None
+            dst = shard_dir(base, thread_id, stamp, pattern) / entry.name
+            if dst != Path(entry.path):
+                moves.append((Path(entry.path), dst))
+    return moves
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Move flat bridge done/error/logs files into the sharded layout.")
+    parser.add_argument("--layout", default=None, help="flat|date|date-thread|thread-date 또는 패턴 (기본: BRIDGE_LAYOUT)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    pattern = layout_pattern(args.layout)
+    if not pattern:
+        print("[migrate] layout is flat; nothing to do")
+        return 0
+
+    dirs = bridge_dirs(repo_root_from_here())
+    ensure_dir(dirs["locks"])
+    lock = acquire_router_lock(dirs)
+    if lock is None:
+        print("[migrate] router is running; stop it before migrating")
+        return 1
+
+    base = dirs["base"]
+    works = work_ids(dirs["state"])
+    renamed: Dict[str, str] = {}
+    for name, is_log in (("done", False), ("error", False), ("logs", True)):
+        src_dir = base / name
+        if not src_dir.is_dir():
+            continue
+        moves = plan_moves(src_dir, pattern, works if is_log else None)
+        for src, dst in moves:
+            if args.dry_run:
+                print(f"[dry-run] {src} -> {dst}")
+                continue
+            ensure_dir(dst.parent)
+            os.replace(src, dst)
+            renamed[str(src)] = str(dst)
+        print(f"[migrate] {name}: moved={len(moves)}")
+
+    if renamed:
+        idx_path = base / "state" / "processed_index.json"
+        idx = load_json(idx_path, default={"processed": {}})
+        updated = 0
+        for rec in idx.get("processed", {}).values():
+            if isinstance(rec, dict) and rec.get("output") in renamed:
+                rec["output"] = renamed[rec["output"]]
+                updated += 1
+        if updated:
+            save_json(idx_path, idx)
+        print(f"[migrate] index outputs updated={updated}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
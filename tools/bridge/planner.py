@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import heapq
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+from common import parse_depends_on
+from history import AttemptModel, History, backoff_ms
+from stats import percentile
+
+TaskRef = Tuple[str, str]
+
+
+@dataclass
+class SimTask:
+    ref: TaskRef
+    target: str
+    assign: str
+    timeout_ms: float
+    max_retries: int
+    deps: List[TaskRef]
+    order: Tuple[float, str]
+    followup: Tuple[str, float, int] | None = None
+    blocked: bool = False
+
+
+def tasks_from_metas(metas: Sequence[Dict[str, Any]], history: History) -> List[SimTask]:
+    """Simulation tasks for submitted metas; `auto` limits resolve from history the way the router would."""
+    tasks: List[SimTask] = []
+    for i, meta in enumerate(metas):
+        thread_id = str(meta["thread_id"])
+        task_id = str(meta.get("task_id") or f"auto{i + 1:04d}")
+        target = str(meta["to"])
+        timeout_s, max_retries, _ = history.limits(meta, target)
+        followup = None
+        if target == "gemini":
+            codex_meta = {
+                "assign": str(meta.get("codex_assign") or "@직원2"),
+                "timeout_s": meta.get("codex_timeout_s", meta["timeout_s"]),
+                "max_retries": meta.get("codex_max_retries", meta["max_retries"]),
+            }
+            codex_timeout_s, codex_retries, _ = history.limits(codex_meta, "codex")
+            followup = (codex_meta["assign"], codex_timeout_s * 1000.0, codex_retries)
+        tasks.append(
+            SimTask(
+                ref=(thread_id, task_id),
+                target=target,
+                assign=str(meta["assign"]),
+                timeout_ms=timeout_s * 1000.0,
+                max_retries=max_retries,
+                deps=parse_depends_on(meta.get("depends_on"), thread_id),
+                order=(0.0, f"{thread_id}_{task_id}_to_{target}"),
+                followup=followup,
+            )
+        )
+    return tasks
+
+
+def run_task(task: SimTask, model: AttemptModel, rng: random.Random) -> Tuple[float, bool]:
+    total = 0.0
+    for attempt in range(1, max(1, task.max_retries) + 1):
+        ms, ok = model.sample(rng, task.timeout_ms)
+        total += ms
+        if ok:
+            return total, True
+        if attempt < task.max_retries:
+            total += backoff_ms(attempt)
+    return total, False
+
+
+def simulate(
+    tasks: Sequence[SimTask],
+    history: History,
+    workers: int,
+    rng: random.Random,
+    interval_ms: float,
+) -> Dict[str, Any]:
+    """One run of the router policy: ticks claim ready work, a FIFO pool of `workers` slots runs it, and
+    finishing prerequisites release held dependents (and the follow-ups they wait on) inside the tick."""
+    status: Dict[TaskRef, str] = {}
+    planned = {t.ref for t in tasks}
+    # Unfinished work files per (thread, task): queued in the inbox, waiting for a slot or running.
+    pending: Dict[TaskRef, int] = {}
+    for t in tasks:
+        pending[t.ref] = pending.get(t.ref, 0) + 1
+    inbox: Dict[int, SimTask] = {id(t): t for t in sorted(tasks, key=lambda t: t.order)}
+    now = busy = last_finish = 0.0
+    ticks = 0
+
+    def state(dep: TaskRef) -> str:
+        # Prerequisites outside the plan are judged by what the index already recorded.
+        if dep not in planned:
+            return "failed" if dep in history.failed else "done" if dep in history.done else "wait"
+        if status.get(dep) == "error":
+            return "failed"
+        return "done" if dep in status and not pending.get(dep) else "wait"
+
+    def ready(t: SimTask) -> bool:
+        states = [state(d) for d in t.deps if d != t.ref]
+        t.blocked = "failed" in states
+        return t.blocked or "wait" not in states
+
+    while inbox:
+        ticks += 1
+        queue = [t for t in inbox.values() if ready(t)]
+        if not queue:
+            break
+        for t in queue:
+            del inbox[id(t)]
+        waiters: Dict[TaskRef, List[SimTask]] = {}
+        for t in inbox.values():
+            for d in t.deps:
+                waiters.setdefault(d, []).append(t)
+        running: List[Tuple[float, int, SimTask, bool]] = []
+        seq = 0
+        free = max(1, workers)
+        while queue or running:
+            while free and queue:
+                t = queue.pop(0)
+                if t.blocked:
+                    ms, ok = 0.0, False
+                else:
+                    ms, ok = run_task(t, history.model(t.target, t.assign), rng)
+                busy += ms
+                seq += 1
+                heapq.heappush(running, (now + ms, seq, t, ok))
+                free -= 1
+            if not running:
+                break
+            now, _, t, ok = heapq.heappop(running)
+            free += 1
+            pending[t.ref] -= 1
+            status[t.ref] = "error" if not ok or status.get(t.ref) == "error" else "done"
+            followup = None
+            if ok and t.followup is not None:
+                assign, timeout_ms, retries = t.followup
+                followup = SimTask(t.ref, "codex", assign, timeout_ms, retries, [], (now, f"{t.ref[0]}_{t.ref[1]}_to_codex"))
+                pending[t.ref] += 1
+                inbox[id(followup)] = followup
+            # Only a finishing prerequisite of held work can release anything; its follow-up is claimed with it.
+            if t.ref in waiters:
+                candidates = ([followup] if followup is not None else []) + [w for w in waiters[t.ref] if id(w) in inbox]
+                released = sorted((w for w in candidates if ready(w)), key=lambda w: w.order)
+                for w in released:
+                    del inbox[id(w)]
+                queue.extend(released)
+        last_finish = now
+        if inbox:
+            now += interval_ms
+    return {
+        "makespan_ms": last_finish,
+        "busy_ms": busy,
+        "ticks": ticks,
+        "errors": sum(1 for v in status.values() if v == "error"),
+        "unresolved": [f"{t.ref[0]}::{t.ref[1]}" for t in inbox.values()],
+    }
+
+
+def critical_path(tasks: Sequence[SimTask], history: History) -> Tuple[float, List[str], Dict[TaskRef, float]]:
+    """Longest expected-duration chain through depends_on, plus the expected work per task."""
+    by_ref: Dict[TaskRef, SimTask] = {t.ref: t for t in tasks}
+    cost: Dict[TaskRef, float] = {}
+    for t in tasks:
+        ms, _ = history.model(t.target, t.assign).expected(t.timeout_ms, t.max_retries)
+        if t.followup is not None:
+            assign, timeout_ms, retries = t.followup
+            ms += history.model("codex", assign).expected(timeout_ms, retries)[0]
+        cost[t.ref] = ms
+    finish: Dict[TaskRef, Tuple[float, List[str]]] = {}
+    visiting: Set[TaskRef] = set()
+
+    def longest(ref: TaskRef) -> Tuple[float, List[str]]:
+        if ref in finish:
+            return finish[ref]
+        if ref in visiting or ref not in by_ref:
+            return 0.0, []
+        visiting.add(ref)
+        best: Tuple[float, List[str]] = (0.0, [])
+        for dep in by_ref[ref].deps:
+            cand = longest(dep)
+            if cand[0] > best[0]:
+                best = cand
+        visiting.discard(ref)
+        finish[ref] = (best[0] + cost[ref], best[1] + [f"{ref[0]}::{ref[1]}"])
+        return finish[ref]
+
+    path: Tuple[float, List[str]] = (0.0, [])
+    for ref in by_ref:
+        cand = longest(ref)
+        if cand[0] > path[0]:
+            path = cand
+    return path[0], path[1], cost
+
+
+def plan_report(
+    tasks: Sequence[SimTask],
+    history: History,
+    worker_counts: Sequence[int],
+    runs: int,
+    interval_ms: float,
+    seed: int,
+) -> Dict[str, Any]:
+    cp_ms, cp_path, cost = critical_path(tasks, history)
+    models = {}
+    for t in tasks:
+        for target, assign in [(t.target, t.assign)] + ([("codex", t.followup[0])] if t.followup else []):
+            m = history.model(target, assign)
+            models[f"{target}/{assign}"] = {
+                "source": m.source,
+                "p_fail": round(m.p_fail, 3),
+                "attempt_p50_ms": percentile(m.ok_ms, 0.5),
+                "attempt_p95_ms": percentile(m.ok_ms, 0.95),
+            }
+    rows = []
+    unresolved: List[str] = []
+    for workers in worker_counts:
+        rng = random.Random(seed)
+        spans: List[float] = []
+        utils: List[float] = []
+        errors: List[int] = []
+        for _ in range(max(1, runs)):
+            run = simulate(tasks, history, workers, rng, interval_ms)
+            spans.append(run["makespan_ms"])
+            utils.append(run["busy_ms"] / (workers * run["makespan_ms"]) if run["makespan_ms"] else 0.0)
+            errors.append(run["errors"])
+            unresolved = run["unresolved"]
+        rows.append(
+            {
+                "workers": workers,
+                "makespan_ms": {
+                    "mean": round(sum(spans) / len(spans), 1),
+                    "p50": percentile(spans, 0.5),
+                    "p90": percentile(spans, 0.9),
+                    "p99": percentile(spans, 0.99),
+                },
+                "utilization": round(sum(utils) / len(utils), 3),
+                "expected_errors": round(sum(errors) / len(errors), 2),
+            }
+        )
+    # Work that can never be claimed (missing prerequisite, cycle) is left out of the bound.
+    work_ms = sum(ms for ref, ms in cost.items() if f"{ref[0]}::{ref[1]}" not in unresolved)
+    for row in rows:
+        row["lower_bound_ms"] = round(max(cp_ms, work_ms / row["workers"]), 1)
+    return {
+        "tasks": len(tasks),
+        "runs": runs,
+        "critical_path": {"expected_ms": round(cp_ms, 1), "tasks": cp_path},
+        "expected_work_ms": round(work_ms, 1),
+        "models": models,
+        "workers": rows,
+        "unresolved": unresolved,
+    }
+
+
+def _fmt_s(ms: float | None) -> str:
+    return "-" if ms is None else f"{ms / 1000.0:.1f}s"
+
+
+def render_report(report: Dict[str, Any]) -> str:
+    cp = report["critical_path"]
+    lines = [
+        f"tasks={report['tasks']} runs={report['runs']} expected_work={_fmt_s(report['expected_work_ms'])} "
+        f"critical_path={_fmt_s(cp['expected_ms'])} ({len(cp['tasks'])} tasks)",
+        f"critical path: {' -> '.join(cp['tasks']) or '-'}",
+        "",
+        "models:",
+    ]
+    for name, m in sorted(report["models"].items()):
+        lines.append(
+            f"  {name:<16} p_fail={m['p_fail']:<6} attempt_p50={_fmt_s(m['attempt_p50_ms'])} "
+            f"attempt_p95={_fmt_s(m['attempt_p95_ms'])} ({m['source']})"
+        )
+    lines += ["", f"{'workers':>7}  {'mean':>8}  {'p50':>8}  {'p90':>8}  {'p99':>8}  {'bound':>8}  {'util':>5}  {'errors':>6}"]
+    for row in report["workers"]:
+        span = row["makespan_ms"]
+        lines.append(
+            f"{row['workers']:>7}  {_fmt_s(span['mean']):>8}  {_fmt_s(span['p50']):>8}  {_fmt_s(span['p90']):>8}  "
+            f"{_fmt_s(span['p99']):>8}  {_fmt_s(row['lower_bound_ms']):>8}  {row['utilization']:>5.2f}  "
+            f"{row['expected_errors']:>6}"
+        )
+    if report["unresolved"]:
+        lines.append(f"unresolved (missing prerequisite or cycle): {', '.join(report['unresolved'][:10])}")
+    return "\n".join(lines)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import cProfile
+import heapq
+import io
+import json
+import linecache
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from common import ensure_dir, now_utc_iso, now_utc_stamp, write_text
+
+PROFILE_MODES = ("cprofile", "tracemalloc", "slow")
+# From 3.12 cProfile sits on sys.monitoring: one active profile per process, and it sees every thread.
+PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.environ.get(name, str(default))))
+    except ValueError:
+        return default
+
+
+def parse_modes(value: str | None) -> Set[str]:
+    raw = (value or "").strip().lower()
+    if raw in {"", "0", "off", "no", "false"}:
+        return set()
+    if raw in {"1", "all", "on", "yes", "true"}:
+        return set(PROFILE_MODES)
+    return {m.strip() for m in raw.split(",") if m.strip() in PROFILE_MODES}
+
+
+class Profiler:
+    """Collects per-window cProfile/tracemalloc/slow-call dumps; every hook is a set check when disabled."""
+
+    def __init__(self) -> None:
+        self.modes: Set[str] = set()
+        self.out_dir: Path | None = None
+        self._lock = threading.Lock()
+        self._profiles: List[cProfile.Profile] = []
+        self._slow: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._seq = 0
+        self._flushes = 0
+        self._tick_thread: int | None = None
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._ticks = 0
+        self._tasks = 0
+        self.every_ticks = 1
+        self.every_tasks = 0
+        self.slow_top = 10
+        self.keep = 20
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.modes)
+
+    def start(self, out_dir: Path, modes: Set[str]) -> None:
+        self.modes = set(modes)
+        if not self.modes:
+            return
+        self.out_dir = out_dir
+        ensure_dir(out_dir)
+        self.every_ticks = _env_int("BRIDGE_PROFILE_TICKS", 1)
+        self.every_tasks = _env_int("BRIDGE_PROFILE_TASKS", 0)
+        self.slow_top = max(1, _env_int("BRIDGE_PROFILE_SLOW_TOP", 10))
+        self.keep = max(1, _env_int("BRIDGE_PROFILE_KEEP", 20))
+        if "tracemalloc" in self.modes:
+            tracemalloc.start(_env_int("BRIDGE_PROFILE_TRACEMALLOC_FRAMES", 10) or 1)
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def stop(self) -> None:
+        if not self.modes:
+            return
+        if self._ticks or self._tasks:
+            self.flush()
+        if "tracemalloc" in self.modes:
+            tracemalloc.stop()
+        self.modes = set()
+
+    def _run_profiled(self, fn: Callable[[], Any]) -> Any:
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # Another profile already owns the process (3.12+); the call still runs, just unprofiled.
+            return fn()
+        try:
+            return fn()
+        finally:
+            prof.disable()
+            with self._lock:
+                self._profiles.append(prof)
+
+    def tick(self, fn: Callable[[], Any]) -> Any:
+        if not self.modes:
+            return fn()
+        if "cprofile" in self.modes:
+            self._tick_thread = threading.get_ident()
+            try:
+                result = self._run_profiled(fn)
+            finally:
+                self._tick_thread = None
+        else:
+            result = fn()
+        self._ticks += 1
+        if (self.every_ticks and self._ticks >= self.every_ticks) or (self.every_tasks and self._tasks >= self.every_tasks):
+            self.flush()
+        return result
+
+    def task(self, name: str, fn: Callable[[], Any], stages: Callable[[], Dict[str, int]]) -> Any:
+        if not self.modes:
+            return fn()
+        # Before 3.12 cProfile only sees the thread that enabled it, so pool workers get their own profile per
+        # task; from 3.12 the tick profile already covers every thread and a second one cannot be enabled.
+        if PROCESS_WIDE_CPROFILE:
+            own_profile = "cprofile" in self.modes and self._tick_thread is None
+        else:
+            own_profile = "cprofile" in self.modes and self._tick_thread != threading.get_ident()
+        started = time.monotonic()
+        try:
+            return self._run_profiled(fn) if own_profile else fn()
+        finally:
+            elapsed_ms = (time.monotonic() - started) * 1000.0
+            with self._lock:
+                self._tasks += 1
+                if "slow" in self.modes:
+                    self._seq += 1
+                    entry = {"file": name, "ms": int(elapsed_ms), "at": now_utc_iso(), "stages_ms": stages()}
+                    item = (elapsed_ms, self._seq, entry)
+                    if len(self._slow) < self.slow_top:
+                        heapq.heappush(self._slow, item)
+                    else:
+                        heapq.heappushpop(self._slow, item)
+
+    def flush(self) -> List[Path]:
+        if not self.modes or self.out_dir is None:
+            return []
+        with self._lock:
+            profiles, self._profiles = self._profiles, []
+            slow, self._slow = sorted(self._slow, reverse=True), []
+            ticks, tasks = self._ticks, self._tasks
+            self._ticks = self._tasks = 0
+        self._flushes += 1
+        stamp = f"{now_utc_stamp()}_{os.getpid()}_{self._flushes:04d}"
+        written: List[Path] = []
+
+        if "tracemalloc" in self.modes and tracemalloc.is_tracing():
+            # Taken before the pstats dump below, and with the profiler's own modules filtered out.
+            snap = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, f) for f in (tracemalloc.__file__, pstats.__file__, cProfile.__file__, linecache.__file__, __file__)]
+                + [tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+            )
+            current, peak = tracemalloc.get_traced_memory()
+            lines = [f"# ticks={ticks} tasks={tasks} current_kib={current // 1024} peak_kib={peak // 1024}"]
+            if self._snapshot is not None:
+                lines.append("## diff vs previous window (lineno)")
+                lines.extend(str(s) for s in snap.compare_to(self._snapshot, "lineno")[:25])
+            lines.append("## top allocations (traceback)")
+            for stat in snap.statistics("traceback")[:5]:
+                lines.append(str(stat))
+                lines.extend(f"    {line}" for line in stat.traceback.format()[-6:])
+            self._snapshot = snap
+            tracemalloc.reset_peak()
+            path = self.out_dir / f"tracemalloc_{stamp}.txt"
+            write_text(path, "\n".join(lines) + "\n")
+            written.append(path)
+
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for prof in profiles[1:]:
+                stats.add(prof)
+            path = self.out_dir / f"cprofile_{stamp}.pstats"
+            stats.dump_stats(str(path))
+            buf = io.StringIO()
+            pstats.Stats(str(path), stream=buf).sort_stats("cumulative").print_stats(40)
+            write_text(path.with_suffix(".txt"), f"# ticks={ticks} tasks={tasks}\n{buf.getvalue()}")
+            written.append(path)
+
+        if slow:
+            path = self.out_dir / f"slow_{stamp}.jsonl"
+            write_text(path, "".join(json.dumps(entry, ensure_ascii=False) + "\n" for _, _, entry in slow))
+            written.append(path)
+
+        for kind in ("cprofile_*.pstats", "cprofile_*.txt", "tracemalloc_*.txt", "slow_*.jsonl"):
+            rotate(self.out_dir, kind, self.keep)
+        for path in written:
+            print(f"[profile] wrote={path}")
+        return written
+
+
+def rotate(out_dir: Path, pattern: str, keep: int) -> int:
+    files = sorted(out_dir.glob(pattern), key=lambda p: p.name)
+    removed = 0
+    for old in files[: max(0, len(files) - keep)]:
+        try:
+            old.unlink()
+            removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+PROFILER = Profiler()
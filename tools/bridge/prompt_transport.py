@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import os
+import shlex
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+# Linux caps one argv element at MAX_ARG_STRLEN (128 KiB); stay clear of it and of the total ARG_MAX.
+DEFAULT_ARGV_MAX = 100_000
+# Gemini appends -p to whatever arrives on stdin, so a prompt sent on stdin needs a short trailing -p.
+GEMINI_STDIN_PROMPT = "위 입력의 지시에 따라 응답하세요."
+
+
+def prompt_argv_max() -> int:
+    try:
+        return max(1, int(os.environ.get("BRIDGE_PROMPT_ARGV_MAX", str(DEFAULT_ARGV_MAX))))
+    except ValueError:
+        return DEFAULT_ARGV_MAX
+
+
+def _too_big(prompt: str) -> bool:
+    return len(prompt.encode("utf-8")) > prompt_argv_max()
+
+
+@dataclass
+class PromptTransport:
+    """A worker command line plus how the prompt reaches it: argv, stdin, or a temp file."""
+
+    cmd: List[str]
+    mode: str = "argv"
+    stdin: str = ""
+    path: Path | None = None
+
+    def close(self) -> None:
+        if self.path is not None:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+            self.path = None
+
+
+def _temp_prompt(prompt: str) -> Path:
+    fd, name = tempfile.mkstemp(prefix="bridge-prompt-", suffix=".md")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(prompt)
+    return Path(name)
+
+
+def codex_transport(base: List[str], prompt: str) -> PromptTransport:
+    # `codex exec -` reads the prompt from stdin.
+    if _too_big(prompt):
+        return PromptTransport(base + ["-"], "stdin", prompt)
+    return PromptTransport(base + [prompt])
+
+
+def gemini_transport(gemini_bin: str, prompt: str, rest: List[str]) -> PromptTransport:
+    if _too_big(prompt):
+        return PromptTransport([gemini_bin, "-p", GEMINI_STDIN_PROMPT, *rest], "stdin", prompt)
+    return PromptTransport([gemini_bin, "-p", prompt, *rest])
+
+
+def custom_transport(template: str, prompt: str) -> PromptTransport:
+    """BRIDGE_*_CMD: `{prompt_file}` always gets a temp file path; a large `{prompt}` becomes `-` plus stdin."""
+    parts = shlex.split(template)
+    if "{prompt_file}" in template:
+        path = _temp_prompt(prompt)
+        cmd = [p.replace("{prompt_file}", str(path)) for p in parts]
+        stdin = ""
+        if "{prompt}" in template:
+            # Only a `{prompt}` that became `-` needs the prompt on stdin as well; the file already carries it.
+            stdin = prompt if _too_big(prompt) else ""
+            cmd = [p.replace("{prompt}", "-" if stdin else prompt) for p in cmd]
+        return PromptTransport(cmd, "file", stdin, path)
+    if _too_big(prompt):
+        if "{prompt}" in template:
+            return PromptTransport([p.replace("{prompt}", "-") for p in parts], "stdin", prompt)
+        return PromptTransport(parts + ["-"], "stdin", prompt)
+    if "{prompt}" in template:
+        return PromptTransport([p.replace("{prompt}", prompt) for p in parts])
+    return PromptTransport(parts + [prompt])
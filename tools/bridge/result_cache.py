@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Set, Tuple
+
+from codex_worker import PROFILE_PROMPTS as CODEX_PROFILES
+from common import ALLOWED_TARGET_AGENTS, atomic_write_bytes, now_utc_iso
+from gemini_worker import PROFILE_PROMPTS as GEMINI_PROFILES
+
+CACHE_DIR_NAME = "cache"
+# Bump when the worker prompt templates change in a way that makes old outputs wrong.
+CACHE_VERSION = 1
+
+
+def cache_targets() -> Set[str]:
+    """Targets whose results are cached: BRIDGE_RESULT_CACHE=gemini | codex | gemini,codex | 1 (all). Off by default."""
+    raw = os.environ.get("BRIDGE_RESULT_CACHE", "").strip().lower()
+    if raw in {"", "0", "false", "no", "off"}:
+        return set()
+    if raw in {"1", "true", "yes", "on", "all"}:
+        return set(ALLOWED_TARGET_AGENTS)
+    return {t.strip() for t in raw.split(",") if t.strip() in ALLOWED_TARGET_AGENTS}
+
+
+def cache_wanted(target: str, meta: Dict[str, Any]) -> bool:
+    # `cache: false` in the work file forces a fresh run even when the target is cached.
+    return target in cache_targets() and str(meta.get("cache", "true")).strip().lower() not in {"0", "false", "no", "off"}
+
+
+def normalize_body(body: str) -> str:
+    lines = [line.rstrip() for line in body.replace("\r\n", "\n").split("\n")]
+    return "\n".join(lines).strip()
+
+
+def repo_head(repo_root: Path) -> str:
+    git_bin = shutil.which("git")
+    if not git_bin:
+        return ""
+    proc = subprocess.run(
+        [git_bin, "-C", str(repo_root), "rev-parse", "HEAD"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return proc.stdout.strip() if proc.returncode == 0 else ""
+
+
+def cache_key(repo_root: Path, target: str, meta: Dict[str, Any], body: str) -> str:
+    """sha256 over what decides the output; thread/task ids are left out so identical work matches across threads."""
+    profiles = GEMINI_PROFILES if target == "gemini" else CODEX_PROFILES
+    assign = str(meta.get("assign", "@직원2"))
+    lang = str(meta.get("response_lang", "ko")).strip().lower()
+    parts = {
+        "v": CACHE_VERSION,
+        "target": target,
+        "profile": profiles.get(assign, profiles["@직원2"]),
+        "response_lang": lang if lang in {"ko", "en"} else "ko",
+        "body": normalize_body(body),
+        # Codex reads and edits the repo, so its output is only reusable on the same commit.
+        "head": repo_head(repo_root) if target == "codex" else "",
+        "cmd": os.environ.get(f"BRIDGE_{target.upper()}_CMD", "").strip(),
+    }
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Successful worker outputs in bridge/state/cache/<ab>/<key>.json with TTL and LRU eviction by total size.
+
+    File mtime is the last use; the in-memory table is rebuilt from a directory scan once per process.
+    """
+
+    def __init__(self, state_dir: Path, ttl_s: float, max_bytes: int) -> None:
+        self.root = state_dir / CACHE_DIR_NAME
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, int]] | None = None
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _table(self) -> Dict[str, Tuple[float, int]]:
+        if self._entries is None:
+            self._entries = {}
+            for path in self.root.glob("*/*.json"):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                self._entries[path.stem] = (st.st_mtime, st.st_size)
+        return self._entries
+
+    def _drop(self, key: str) -> None:
+        self._table().pop(key, None)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        with self._lock:
+            table = self._table()
+            if key not in table:
+                return None
+            path = self._path(key)
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._drop(key)
+                return None
+            if time.time() - float(entry.get("stored_at", 0)) > self.ttl_s:
+                self._drop(key)
+                return None
+            now = time.time()
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            table[key] = (now, table[key][1])
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        data = json.dumps({**entry, "stored_at": time.time(), "created_at": now_utc_iso()}, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            path = self._path(key)
+            # Entries are reproducible, so a lost write after a crash only costs a re-run.
+            atomic_write_bytes(path, data, mode="off")
+            self._table()[key] = (time.time(), len(data))
+            self._evict()
+
+    def _evict(self) -> None:
+        table = self._table()
+        total = sum(size for _, size in table.values())
+        if total <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(table.items(), key=lambda kv: kv[1][0]):
+            if total <= self.max_bytes:
+                break
+            self._drop(key)
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            table = self._table()
+            return {"entries": len(table), "bytes": sum(size for _, size in table.values())}
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        # Parsed while a task is being processed, so a typo must not fail the task.
+        print(f"[cache] invalid {name}={raw!r}; using {default:g}")
+        return default
+
+
+_CACHE: ResultCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def open_result_cache(state_dir: Path) -> ResultCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None or _CACHE.root != state_dir / CACHE_DIR_NAME:
+            _CACHE = ResultCache(
+                state_dir,
+                ttl_s=_env_float("BRIDGE_RESULT_CACHE_TTL_S", 86400.0),
+                max_bytes=int(_env_float("BRIDGE_RESULT_CACHE_MAX_MB", 64.0) * 1024 * 1024),
+            )
+        return _CACHE
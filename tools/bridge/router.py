@@ -2,16 +2,29 @@
 from __future__ import annotations
 
 import argparse
+import fcntl
+import itertools
+import json
 import os
+import shutil
+import sqlite3
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Tuple
 
+from attempt_log import prune_attempt_logs, write_attempt_log
+from coalesce import CoalescedRun, plan_batches
 from codex_worker import is_retryable as is_codex_retryable
 from codex_worker import run_codex_once
 from common import (
+    atomic_write_bytes,
+    format_stages,
+    fsync_mode,
+    is_auto,
+    merge_usage,
     now_utc_iso,
     now_utc_stamp,
     parse_work_file,
@@ -21,13 +34,26 @@ from common import (
     load_json,
     validate_work_meta,
     thread_task_key,
-    tail,
     write_text,
     ensure_dir,
+    StageTimer,
     WorkerResult,
 )
+from deps import DependencyGate
 from gemini_worker import is_retryable as is_gemini_retryable
-from gemini_worker import run_gemini_once
+from gemini_worker import has_work_sections, run_gemini_once, validation_enabled
+from history import AUTO_TUNER, History
+from journal import Journal
+from layout import STAMP_RE, shard_dir
+from metrics import REGISTRY, seconds_since, serve_metrics
+from planner import plan_report, render_report, tasks_from_metas
+from profiling import PROFILER, PROFILE_MODES, parse_modes
+from result_cache import cache_key, cache_wanted, open_result_cache
+from search_index import SearchIndex, index_doc, search_enabled
+from stats import GROUP_FIELDS, aggregate, iter_rows, parse_when, render_table
+from status import STATUS, read_status, render_status
+from submit_work import limit_value, plan_items
+from tracing import TRACER, rebuild_from_index
 
 
 def repo_root_from_here() -> Path:
@@ -67,6 +93,10 @@ def save_index(state_dir: Path, idx: Dict[str, Any]) -> None:
     save_json(state_dir / "processed_index.json", idx)
 
 
+# Snapshot order of processed_index.json writes; taken under idx_lock.
+_INDEX_VERSIONS = itertools.count(1)
+
+
 def list_inbox(inbox: Path) -> List[Path]:
     return sorted(inbox.glob("*.work.md"))
 
@@ -75,7 +105,7 @@ def output_path(out_dir: Path, meta: Dict[str, Any], actor: str, suffix: str) ->
     thread_id = str(meta.get("thread_id"))
     task_id = str(meta.get("task_id"))
     stamp = now_utc_stamp()
-    return out_dir / f"{stamp}_{thread_id}_{task_id}_from_{actor}.{suffix}.md"
+    return shard_dir(out_dir, thread_id, stamp) / f"{stamp}_{thread_id}_{task_id}_from_{actor}.{suffix}.md"
 
 
 def unique_work_path(inbox: Path, thread_id: str, task_id: str, target: str) -> Path:
@@ -91,11 +121,22 @@ def unique_work_path(inbox: Path, thread_id: str, task_id: str, target: str) ->
     raise RuntimeError("unable to allocate unique work file name")
 
 
-def log_path(logs_dir: Path, work_stem: str, attempt: int, stream: str) -> Path:
-    return logs_dir / f"{work_stem}.attempt{attempt}.{stream}.log"
+def log_path(logs_dir: Path, work_stem: str, attempt: int, stream: str, thread_id: object = None) -> Path:
+    # Shard by the work file's stamp, as migrate_layout does from the log name, not by when the attempt ran.
+    m = STAMP_RE.match(work_stem)
+    return shard_dir(logs_dir, thread_id, m.group(1) if m else None) / f"{work_stem}.attempt{attempt}.{stream}.log"
 
 
-def build_success_doc(meta: Dict[str, Any], result: WorkerResult, followup: Path | None = None) -> str:
+def build_success_doc(
+    meta: Dict[str, Any],
+    result: WorkerResult,
+    followup: Path | None = None,
+    stages: Dict[str, int] | None = None,
+    usage: Dict[str, int] | None = None,
+    tuned: Dict[str, Any] | None = None,
+    cached: Dict[str, Any] | None = None,
+    coalesced: str | None = None,
+) -> str:
     front: Dict[str, Any] = {
         "kind": "result",
         "thread_id": meta.get("thread_id"),
@@ -111,6 +152,18 @@ def build_success_doc(meta: Dict[str, Any], result: WorkerResult, followup: Path
     }
     if result.work_dir:
         front["work_dir"] = result.work_dir
+    if stages:
+        front["stages_ms"] = format_stages(stages)
+    if usage:
+        front["usage"] = format_stages(usage)
+    if tuned:
+        front["auto_tuned"] = format_stages(tuned)
+    if cached is not None:
+        front["cached"] = True
+        front["cache_source"] = cached.get("source")
+        front["cache_stored_at"] = cached.get("created_at")
+    if coalesced:
+        front["coalesced"] = coalesced
 
     lines = ["# RESULT", result.stdout.strip() or "(no summary)", ""]
     if followup is not None:
@@ -131,7 +184,13 @@ def build_success_doc(meta: Dict[str, Any], result: WorkerResult, followup: Path
     return render_markdown(front, "\n".join(lines))
 
 
-def build_error_doc(meta: Dict[str, Any], result: WorkerResult) -> str:
+def build_error_doc(
+    meta: Dict[str, Any],
+    result: WorkerResult,
+    stages: Dict[str, int] | None = None,
+    usage: Dict[str, int] | None = None,
+    tuned: Dict[str, Any] | None = None,
+) -> str:
     front: Dict[str, Any] = {
         "kind": "error",
         "thread_id": meta.get("thread_id"),
@@ -148,6 +207,12 @@ def build_error_doc(meta: Dict[str, Any], result: WorkerResult) -> str:
     }
     if result.work_dir:
         front["work_dir"] = result.work_dir
+    if stages:
+        front["stages_ms"] = format_stages(stages)
+    if usage:
+        front["usage"] = format_stages(usage)
+    if tuned:
+        front["auto_tuned"] = format_stages(tuned)
     body = "\n".join(
         [
             "# ERROR",
@@ -158,13 +223,19 @@ def build_error_doc(meta: Dict[str, Any], result: WorkerResult) -> str:
             "",
             "# STDERR_TAIL",
             "```text",
-            (tail(result.stderr, 80) or "(empty)"),
+            (result.stderr_tail(80) or "(empty)"),
             "```",
         ]
     )
     return render_markdown(front, body)
 
 
+def write_output_doc(dirs: Dict[str, Path], path: Path, text: str) -> None:
+    write_text(path, text)
+    with TRACER.span("search", "write"):
+        index_doc(dirs["state"], path, text)
+
+
 def cleanup_inprogress(path: Path) -> None:
     try:
         if path.exists():
@@ -180,8 +251,37 @@ def record_index(
     key: str,
     payload: Dict[str, Any],
 ) -> None:
+    with TRACER.span("index", "write", key=key):
+        with idx_lock:
+            idx.setdefault("processed", {})[key] = payload
+            if fsync_mode() != "group":
+                save_index(state_dir, idx)
+                return
+            data = (json.dumps(idx, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+            version = next(_INDEX_VERSIONS)
+        # Committed outside the lock so concurrent finishes share one group flush; the version keeps an
+        # older snapshot from landing after a newer one.
+        atomic_write_bytes(state_dir / "processed_index.json", data, version=version)
+
+
+def record_final(
+    idx_lock: threading.Lock,
+    idx: Dict[str, Any],
+    state_dir: Path,
+    key: str,
+    payload: Dict[str, Any],
+    timer: StageTimer,
+) -> None:
+    """record_index timed as the `index` stage. The entry's stages_ms is then refreshed in memory so it
+    includes that write; it reaches disk with the next index write or the end-of-tick flush_index."""
+    with timer.span("index"):
+        record_index(idx_lock, idx, state_dir, key, payload)
+    with idx_lock:
+        payload["stages_ms"] = timer.as_ms()
+
+
+def flush_index(state_dir: Path, idx: Dict[str, Any], idx_lock: threading.Lock) -> None:
     with idx_lock:
-        idx.setdefault("processed", {})[key] = payload
         save_index(state_dir, idx)
 
 
@@ -198,7 +298,8 @@ def should_retry(target: str, result: WorkerResult) -> bool:
 
 def wrap_as_codex_body(text: str) -> str:
     t = text.strip()
-    if "# TASK" in t and "# CONTEXT" in t and "# REQUIREMENTS" in t and "# OUTPUT" in t:
+    # Same heading rules as validate_work_body, so a body that passes validation is never re-wrapped.
+    if has_work_sections(t):
         return t + "\n"
     return (
         "# TASK\n"
@@ -228,23 +329,164 @@ def create_codex_followup(dirs: Dict[str, Path], meta: Dict[str, Any], gemini_ou
         "assign": str(meta.get("codex_assign", meta.get("assign", "@직원2"))),
         "priority": meta.get("priority", "high"),
         "status": "new",
-        "timeout_s": int(meta.get("codex_timeout_s", meta.get("timeout_s", 240))),
-        "max_retries": int(meta.get("codex_max_retries", meta.get("max_retries", 3))),
+        "timeout_s": limit_value(meta.get("codex_timeout_s", meta.get("timeout_s", 240))),
+        "max_retries": limit_value(meta.get("codex_max_retries", meta.get("max_retries", 3))),
         "response_lang": meta.get("response_lang", "ko"),
         "created_at": now_utc_iso(),
     }
+    if "cache" in meta:
+        follow_meta["cache"] = meta["cache"]
     body = wrap_as_codex_body(gemini_output)
     out = unique_work_path(dirs["inbox"], thread_id, task_id, "codex")
     write_text(out, render_markdown(follow_meta, body))
     return out
 
 
-def claim_inbox_files(dirs: Dict[str, Path]) -> List[Path]:
+def acquire_router_lock(dirs: Dict[str, Path]) -> Any | None:
+    fh = (dirs["locks"] / "router.lock").open("a+")
+    try:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fh.close()
+        return None
+    return fh
+
+
+def recover_inprogress(dirs: Dict[str, Path], journal: Journal, repo_root: Path) -> Dict[str, int]:
+    counts = {"resumed": 0, "requeued": 0, "errored": 0}
+    orphans = sorted(dirs["inprogress"].glob("*.work.md"))
+    if not orphans:
+        journal.reset()
+        return counts
+
+    entries = journal.replay()
+    idx = load_index(dirs["state"])
+    idx_lock = threading.Lock()
+    for path in orphans:
+        entry = entries.get(path.name)
+        if entry is not None and entry.completed:
+            cleanup_inprogress(path)
+            counts["resumed"] += 1
+            continue
+
+        try:
+            item = parse_work_file(path)
+        except Exception:
+            # Unparseable files are re-queued untouched; the normal path writes their error doc.
+            path.rename(dirs["inbox"] / path.name)
+            counts["requeued"] += 1
+            continue
+
+        meta = item.meta
+        key = thread_task_key(meta)
+        with idx_lock:
+            recorded = idx.get("processed", {}).get(key)
+        if recorded and recorded.get("source") == str(path):
+            cleanup_inprogress(path)
+            counts["resumed"] += 1
+            continue
+
+        attempts = max(entry.attempts if entry is not None else 0, _int_or(meta.get("recovered_attempts"), 0))
+        target = str(meta.get("to", "")).strip().lower() or "unknown"
+        if is_auto(meta.get("max_retries")):
+            _, max_retries, _ = AUTO_TUNER.resolve(idx, idx_lock, meta, target)
+        else:
+            max_retries = _int_or(meta.get("max_retries"), 1)
+        if attempts >= max_retries:
+            interrupted = WorkerResult(
+                ok=False,
+                error_code="interrupted",
+                error_stage="recovery",
+                exit_code=None,
+                elapsed_ms=0,
+                retry_count=attempts,
+                can_retry=False,
+                stdout="",
+                stderr=f"router stopped during attempt {attempts}/{max_retries}; retry budget exhausted",
+                actor=target,
+                work_dir=str(repo_root),
+            )
+            err_out = output_path(dirs["error"], meta, target, "error")
+            write_output_doc(dirs, err_out, build_error_doc(meta, interrupted))
+            record_index(
+                idx_lock,
+                idx,
+                dirs["state"],
+                key,
+                {
+                    "status": "error",
+                    "actor": target,
+                    "error_code": "interrupted",
+                    "at": now_utc_iso(),
+                    "source": str(path),
+                    "output": str(err_out),
+                },
+            )
+            cleanup_inprogress(path)
+            counts["errored"] += 1
+            continue
+
+        if attempts > 0:
+            meta["recovered_attempts"] = attempts
+        write_text(dirs["inbox"] / path.name, render_markdown(meta, item.body))
+        cleanup_inprogress(path)
+        counts["requeued"] += 1
+
+    journal.reset()
+    return counts
+
+
+def _int_or(value: Any, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def observe_finish(
+    meta: Dict[str, Any],
+    target: str,
+    status: str,
+    error_code: str | None,
+    exec_ms: int,
+    usage: Dict[str, int] | None = None,
+) -> None:
+    REGISTRY.inc("bridge_tasks_total", {"target": target, "assign": meta.get("assign", ""), "status": status})
+    for kind, n in (usage or {}).items():
+        REGISTRY.inc("bridge_tokens_total", {"target": target, "assign": meta.get("assign", ""), "kind": kind}, n)
+    STATUS.finished(target, status, error_code)
+    if status != "done":
+        REGISTRY.inc("bridge_errors_total", {"target": target, "error_code": error_code or "unknown"})
+    if exec_ms:
+        REGISTRY.observe("bridge_exec_seconds", exec_ms / 1000.0, {"target": target})
+    e2e = seconds_since(meta.get("created_at"))
+    if e2e is not None:
+        REGISTRY.observe("bridge_e2e_seconds", e2e, {"target": target})
+    REGISTRY.add("bridge_queue_depth", -1, {"queue": "inprogress"})
+
+
+def timing_fields(meta: Dict[str, Any], picked_at: str, exec_ms: int, attempts: int) -> Dict[str, Any]:
+    return {
+        "assign": meta.get("assign"),
+        "created_at": meta.get("created_at"),
+        "picked_at": picked_at,
+        "exec_ms": exec_ms,
+        "attempts": attempts,
+    }
+
+
+def claim_inbox_files(
+    dirs: Dict[str, Path],
+    journal: Journal,
+    admit: Callable[[List[Path]], List[Path]] | None = None,
+) -> List[Path]:
     claimed: List[Path] = []
-    for src in list_inbox(dirs["inbox"]):
+    paths = list_inbox(dirs["inbox"])
+    for src in admit(paths) if admit is not None else paths:
         dst = dirs["inprogress"] / src.name
         try:
             src.rename(dst)
+            journal.claim(dst.name)
             claimed.append(dst)
         except FileNotFoundError:
             continue
@@ -262,6 +504,8 @@ def run_target_once(
     timeout_s: int,
     attempt: int,
     env: Dict[str, str],
+    timer: StageTimer | None = None,
+    logs: Tuple[Path, Path] | None = None,
 ) -> WorkerResult:
     if target == "gemini":
         return run_gemini_once(
@@ -270,6 +514,8 @@ def run_target_once(
             body=body,
             timeout_s=timeout_s,
             attempt=attempt,
+            timer=timer,
+            logs=logs,
         )
     return run_codex_once(
         repo_root=repo_root,
@@ -278,7 +524,138 @@ def run_target_once(
         timeout_s=timeout_s,
         attempt=attempt,
         runtime_env=env,
+        timer=timer,
+        logs=logs,
+    )
+
+
+def finish_without_run(
+    repo_root: Path,
+    dirs: Dict[str, Path],
+    inprogress_path: Path,
+    meta: Dict[str, Any],
+    idx: Dict[str, Any],
+    idx_lock: threading.Lock,
+    journal: Journal,
+    timer: StageTimer,
+    picked_at: str,
+    error_code: str,
+    error_stage: str,
+    detail: str,
+) -> None:
+    target = str(meta.get("to", "")).strip().lower() or "unknown"
+    result = WorkerResult(
+        ok=False,
+        error_code=error_code,
+        error_stage=error_stage,
+        exit_code=None,
+        elapsed_ms=0,
+        retry_count=0,
+        can_retry=False,
+        stdout="",
+        stderr=detail,
+        actor=target,
+        work_dir=str(repo_root),
+    )
+    err_out = output_path(dirs["error"], meta, target, "error")
+    with timer.span("write_doc"):
+        write_output_doc(dirs, err_out, build_error_doc(meta, result, timer.as_ms()))
+    record_final(
+        idx_lock,
+        idx,
+        dirs["state"],
+        thread_task_key(meta),
+        {
+            "status": "error",
+            "error_code": error_code,
+            "at": now_utc_iso(),
+            "source": str(inprogress_path),
+            "output": str(err_out),
+            **timing_fields(meta, picked_at, 0, 0),
+            "stages_ms": timer.as_ms(),
+        },
+        timer,
+    )
+    journal.complete(inprogress_path.name, "error", str(err_out))
+    cleanup_inprogress(inprogress_path)
+    observe_finish(meta, target, "error", error_code, 0)
+
+
+def finish_done(
+    dirs: Dict[str, Path],
+    inprogress_path: Path,
+    meta: Dict[str, Any],
+    idx: Dict[str, Any],
+    idx_lock: threading.Lock,
+    journal: Journal,
+    timer: StageTimer,
+    picked_at: str,
+    result: WorkerResult,
+    exec_ms: int,
+    attempts: int,
+    usage: Dict[str, int] | None,
+    tuned: Dict[str, Any] | None,
+    cached: Dict[str, Any] | None = None,
+    coalesced: str | None = None,
+) -> None:
+    """Write the done doc, gemini follow-up and index record for a successful (or cache-served) run."""
+    target = result.actor
+    followup: Path | None = None
+    if target == "gemini":
+        with timer.span("followup"):
+            followup = create_codex_followup(dirs, meta, result.stdout)
+    done_out = output_path(dirs["done"], meta, target, "result")
+    with timer.span("write_doc"):
+        write_output_doc(dirs, done_out, build_success_doc(meta, result, followup, timer.as_ms(), usage, tuned, cached, coalesced))
+    record_final(
+        idx_lock,
+        idx,
+        dirs["state"],
+        thread_task_key(meta),
+        {
+            "status": "done",
+            "actor": target,
+            "at": now_utc_iso(),
+            "source": str(inprogress_path),
+            "output": str(done_out),
+            "followup": str(followup) if followup else None,
+            **timing_fields(meta, picked_at, exec_ms, attempts),
+            "stages_ms": timer.as_ms(),
+            "usage": usage,
+            "auto": tuned,
+            "cached": cached is not None,
+            "coalesced": coalesced,
+        },
+        timer,
     )
+    journal.complete(inprogress_path.name, "done", str(done_out))
+    cleanup_inprogress(inprogress_path)
+    observe_finish(meta, target, "done", None, exec_ms, usage)
+
+
+def store_cached_result(
+    dirs: Dict[str, Path],
+    key: str,
+    meta: Dict[str, Any],
+    target: str,
+    stdout: str,
+    usage: Dict[str, int] | None,
+) -> None:
+    try:
+        open_result_cache(dirs["state"]).put(
+            key,
+            {
+                "target": target,
+                "assign": meta.get("assign"),
+                "response_lang": meta.get("response_lang", "ko"),
+                "source": f"{meta.get('thread_id')}::{meta.get('task_id')}",
+                "stdout": stdout,
+                "usage": usage,
+            },
+        )
+    except OSError as exc:
+        # The cache only saves work; the result itself is already in hand.
+        print(f"[cache] store_failed:{key[:12]}:{exc}")
 
 
 def process_claimed_work(
@@ -287,18 +664,49 @@ def process_claimed_work(
     inprogress_path: Path,
     idx: Dict[str, Any],
     idx_lock: threading.Lock,
+    journal: Journal,
+    timer: StageTimer | None = None,
+    deps: DependencyGate | None = None,
+    batch: CoalescedRun | None = None,
 ) -> Tuple[str, bool]:
+    picked_at = now_utc_iso()
+    REGISTRY.add("bridge_queue_depth", -1, {"queue": "waiting"})
+    if timer is None:
+        timer = StageTimer()
     try:
-        item = parse_work_file(inprogress_path)
+        # The claim rename updates ctime, so this is the time spent waiting for a pool slot.
+        timer.add("claim_wait", (time.time() - inprogress_path.stat().st_ctime) * 1000.0)
+    except OSError:
+        pass
+    try:
+        with timer.span("parse"):
+            item = parse_work_file(inprogress_path)
     except Exception as exc:
+        journal.complete(inprogress_path.name, "error_parse", "")
         cleanup_inprogress(inprogress_path)
+        observe_finish({}, "unknown", "error", "parse_error", 0)
         return f"error_parse:{inprogress_path.name}:{exc}", True
 
     meta = item.meta
     target = str(meta.get("to", "")).strip().lower() or "unknown"
     key = thread_task_key(meta)
+    STATUS.update(
+        inprogress_path.name,
+        thread_id=meta.get("thread_id"),
+        task_id=meta.get("task_id"),
+        target=target,
+        assign=meta.get("assign"),
+        priority=meta.get("priority"),
+    )
+    queue_wait = seconds_since(meta.get("created_at"))
+    if queue_wait is not None:
+        REGISTRY.observe("bridge_queue_wait_seconds", queue_wait, {"target": target})
+
+    with timer.span("validate"):
+        duplicate_key = is_duplicate(idx_lock, idx, key)
+        errors = [] if duplicate_key else validate_work_meta(meta)
 
-    if is_duplicate(idx_lock, idx, key):
+    if duplicate_key:
         duplicate = WorkerResult(
             ok=False,
             error_code="duplicate_task",
@@ -313,93 +721,124 @@ def process_claimed_work(
             work_dir=str(repo_root),
         )
         err_out = output_path(dirs["error"], meta, target, "error")
-        write_text(err_out, build_error_doc(meta, duplicate))
+        write_output_doc(dirs, err_out, build_error_doc(meta, duplicate, timer.as_ms()))
+        journal.complete(inprogress_path.name, "skip_duplicate", str(err_out))
         cleanup_inprogress(inprogress_path)
+        observe_finish(meta, target, "error", "duplicate_task", 0)
         return f"skip_duplicate:{inprogress_path.name}:{target}", True
 
-    errors = validate_work_meta(meta)
     if errors:
-        invalid = WorkerResult(
-            ok=False,
-            error_code="invalid_workfile",
-            error_stage="validation",
-            exit_code=None,
-            elapsed_ms=0,
-            retry_count=0,
-            can_retry=False,
-            stdout="",
-            stderr="\n".join(errors),
-            actor=target,
-            work_dir=str(repo_root),
+        finish_without_run(
+            repo_root, dirs, inprogress_path, meta, idx, idx_lock, journal, timer, picked_at,
+            "invalid_workfile", "validation", "\n".join(errors),
         )
-        err_out = output_path(dirs["error"], meta, target, "error")
-        write_text(err_out, build_error_doc(meta, invalid))
-        record_index(
-            idx_lock,
-            idx,
-            dirs["state"],
-            key,
-            {
-                "status": "error",
-                "error_code": "invalid_workfile",
-                "at": now_utc_iso(),
-                "source": str(inprogress_path),
-                "output": str(err_out),
-            },
-        )
-        cleanup_inprogress(inprogress_path)
         return f"error_invalid:{inprogress_path.name}:{target}", True
 
-    max_retries = int(meta.get("max_retries", 1))
-    timeout_s = int(meta.get("timeout_s", 240))
-    env = runtime_env(repo_root)
+    blocked = deps.failure(inprogress_path.name, meta) if deps is not None else None
+    if blocked:
+        finish_without_run(
+            repo_root, dirs, inprogress_path, meta, idx, idx_lock, journal, timer, picked_at,
+            "dependency_failed", "dependency", blocked,
+        )
+        return f"error_dependency:{inprogress_path.name}:{target}", True
+
+    cache_id: str | None = None
+    if cache_wanted(target, meta):
+        with timer.span("cache"):
+            cache_id = cache_key(repo_root, target, meta, item.body)
+            hit = open_result_cache(dirs["state"]).get(cache_id)
+        REGISTRY.inc("bridge_result_cache_total", {"target": target, "result": "hit" if hit else "miss"})
+        if hit is not None:
+            cached = WorkerResult(
+                ok=True,
+                error_code=None,
+                error_stage=None,
+                exit_code=0,
+                elapsed_ms=0,
+                retry_count=0,
+                can_retry=False,
+                stdout=str(hit.get("stdout") or ""),
+                stderr="",
+                actor=target,
+                work_dir=str(repo_root),
+            )
+            finish_done(
+                dirs, inprogress_path, meta, idx, idx_lock, journal, timer, picked_at,
+                cached, 0, 0, None, None, hit,
+            )
+            return f"cached:{inprogress_path.name}:{target}", True
+
+    timeout_s, max_retries, tuned = AUTO_TUNER.resolve(idx, idx_lock, meta, target)
+    if tuned is not None:
+        REGISTRY.inc("bridge_auto_tuned_total", {"target": target})
+    with timer.span("runtime_env"):
+        env = runtime_env(repo_root)
+    # Attempts spent before a crash-recovery requeue count against the retry budget.
+    start_attempt = _int_or(meta.get("recovered_attempts"), 0) + 1
 
     last: WorkerResult | None = None
-    for attempt in range(1, max_retries + 1):
-        result = run_target_once(
-            target=target,
-            repo_root=repo_root,
-            meta=meta,
-            body=item.body,
-            timeout_s=timeout_s,
-            attempt=attempt,
-            env=env,
+    exec_ms = 0
+    attempts = 0
+    usage: Dict[str, int] | None = None
+    shared = False
+    for attempt in range(start_attempt, max_retries + 1):
+        journal.attempt(inprogress_path.name, key, attempt)
+        STATUS.update(inprogress_path.name, attempt=attempt)
+        REGISTRY.inc("bridge_attempts_total", {"target": target})
+        # Workers stream straight into these, so a chatty CLI never sits in memory.
+        logs = (
+            log_path(dirs["logs"], inprogress_path.stem, attempt, f"{target}.stdout", meta.get("thread_id")),
+            log_path(dirs["logs"], inprogress_path.stem, attempt, f"{target}.stderr", meta.get("thread_id")),
         )
+        with TRACER.span(f"attempt{attempt}", target, key=key):
+            result = None
+            if batch is not None:
+                result = batch.run(
+                    repo_root=repo_root, meta=meta, timeout_s=timeout_s, attempt=attempt, env=env, timer=timer, logs=logs,
+                )
+                shared = result is not None
+            if result is None:
+                result = run_target_once(
+                    target=target,
+                    repo_root=repo_root,
+                    meta=meta,
+                    body=item.body,
+                    timeout_s=timeout_s,
+                    attempt=attempt,
+                    env=env,
+                    timer=timer,
+                    logs=logs,
+                )
         last = result
-        write_text(
-            log_path(dirs["logs"], inprogress_path.stem, attempt, f"{target}.stdout"),
-            result.raw_stdout if result.raw_stdout else result.stdout,
-        )
-        write_text(
-            log_path(dirs["logs"], inprogress_path.stem, attempt, f"{target}.stderr"),
-            result.stderr,
-        )
+        exec_ms += result.elapsed_ms
+        if batch is not None and not shared:
+            # The combined attempt this member took part in ran on the clock and spent tokens too.
+            owed_ms, owed_usage = batch.solo_share(meta, attempt, timer)
+            exec_ms += owed_ms
+            usage = merge_usage(usage, owed_usage)
+        attempts += 1
+        if target == "gemini" and validation_enabled() and (result.ok or result.error_code == "gemini_invalid_output"):
+            REGISTRY.inc("bridge_gemini_validation_total", {"result": "pass" if result.ok else "fail"})
+        usage = merge_usage(usage, result.usage)
+        if not result.spilled:
+            # Pre-exec failures and shared batch answers only exist in memory.
+            with timer.span("logs"):
+                write_attempt_log(logs[0], result.raw_stdout if result.raw_stdout else result.stdout)
+                write_attempt_log(logs[1], result.stderr)
 
         if result.ok:
-            followup: Path | None = None
-            if target == "gemini":
-                followup = create_codex_followup(dirs, meta, result.stdout)
-            done_out = output_path(dirs["done"], meta, target, "result")
-            write_text(done_out, build_success_doc(meta, result, followup))
-            record_index(
-                idx_lock,
-                idx,
-                dirs["state"],
-                key,
-                {
-                    "status": "done",
-                    "actor": target,
-                    "at": now_utc_iso(),
-                    "source": str(inprogress_path),
-                    "output": str(done_out),
-                    "followup": str(followup) if followup else None,
-                },
+            if cache_id is not None:
+                with timer.span("cache"):
+                    store_cached_result(dirs, cache_id, meta, target, result.stdout, usage)
+            finish_done(
+                dirs, inprogress_path, meta, idx, idx_lock, journal, timer, picked_at,
+                result, exec_ms, attempts, usage, tuned, coalesced=batch.label if shared and batch else None,
             )
-            cleanup_inprogress(inprogress_path)
             return f"done:{inprogress_path.name}:{target}", True
 
         if attempt < max_retries and should_retry(target, result):
-            time.sleep(min(2**attempt, 7))
+            with timer.span("backoff"):
+                time.sleep(min(2**attempt, 7))
             continue
         break
 
@@ -417,8 +856,9 @@ def process_claimed_work(
         work_dir=str(repo_root),
     )
     err_out = output_path(dirs["error"], meta, target, "error")
-    write_text(err_out, build_error_doc(meta, final))
-    record_index(
+    with timer.span("write_doc"):
+        write_output_doc(dirs, err_out, build_error_doc(meta, final, timer.as_ms(), usage, tuned))
+    record_final(
         idx_lock,
         idx,
         dirs["state"],
@@ -430,56 +870,179 @@ def process_claimed_work(
             "at": now_utc_iso(),
             "source": str(inprogress_path),
             "output": str(err_out),
+            **timing_fields(meta, picked_at, exec_ms, attempts),
+            "stages_ms": timer.as_ms(),
+            "usage": usage,
+            "auto": tuned,
         },
+        timer,
     )
+    journal.complete(inprogress_path.name, "error", str(err_out))
     cleanup_inprogress(inprogress_path)
+    observe_finish(meta, target, "error", final.error_code, exec_ms, usage)
     return f"error:{inprogress_path.name}:{target}", True
 
 
-def run_once(repo_root: Path, workers: int) -> int:
+def publish_metrics(dirs: Dict[str, Path], tick_started: float, claimed: int) -> None:
+    elapsed = max(time.monotonic() - tick_started, 1e-3)
+    REGISTRY.inc("bridge_ticks_total")
+    REGISTRY.set("bridge_claim_rate_per_second", round(claimed / elapsed, 3))
+    REGISTRY.set("bridge_last_tick_timestamp_seconds", int(time.time()))
+    # Dependents released during the tick leave the inbox after the post-claim reading.
+    REGISTRY.set("bridge_queue_depth", len(list_inbox(dirs["inbox"])), {"queue": "inbox"})
+    REGISTRY.write(dirs["state"] / "metrics.prom")
+
+
+def traced_process(
+    repo_root: Path,
+    dirs: Dict[str, Path],
+    inprogress_path: Path,
+    idx: Dict[str, Any],
+    idx_lock: threading.Lock,
+    journal: Journal,
+    deps: DependencyGate | None = None,
+    batch: CoalescedRun | None = None,
+) -> Tuple[str, bool]:
+    timer = StageTimer(listener=TRACER.stage_listener(file=inprogress_path.name))
+    STATUS.begin(inprogress_path.name)
+    try:
+        with TRACER.span(inprogress_path.name, "task"):
+            return PROFILER.task(
+                inprogress_path.name,
+                lambda: process_claimed_work(repo_root, dirs, inprogress_path, idx, idx_lock, journal, timer, deps, batch),
+                timer.as_ms,
+            )
+    finally:
+        STATUS.end(inprogress_path.name)
+
+
+def process_batch(
+    repo_root: Path,
+    dirs: Dict[str, Path],
+    paths: List[Path],
+    idx: Dict[str, Any],
+    idx_lock: threading.Lock,
+    journal: Journal,
+    deps: DependencyGate | None = None,
+) -> List[Tuple[Path, str, bool]]:
+    """Process claimed paths in order on one pool slot; several paths share a coalesced codex run."""
+    batch: CoalescedRun | None = None
+    if len(paths) > 1:
+        try:
+            batch = CoalescedRun(paths)
+            print(f"[coalesce] tasks={len(paths)} {batch.label}")
+        except Exception as exc:
+            # Members then run one by one; an unreadable file fails in its own parse step.
+            print(f"[coalesce] skipped: {exc}")
+    out: List[Tuple[Path, str, bool]] = []
+    for path in paths:
+        try:
+            msg, counted = traced_process(repo_root, dirs, path, idx, idx_lock, journal, deps, batch)
+        except Exception as exc:  # safety net
+            msg, counted = f"crash:{path.name}:{exc}", False
+        out.append((path, msg, counted))
+    return out
+
+
+def claim_ready(dirs: Dict[str, Path], journal: Journal, gate: DependencyGate, related_only: bool) -> List[Path]:
+    claimed = claim_inbox_files(dirs, journal, lambda paths: gate.select(paths, related_only))
+    if claimed:
+        STATUS.queued(claimed)
+        REGISTRY.inc("bridge_claims_total", value=len(claimed))
+        REGISTRY.add("bridge_queue_depth", len(claimed), {"queue": "inprogress"})
+        REGISTRY.add("bridge_queue_depth", len(claimed), {"queue": "waiting"})
+    REGISTRY.set("bridge_queue_depth", len(gate.held), {"queue": "held"})
+    STATUS.held(len(gate.held))
+    return claimed
+
+
+def run_once(repo_root: Path, workers: int, journal: Journal) -> int:
     dirs = ensure_layout(repo_root)
+    tick_started = time.monotonic()
     health = load_health(dirs["state"])
     if not health.get("ok", False):
         reason = health.get("reason", "health_not_ok")
         print(f"[gate] blocked: {reason}")
+        STATUS.tick(health, len(list_inbox(dirs["inbox"])))
+        publish_metrics(dirs, tick_started, 0)
         return 0
 
-    claimed = claim_inbox_files(dirs)
+    idx = load_index(dirs["state"])
+    idx_lock = threading.Lock()
+    gate = DependencyGate(idx, idx_lock)
+    with TRACER.span("claim", "router"):
+        claimed = claim_ready(dirs, journal, gate, related_only=False)
+    STATUS.tick(health, len(claimed))
+    # What claim left behind: held dependents and anything past the claim limits.
+    REGISTRY.set("bridge_queue_depth", len(list_inbox(dirs["inbox"])), {"queue": "inbox"})
+    if gate.held:
+        print(f"[deps] held={len(gate.held)}")
+    for name, refs in sorted(gate.unknown.items()):
+        # Nothing will ever satisfy these until the prerequisite is submitted; usually a typo in depends_on.
+        print(f"[deps] unknown_prerequisite file={name} depends_on={','.join(f'{t}::{k}' for t, k in refs)}")
     if not claimed:
+        publish_metrics(dirs, tick_started, 0)
         return 0
 
-    idx = load_index(dirs["state"])
-    idx_lock = threading.Lock()
     processed = 0
+    total_claimed = len(claimed)
     max_workers = max(1, workers)
 
+    def finish(path: Path, msg: str, counted: bool) -> List[Path]:
+        nonlocal processed, total_claimed
+        print(f"[work] {msg}")
+        if counted:
+            processed += 1
+        gate.finished(path.name)
+        if not gate.held:
+            return []
+        # Prerequisites finishing inside the tick release their dependents right away.
+        released = claim_ready(dirs, journal, gate, related_only=True)
+        total_claimed += len(released)
+        return released
+
     if max_workers == 1:
-        for path in claimed:
-            msg, counted = process_claimed_work(repo_root, dirs, path, idx, idx_lock)
-            print(f"[work] {msg}")
-            if counted:
-                processed += 1
+        queue = plan_batches(claimed, idx, idx_lock)
+        while queue:
+            for path, msg, counted in process_batch(repo_root, dirs, queue.pop(0), idx, idx_lock, journal, gate):
+                queue.extend(plan_batches(finish(path, msg, counted), idx, idx_lock))
+        flush_index(dirs["state"], idx, idx_lock)
+        journal.reset()
+        publish_metrics(dirs, tick_started, total_claimed)
         return processed
 
     with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        fut_to_path = {
-            pool.submit(process_claimed_work, repo_root, dirs, path, idx, idx_lock): path
-            for path in claimed
-        }
-        for fut in as_completed(fut_to_path):
-            path = fut_to_path[fut]
-            try:
-                msg, counted = fut.result()
-                print(f"[work] {msg}")
-                if counted:
-                    processed += 1
-            except Exception as exc:  # safety net
-                print(f"[work] crash:{path.name}:{exc}")
+        running: Dict[Future[List[Tuple[Path, str, bool]]], List[Path]] = {}
+
+        def submit(paths: List[Path]) -> None:
+            for batch in plan_batches(paths, idx, idx_lock):
+                running[pool.submit(process_batch, repo_root, dirs, batch, idx, idx_lock, journal, gate)] = batch
+
+        submit(claimed)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                batch = running.pop(fut)
+                try:
+                    outcomes = fut.result()
+                except Exception as exc:  # safety net
+                    outcomes = [(path, f"crash:{path.name}:{exc}", False) for path in batch]
+                for path, msg, counted in outcomes:
+                    submit(finish(path, msg, counted))
+    # Every claimed file has reached a final state, so the journal has nothing left to recover.
+    flush_index(dirs["state"], idx, idx_lock)
+    journal.reset()
+    publish_metrics(dirs, tick_started, total_claimed)
     return processed
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="File Bridge Router")
+    parser.add_argument(
+        "--root",
+        default=os.environ.get("BRIDGE_ROOT", ""),
+        help="bridge/ 를 포함한 루트 (기본: 저장소 루트, 벤치/리플레이용)",
+    )
     sub = parser.add_subparsers(dest="cmd", required=True)
 
     try:
@@ -487,27 +1050,268 @@ def main() -> int:
     except ValueError:
         default_workers = 1
 
+    default_trace = os.environ.get("BRIDGE_TRACE", "0").strip().lower() in {"1", "true", "yes", "on"}
+    default_profile = os.environ.get("BRIDGE_PROFILE", "")
+    profile_help = f"bridge/state/profiles/에 프로파일 기록 ({','.join(PROFILE_MODES)} 중 쉼표 목록 또는 all)"
+
     r = sub.add_parser("run-once")
     r.add_argument("--workers", type=int, default=default_workers)
+    r.add_argument("--trace", action="store_true", default=default_trace, help="bridge/state/traces/에 Chrome trace 기록")
+    r.add_argument("--profile", default=default_profile, help=profile_help)
 
     d = sub.add_parser("daemon")
-    d.add_argument("--interval", type=int, default=2)
+    d.add_argument("--interval", type=float, default=2)
     d.add_argument("--workers", type=int, default=default_workers)
+    d.add_argument("--trace", action="store_true", default=default_trace, help="bridge/state/traces/에 Chrome trace 기록")
+    d.add_argument("--profile", default=default_profile, help=profile_help)
+    d.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.environ.get("BRIDGE_METRICS_PORT", "0") or 0),
+        help="Prometheus /metrics HTTP 포트 (0이면 비활성, 파일 bridge/state/metrics.prom은 항상 기록)",
+    )
+
+    t = sub.add_parser("trace", help="processed index와 로그로 타임라인(Chrome Trace JSON) 재구성")
+    t.add_argument("--out", default="", help="출력 경로 (기본: bridge/state/traces/rebuilt_<stamp>.trace.json)")
+    t.add_argument("--since", default="", help="ISO 시각 이후 완료된 작업만")
+    t.add_argument("--thread-id", default=None)
+    t.add_argument("--no-logs", action="store_true", help="attempt 로그 mtime 마커 생략")
+
+    tp = sub.add_parser("top", help="라우터가 게시한 bridge/state/router_status.json 실시간 보기")
+    tp.add_argument("--interval", type=float, default=2, help="갱신 주기(초)")
+    tp.add_argument("--once", action="store_true", help="한 번만 출력하고 종료")
+
+    se = sub.add_parser("search", help="result/error 문서 전문 검색 (bridge/state/search.db)")
+    se.add_argument("query", nargs="?", default="", help="검색어 (기본: 그대로 부분 문자열 검색)")
+    se.add_argument("--thread-id", default=None)
+    se.add_argument("--target", default=None)
+    se.add_argument("--kind", choices=["result", "error"], default=None)
+    se.add_argument("--since", default="", help="ISO 시각 또는 상대값(30m, 24h, 7d, 2w) 이후 작성분")
+    se.add_argument("--until", default="", help="ISO 시각 또는 상대값 이전 작성분")
+    se.add_argument("--limit", type=int, default=20)
+    se.add_argument("--raw", action="store_true", help="FTS5 MATCH 문법 그대로 사용 (AND/OR/NEAR, 접두어*)")
+    se.add_argument("--reindex", action="store_true", help="done/error를 스캔해 누락·변경된 문서를 색인")
+    se.add_argument("--json", action="store_true")
+
+    st = sub.add_parser("stats", help="processed index 집계 (count, 오류율, 지연 백분위, 재시도 분포)")
+    st.add_argument("--since", default="", help="ISO 시각 또는 상대값(30m, 24h, 7d, 2w) 이후 완료분")
+    st.add_argument("--until", default="", help="ISO 시각 또는 상대값 이전 완료분")
+    st.add_argument("--thread-id", default=None)
+    st.add_argument("--target", default=None)
+    st.add_argument("--assign", default=None)
+    st.add_argument("--status", default=None)
+    st.add_argument("--error-code", default=None)
+    st.add_argument("--by", default="target", help=f"쉼표 목록: {','.join(GROUP_FIELDS)} (빈 값이면 전체 한 줄)")
+    st.add_argument("--metric", choices=["exec_ms", "e2e_ms", "queue_wait_ms"], default="exec_ms", help="표에 보일 지연 지표")
+    st.add_argument("--json", action="store_true", help="모든 지표를 JSON으로 출력")
+
+    pl = sub.add_parser("plan", help="wave plan의 makespan/utilization/critical path를 과거 이력으로 시뮬레이션 (실행 안 함)")
+    pl.add_argument("plan", help="submit_work.py --plan 과 같은 wave plan JSON")
+    pl.add_argument("--workers", default="1,2,4,8", help="쉼표로 구분한 --workers 후보")
+    pl.add_argument("--since", default="30d", help="이력 창: ISO 시각 또는 상대값(30m, 24h, 7d, 2w), 빈 값이면 전체")
+    pl.add_argument("--runs", type=int, default=200, help="Monte Carlo 반복 수")
+    pl.add_argument("--interval", type=float, default=2, help="daemon tick 간격(초), tick 경계 대기 반영")
+    pl.add_argument("--seed", type=int, default=1)
+    pl.add_argument("--json", action="store_true")
 
     args = parser.parse_args()
-    root = repo_root_from_here()
+    root = Path(args.root).resolve() if args.root else repo_root_from_here()
+    dirs = ensure_layout(root)
+
+    if args.cmd == "trace":
+        return trace_command(dirs, args)
+    if args.cmd == "top":
+        return top_command(dirs, args)
+    if args.cmd == "stats":
+        return stats_command(dirs, args)
+    if args.cmd == "search":
+        return search_command(dirs, args)
+    if args.cmd == "plan":
+        return plan_command(dirs, args)
+
+    lock = acquire_router_lock(dirs)
+    if lock is None:
+        print("[lock] busy: another router holds bridge/locks/router.lock")
+        return 0 if args.cmd == "run-once" else 1
+
+    journal = Journal(dirs["state"])
+    recovered = recover_inprogress(dirs, journal, root)
+    if any(recovered.values()):
+        print(
+            f"[recover] resumed={recovered['resumed']} "
+            f"requeued={recovered['requeued']} errored={recovered['errored']}"
+        )
+
+    if args.trace:
+        print(f"[trace] writing {TRACER.start(dirs['state'] / 'traces')}")
+    PROFILER.start(dirs["state"] / "profiles", parse_modes(args.profile))
+    if PROFILER.enabled:
+        print(f"[profile] modes={','.join(sorted(PROFILER.modes))}")
+
+    STATUS.start(dirs["state"], args.cmd, max(1, args.workers))
+    try:
+        return run_command(args, root, dirs, journal)
+    finally:
+        STATUS.stop()
+        PROFILER.stop()
+        TRACER.stop()
+
+
+def trace_command(dirs: Dict[str, Path], args: argparse.Namespace) -> int:
+    since = None
+    if args.since:
+        since_dt = datetime.fromisoformat(args.since)
+        if since_dt.tzinfo is None:
+            since_dt = since_dt.replace(tzinfo=timezone.utc)
+        since = since_dt.timestamp()
+    events = rebuild_from_index(
+        load_index(dirs["state"]),
+        logs_dir=None if args.no_logs else dirs["logs"],
+        since=since,
+        thread_id=args.thread_id,
+    )
+    out = Path(args.out) if args.out else dirs["state"] / "traces" / f"rebuilt_{now_utc_stamp()}.trace.json"
+    write_text(out, json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, ensure_ascii=False))
+    print(f"[trace] events={len(events)} out={out}")
+    return 0
+
+
+def top_command(dirs: Dict[str, Path], args: argparse.Namespace) -> int:
+    if args.once:
+        print(render_status(read_status(dirs["state"])))
+        return 0
+    try:
+        while True:
+            width = shutil.get_terminal_size((120, 40)).columns
+            print("\033[H\033[2J" + render_status(read_status(dirs["state"]), width), flush=True)
+            time.sleep(max(0.2, args.interval))
+    except KeyboardInterrupt:
+        return 0
 
+
+def search_command(dirs: Dict[str, Path], args: argparse.Namespace) -> int:
+    if not search_enabled():
+        print("[search] disabled: BRIDGE_SEARCH_INDEX=0")
+        return 2
+    index = SearchIndex(dirs["state"])
+    try:
+        if args.reindex:
+            started = time.monotonic()
+            seen, added = index.reindex([dirs["done"], dirs["error"]])
+            print(f"[search] reindex seen={seen} indexed={added} elapsed_ms={int((time.monotonic() - started) * 1000)}")
+        if not args.query:
+            return 0 if args.reindex else 2
+        try:
+            since, until = parse_when(args.since), parse_when(args.until)
+        except ValueError as exc:
+            print(f"[search] {exc}")
+            return 2
+        started = time.monotonic()
+        try:
+            hits = index.search(
+                args.query,
+                thread_id=args.thread_id,
+                target=args.target,
+                kind=args.kind,
+                since=since,
+                until=until,
+                limit=args.limit,
+                raw=args.raw,
+            )
+        except sqlite3.OperationalError as exc:
+            print(f"[search] bad query: {exc}")
+            return 2
+        elapsed_ms = (time.monotonic() - started) * 1000
+    finally:
+        index.close()
+
+    if args.json:
+        print(json.dumps(hits, ensure_ascii=False, indent=2))
+        return 0
+    for hit in hits:
+        gone = "" if Path(hit["path"]).exists() else " (archived)"
+        code = f" {hit['error_code']}" if hit["error_code"] else ""
+        print(f"{hit['created_at']} {hit['thread_id']}::{hit['task_id']} {hit['target']} {hit['kind']}{code}{gone}")
+        print(f"  {hit['path']}")
+        print(f"  {' '.join(str(hit['snippet']).split())}")
+    print(f"[search] hits={len(hits)} elapsed_ms={elapsed_ms:.1f}")
+    if len(args.query) < 3 and not args.raw and index.trigram:
+        print("[search] note: substring search needs at least 3 characters")
+    return 0
+
+
+def stats_command(dirs: Dict[str, Path], args: argparse.Namespace) -> int:
+    group_by = [f.strip() for f in args.by.split(",") if f.strip()]
+    unknown = [f for f in group_by if f not in GROUP_FIELDS]
+    if unknown:
+        print(f"[stats] unknown --by field: {','.join(unknown)}")
+        return 2
+    try:
+        since, until = parse_when(args.since), parse_when(args.until)
+    except ValueError as exc:
+        print(f"[stats] {exc}")
+        return 2
+    rows = iter_rows(
+        load_index(dirs["state"]),
+        since=since,
+        until=until,
+        thread=args.thread_id,
+        target=args.target,
+        assign=args.assign,
+        status=args.status,
+        error_code=args.error_code,
+    )
+    groups = aggregate(rows, group_by)
+    if args.json:
+        print(json.dumps(groups, ensure_ascii=False, indent=2))
+    elif not groups:
+        print("[stats] no matching records")
+    else:
+        print(render_table(groups, group_by, args.metric))
+    return 0
+
+
+def plan_command(dirs: Dict[str, Path], args: argparse.Namespace) -> int:
+    plan_path = Path(args.plan)
+    try:
+        plan = json.loads(plan_path.read_text(encoding="utf-8"))
+        metas = [meta for meta, _ in plan_items(plan if isinstance(plan, dict) else {}, plan_path.parent)]
+        since = parse_when(args.since)
+        worker_counts = [max(1, int(x)) for x in args.workers.split(",") if x.strip()]
+    except (OSError, ValueError) as exc:
+        print(f"[plan] {exc}")
+        return 2
+    history = History.from_index(load_index(dirs["state"]), since=since)
+    tasks = tasks_from_metas(metas, history)
+    report = plan_report(tasks, history, worker_counts, args.runs, args.interval * 1000.0, args.seed)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(render_report(report))
+    return 0
+
+
+def run_command(args: argparse.Namespace, root: Path, dirs: Dict[str, Path], journal: Journal) -> int:
     if args.cmd == "run-once":
-        processed = run_once(root, workers=max(1, args.workers))
+        processed = PROFILER.tick(lambda: run_once(root, workers=max(1, args.workers), journal=journal))
         print(f"[summary] processed={processed}")
         return 0
 
-    interval = max(1, args.interval)
+    interval = max(0.1, args.interval)
     workers = max(1, args.workers)
     print(f"[daemon] started interval={interval}s workers={workers}")
+    if args.metrics_port > 0:
+        serve_metrics(args.metrics_port)
+        print(f"[metrics] serving http://127.0.0.1:{args.metrics_port}/metrics")
+    next_prune = 0.0
     try:
         while True:
-            processed = run_once(root, workers=workers)
+            if time.monotonic() >= next_prune:
+                pruned = prune_attempt_logs(dirs["logs"])
+                if pruned:
+                    print(f"[logs] pruned={pruned}")
+                next_prune = time.monotonic() + 3600
+            processed = PROFILER.tick(lambda: run_once(root, workers=workers, journal=journal))
             print(f"[tick] processed={processed}")
             time.sleep(interval)
     except KeyboardInterrupt:
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from common import ensure_dir, parse_frontmatter, read_text
+from layout import iter_docs
+
+SEARCH_DB_NAME = "search.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    kind TEXT,
+    thread_id TEXT,
+    task_id TEXT,
+    target TEXT,
+    status TEXT,
+    error_code TEXT,
+    created_at TEXT,
+    ts REAL,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS docs_thread_ts ON docs(thread_id, ts);
+CREATE INDEX IF NOT EXISTS docs_ts ON docs(ts);
+"""
+
+
+def search_enabled() -> bool:
+    return os.environ.get("BRIDGE_SEARCH_INDEX", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _ts(iso: object) -> float | None:
+    try:
+        dt = datetime.fromisoformat(str(iso))
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def quote_query(text: str) -> str:
+    # Plain input is matched as one literal phrase, so paths and error strings need no FTS syntax.
+    return '"' + text.replace('"', '""') + '"'
+
+
+class SearchIndex:
+    """sqlite3 FTS5 index over result and error docs in bridge/state/search.db."""
+
+    def __init__(self, state_dir: Path) -> None:
+        ensure_dir(state_dir)
+        self.path = state_dir / SEARCH_DB_NAME
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE name='docs_fts'").fetchone() is None:
+            # The trigram tokenizer gives grep-like substring matches (Korean without word breaks, paths);
+            # older sqlite builds without it fall back to unicode61 word matching.
+            try:
+                self.conn.execute("CREATE VIRTUAL TABLE docs_fts USING fts5(body, tokenize='trigram')")
+            except sqlite3.OperationalError:
+                self.conn.execute("CREATE VIRTUAL TABLE docs_fts USING fts5(body, tokenize='unicode61')")
+        self.conn.commit()
+        sql = self.conn.execute("SELECT sql FROM sqlite_master WHERE name='docs_fts'").fetchone()[0]
+        self.trigram = "trigram" in sql
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def _upsert(self, path: Path, meta: Dict[str, Any], body: str, mtime: float) -> None:
+        kind = str(meta.get("kind") or ("error" if path.name.endswith(".error.md") else "result"))
+        row = (
+            str(path),
+            kind,
+            str(meta.get("thread_id") or ""),
+            str(meta.get("task_id") or ""),
+            str(meta.get("from") or ""),
+            str(meta.get("status") or ""),
+            str(meta.get("error_code") or ""),
+            str(meta.get("created_at") or ""),
+            _ts(meta.get("created_at")) or mtime,
+            mtime,
+        )
+        cur = self.conn.execute("SELECT id FROM docs WHERE path = ?", (str(path),))
+        found = cur.fetchone()
+        if found is not None:
+            self.conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (found[0],))
+            self.conn.execute("DELETE FROM docs WHERE id = ?", (found[0],))
+        cur = self.conn.execute(
+            "INSERT INTO docs (path, kind, thread_id, task_id, target, status, error_code, created_at, ts, mtime)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            row,
+        )
+        self.conn.execute("INSERT INTO docs_fts (rowid, body) VALUES (?, ?)", (cur.lastrowid, body))
+
+    def add_text(self, path: Path, text: str) -> None:
+        meta, body = parse_frontmatter(text)
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            mtime = 0.0
+        with self._lock:
+            self._upsert(path, meta, body, mtime)
+            self.conn.commit()
+
+    def reindex(self, dirs: Iterable[Path]) -> Tuple[int, int]:
+        with self._lock:
+            known = dict(self.conn.execute("SELECT path, mtime FROM docs").fetchall())
+        added = 0
+        seen = 0
+        for base in dirs:
+            for glob in ("*.result.md", "*.error.md"):
+                for path in iter_docs(base, glob):
+                    seen += 1
+                    try:
+                        mtime = path.stat().st_mtime
+                    except OSError:
+                        continue
+                    if known.get(str(path)) == mtime:
+                        continue
+                    meta, body = parse_frontmatter(read_text(path))
+                    with self._lock:
+                        self._upsert(path, meta, body, mtime)
+                        added += 1
+                        if added % 500 == 0:
+                            self.conn.commit()
+        with self._lock:
+            self.conn.commit()
+        return seen, added
+
+    def search(
+        self,
+        query: str,
+        thread_id: str | None = None,
+        target: str | None = None,
+        kind: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        limit: int = 20,
+        raw: bool = False,
+    ) -> List[Dict[str, Any]]:
+        where = ["docs_fts MATCH ?"]
+        params: List[Any] = [query if raw else quote_query(query)]
+        for column, value in (("d.thread_id", thread_id), ("d.target", target), ("d.kind", kind)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("d.ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("d.ts < ?")
+            params.append(until)
+        params.append(max(1, limit))
+        sql = (
+            "SELECT d.path, d.kind, d.thread_id, d.task_id, d.target, d.status, d.error_code, d.created_at,"
+            " snippet(docs_fts, 0, '[', ']', '…', 16)"
+            " FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid"
+            f" WHERE {' AND '.join(where)} ORDER BY d.ts DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        cols = ["path", "kind", "thread_id", "task_id", "target", "status", "error_code", "created_at", "snippet"]
+        return [dict(zip(cols, r)) for r in rows]
+
+
+_INDEX: SearchIndex | None = None
+_INDEX_LOCK = threading.Lock()
+
+
+def open_search_index(state_dir: Path) -> SearchIndex | None:
+    global _INDEX
+    if not search_enabled():
+        return None
+    with _INDEX_LOCK:
+        if _INDEX is None or _INDEX.path != state_dir / SEARCH_DB_NAME:
+            _INDEX = SearchIndex(state_dir)
+        return _INDEX
+
+
+def index_doc(state_dir: Path, path: Path, text: str) -> None:
+    try:
+        idx = open_search_index(state_dir)
+        if idx is not None:
+            idx.add_text(path, text)
+    except sqlite3.Error as exc:
+        # The markdown doc is the record of truth; a failed index write is repaired by `search --reindex`.
+        print(f"[search] index_failed:{path.name}:{exc}", file=sys.stderr)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+GROUP_FIELDS = ("thread", "target", "assign", "error_code", "status", "day")
+RELATIVE_RE = re.compile(r"^(\d+(?:\.\d+)?)([mhdw])$")
+UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def _epoch(iso: object) -> float | None:
+    try:
+        dt = datetime.fromisoformat(str(iso))
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def parse_when(value: str, now: datetime | None = None) -> float | None:
+    """ISO timestamp or a relative age such as 30m, 24h, 7d, 2w."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    m = RELATIVE_RE.match(value)
+    if m:
+        return ((now or datetime.now(timezone.utc)) - timedelta(seconds=float(m.group(1)) * UNITS[m.group(2)])).timestamp()
+    ts = _epoch(value)
+    if ts is None:
+        raise ValueError(f"invalid time: {value}")
+    return ts
+
+
+def percentile(values: Sequence[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return round(ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo), 1)
+
+
+def _day(at_iso: object, at: float) -> str:
+    text = str(at_iso)
+    # now_utc_iso() stamps are UTC, so the date prefix is the UTC day without another datetime round-trip.
+    if text.endswith("+00:00") and len(text) >= 10:
+        return text[:10]
+    return datetime.fromtimestamp(at, timezone.utc).strftime("%Y-%m-%d")
+
+
+def iter_rows(
+    idx: Dict[str, Any],
+    since: float | None = None,
+    until: float | None = None,
+    **equals: str | None,
+) -> Iterator[Dict[str, Any]]:
+    wanted = {k: v for k, v in equals.items() if v}
+    for key, rec in idx.get("processed", {}).items():
+        if not isinstance(rec, dict):
+            continue
+        thread, _, rest = key.partition("::")
+        task, _, target = rest.partition("::")
+        fields = {
+            "thread": thread,
+            "target": target,
+            "assign": str(rec.get("assign") or ""),
+            "status": str(rec.get("status") or "unknown"),
+            "error_code": str(rec.get("error_code") or ""),
+        }
+        # Cheap string filters first; timestamps are only parsed for records that can still match.
+        if any(fields.get(k, v) != v for k, v in wanted.items() if k != "day"):
+            continue
+        at = _epoch(rec.get("at"))
+        if (since is not None or until is not None) and at is None:
+            continue
+        if since is not None and at < since or until is not None and at >= until:  # type: ignore[operator]
+            continue
+        fields["day"] = _day(rec.get("at"), at) if at is not None else ""
+        if "day" in wanted and fields["day"] != wanted["day"]:
+            continue
+        created = _epoch(rec.get("created_at"))
+        picked = _epoch(rec.get("picked_at")) if created is not None else None
+        exec_ms = rec.get("exec_ms")
+        attempts = rec.get("attempts")
+        yield {
+            **fields,
+            "key": key,
+            "task": task,
+            "at": at,
+            "exec_ms": exec_ms if isinstance(exec_ms, (int, float)) else None,
+            "e2e_ms": (at - created) * 1000.0 if at is not None and created is not None else None,
+            "queue_wait_ms": max(0.0, picked - created) * 1000.0 if picked is not None and created is not None else None,
+            "attempts": attempts if isinstance(attempts, int) else None,
+            "usage": rec.get("usage") if isinstance(rec.get("usage"), dict) else None,
+        }
+
+
+def _latency(values: List[float]) -> Dict[str, Any]:
+    return {"n": len(values), "p50": percentile(values, 0.5), "p95": percentile(values, 0.95), "p99": percentile(values, 0.99)}
+
+
+class _Group:
+    __slots__ = ("count", "errors", "first", "last", "exec_ms", "e2e_ms", "queue_wait_ms", "attempts", "usage", "with_usage")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.first: float | None = None
+        self.last: float | None = None
+        self.exec_ms: List[float] = []
+        self.e2e_ms: List[float] = []
+        self.queue_wait_ms: List[float] = []
+        self.attempts: Dict[int, int] = {}
+        self.usage: Dict[str, int] = {}
+        self.with_usage = 0
+
+
+def aggregate(rows: Iterable[Dict[str, Any]], group_by: Sequence[str]) -> List[Dict[str, Any]]:
+    groups: Dict[Tuple[str, ...], _Group] = {}
+    for row in rows:
+        key = tuple(row[f] or "-" for f in group_by)
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = _Group()
+        g.count += 1
+        if row["status"] != "done":
+            g.errors += 1
+        at = row["at"]
+        if at is not None:
+            g.first = at if g.first is None or at < g.first else g.first
+            g.last = at if g.last is None or at > g.last else g.last
+        for name in ("exec_ms", "e2e_ms", "queue_wait_ms"):
+            if row[name] is not None:
+                getattr(g, name).append(row[name])
+        if row["attempts"] is not None:
+            g.attempts[row["attempts"]] = g.attempts.get(row["attempts"], 0) + 1
+        if row["usage"]:
+            g.with_usage += 1
+            for k, v in row["usage"].items():
+                if isinstance(v, int):
+                    g.usage[k] = g.usage.get(k, 0) + v
+
+    out: List[Dict[str, Any]] = []
+    for key, g in groups.items():
+        # Floor the span at an hour so a burst seconds apart doesn't extrapolate to thousands per hour.
+        span_h = max(1.0, (g.last - g.first) / 3600.0) if g.first is not None and g.last is not None else 0.0
+        out.append(
+            {
+                **dict(zip(group_by, key)),
+                "count": g.count,
+                "done": g.count - g.errors,
+                "error": g.errors,
+                "error_rate": round(g.errors / g.count, 4),
+                "per_hour": round(g.count / span_h, 2) if span_h > 0 and g.count >= 2 else None,
+                "exec_ms": _latency(g.exec_ms),
+                "e2e_ms": _latency(g.e2e_ms),
+                "queue_wait_ms": _latency(g.queue_wait_ms),
+                "attempts": {str(k): v for k, v in sorted(g.attempts.items())},
+                "usage": dict(sorted(g.usage.items())),
+                "usage_per_task": {k: round(v / g.with_usage, 1) for k, v in sorted(g.usage.items())} if g.with_usage else {},
+            }
+        )
+    out.sort(key=lambda g: (-g["count"], [str(g.get(f)) for f in group_by]))
+    return out
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def render_table(groups: List[Dict[str, Any]], group_by: Sequence[str], metric: str) -> str:
+    header = list(group_by) + [
+        "count",
+        "error",
+        "err%",
+        "per_h",
+        f"{metric}_p50",
+        f"{metric}_p95",
+        f"{metric}_p99",
+        "tok_in",
+        "tok_cached",
+        "tok_out",
+        "attempts",
+    ]
+    rows = [header]
+    for g in groups:
+        lat = g[metric]
+        rows.append(
+            [_cell(g.get(f)) for f in group_by]
+            + [
+                str(g["count"]),
+                str(g["error"]),
+                f"{g['error_rate'] * 100:.1f}",
+                _cell(g["per_hour"]),
+                _cell(lat["p50"]),
+                _cell(lat["p95"]),
+                _cell(lat["p99"]),
+                _cell(g["usage"].get("input_tokens")),
+                _cell(g["usage"].get("cached_input_tokens")),
+                _cell(g["usage"].get("output_tokens")),
+                " ".join(f"{k}:{v}" for k, v in g["attempts"].items()) or "-",
+            ]
+        )
+    widths = [max(len(r[i]) for r in rows) for i in range(len(header))]
+    return "\n".join("  ".join(c.ljust(w) for c, w in zip(r, widths)).rstrip() for r in rows)
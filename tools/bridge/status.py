@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Tuple
+
+from common import atomic_write_bytes, now_utc_iso
+from metrics import seconds_since
+
+STATUS_NAME = "router_status.json"
+RECENT_WINDOW_S = 900
+PRIORITY_RE = re.compile(r"^priority:\s*\"?([^\"\n]*)\"?\s*$", re.MULTILINE)
+TARGET_RE = re.compile(r"_to_([a-z]+)(?:_\d+)?\.work\.md$")
+
+
+def _publish_every() -> float:
+    try:
+        return max(0.2, float(os.environ.get("BRIDGE_STATUS_INTERVAL_S", "1")))
+    except ValueError:
+        return 1.0
+
+
+def peek_queue_fields(path: Path) -> Tuple[str, str]:
+    m = TARGET_RE.search(path.name)
+    target = m.group(1) if m else "unknown"
+    try:
+        with path.open("r", encoding="utf-8", errors="replace") as fh:
+            head = fh.read(2048)
+    except OSError:
+        return "unknown", target
+    p = PRIORITY_RE.search(head)
+    return (p.group(1).strip() or "unknown") if p else "unknown", target
+
+
+class StatusBoard:
+    """Router-side live state for `router.py top`, published as one small JSON file."""
+
+    def __init__(self) -> None:
+        self.path: Path | None = None
+        self._lock = threading.Lock()
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._waiting: Dict[str, Tuple[str, str]] = {}
+        self._recent: Deque[Tuple[float, str, str, str]] = deque()
+        self._info: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, state_dir: Path, mode: str, workers: int) -> None:
+        self.path = state_dir / STATUS_NAME
+        self._info = {"pid": os.getpid(), "mode": mode, "workers": workers, "started_at": now_utc_iso()}
+        self.publish()
+        # Events only mark changes; one heartbeat thread rewrites the file so a burst costs one write per interval.
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._heartbeat, name="bridge-status", daemon=True)
+        self._thread.start()
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(_publish_every()):
+            self.publish()
+
+    def tick(self, health: Dict[str, Any], claimed: int) -> None:
+        with self._lock:
+            self._info["tick_at"] = now_utc_iso()
+            self._info["health"] = {"ok": bool(health.get("ok", False)), "reason": health.get("reason", "")}
+            self._info["tick_claimed"] = claimed
+        self.publish()
+
+    def held(self, count: int) -> None:
+        with self._lock:
+            self._info["held"] = count
+
+    def queued(self, paths: List[Path]) -> None:
+        fields = [(p.name, peek_queue_fields(p)) for p in paths]
+        with self._lock:
+            self._waiting.update(fields)
+        self.publish()
+
+    def begin(self, name: str) -> None:
+        with self._lock:
+            self._waiting.pop(name, None)
+            self._active[name] = {"file": name, "started_at": time.time(), "attempt": 0}
+
+    def update(self, name: str, **fields: Any) -> None:
+        with self._lock:
+            entry = self._active.get(name)
+            if entry is not None:
+                entry.update(fields)
+
+    def end(self, name: str) -> None:
+        with self._lock:
+            self._active.pop(name, None)
+
+    def finished(self, target: str, status: str, error_code: str | None) -> None:
+        now = time.time()
+        with self._lock:
+            self._recent.append((now, target, status, error_code or ""))
+            while self._recent and self._recent[0][0] < now - RECENT_WINDOW_S:
+                self._recent.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            queue: Dict[str, Dict[str, int]] = {"priority": {}, "target": {}}
+            for priority, target in self._waiting.values():
+                queue["priority"][priority] = queue["priority"].get(priority, 0) + 1
+                queue["target"][target] = queue["target"].get(target, 0) + 1
+            recent = [r for r in self._recent if r[0] >= now - RECENT_WINDOW_S]
+            errors: Dict[str, int] = {}
+            for _, target, status, code in recent:
+                if status != "done":
+                    k = f"{target}:{code or 'unknown'}"
+                    errors[k] = errors.get(k, 0) + 1
+            return {
+                **self._info,
+                "updated_at": now_utc_iso(),
+                "active": sorted((dict(v) for v in self._active.values()), key=lambda e: e["started_at"]),
+                "waiting": len(self._waiting),
+                "queue": queue,
+                "recent": {
+                    "window_s": RECENT_WINDOW_S,
+                    "finished_1m": sum(1 for r in recent if r[0] >= now - 60),
+                    "finished_5m": sum(1 for r in recent if r[0] >= now - 300),
+                    "finished_15m": len(recent),
+                    "errors_15m": errors,
+                },
+            }
+
+    def publish(self) -> None:
+        path = self.path
+        if path is None:
+            return
+        # A live view file is rewritten every second; losing the last one on power loss is fine, so skip fsync.
+        atomic_write_bytes(path, json.dumps(self.snapshot(), ensure_ascii=False).encode("utf-8"), mode="off")
+
+    def stop(self) -> None:
+        if self.path is None:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            self._info["stopped_at"] = now_utc_iso()
+            self._active.clear()
+            self._waiting.clear()
+            self._info.pop("held", None)
+        self.publish()
+        self.path = None
+
+
+STATUS = StatusBoard()
+
+
+def _pid_alive(pid: object) -> bool:
+    try:
+        os.kill(int(pid), 0)  # type: ignore[arg-type]
+    except (TypeError, ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _fmt_counts(counts: Dict[str, int]) -> str:
+    if not counts:
+        return "-"
+    return " ".join(f"{k}={v}" for k, v in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+
+
+def _fmt_dur(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def render_status(status: Dict[str, Any], width: int = 100) -> str:
+    if not status:
+        return "router_status.json 없음: 라우터가 아직 상태를 게시하지 않았다."
+    now = time.time()
+    alive = _pid_alive(status.get("pid")) and not status.get("stopped_at")
+    age = seconds_since(status.get("updated_at"))
+    health = status.get("health") or {}
+    recent = status.get("recent") or {}
+    queue = status.get("queue") or {}
+    lines = [
+        f"bridge top  pid={status.get('pid')} {'running' if alive else 'STOPPED'} mode={status.get('mode')} "
+        f"workers={status.get('workers')} updated={_fmt_dur(age or 0)} ago",
+        "health: ok" if health.get("ok") else f"health: BLOCKED {health.get('reason') or ''}".rstrip(),
+        f"queue: claimed_last_tick={status.get('tick_claimed', 0)} waiting={status.get('waiting', 0)} "
+        f"held={status.get('held', 0)} "
+        f"priority[{_fmt_counts(queue.get('priority') or {})}] target[{_fmt_counts(queue.get('target') or {})}]",
+        f"finished: 1m={recent.get('finished_1m', 0)} 5m={recent.get('finished_5m', 0)} 15m={recent.get('finished_15m', 0)} "
+        f"({recent.get('finished_5m', 0) / 5:.1f}/min)",
+        f"errors 15m: {_fmt_counts(recent.get('errors_15m') or {})}",
+        "",
+        f"{'RUNNING':>8}  {'TARGET':<7} {'ATT':>3}  {'ASSIGN':<8} {'THREAD::TASK':<32} FILE",
+    ]
+    active = status.get("active") or []
+    for entry in active:
+        key = f"{entry.get('thread_id', '?')}::{entry.get('task_id', '?')}"
+        row = (
+            f"{_fmt_dur(now - float(entry.get('started_at') or now)):>8}  {str(entry.get('target', '?')):<7} "
+            f"{entry.get('attempt', 0):>3}  {str(entry.get('assign', '')):<8} {key:<32} {entry.get('file', '')}"
+        )
+        lines.append(row[:width])
+    if not active:
+        lines.append("(idle)")
+    return "\n".join(lines)
+
+
+def read_status(state_dir: Path) -> Dict[str, Any]:
+    # Read-only viewer: unlike load_json, never quarantine the file the router is rewriting.
+    try:
+        data = json.loads((state_dir / STATUS_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
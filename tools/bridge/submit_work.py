@@ -2,23 +2,30 @@
 from __future__ import annotations
 
 import argparse
+import fcntl
+import json
 import subprocess
 import sys
 import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Iterator, List, Set, Tuple
 
 from common import (
+    ALLOWED_TARGET_AGENTS,
+    META_CACHE,
+    atomic_write_many,
     ensure_dir,
+    is_auto,
     load_json,
     now_utc_iso,
     now_utc_stamp,
-    parse_frontmatter,
     read_text,
     render_markdown,
     save_json,
-    write_text,
+    validate_work_meta,
 )
+from layout import LOCATOR_RE, iter_docs, lookup_outputs, read_locator
 
 
 def repo_root_from_here() -> Path:
@@ -46,13 +53,29 @@ def ensure_layout(root: Path) -> Dict[str, Path]:
     return dirs
 
 
-def next_task_id(state_path: Path, thread_id: str) -> str:
+@contextmanager
+def submit_lock(dirs: Dict[str, Path]) -> Iterator[None]:
+    # Serialises submit_state.json updates and inbox name picks across concurrent submitters.
+    with (dirs["locks"] / "submit.lock").open("a+") as fh:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def allocate_task_ids(state_path: Path, wanted: Dict[str, int]) -> Dict[str, List[str]]:
+    """Reserve `wanted[thread]` consecutive ids per thread with one read and one write of the state file."""
     state = load_json(state_path, default={"thread_counters": {}})
     counters = state.setdefault("thread_counters", {})
-    current = int(counters.get(thread_id, 0)) + 1
-    counters[thread_id] = current
-    save_json(state_path, state)
-    return f"{current:04d}"
+    out: Dict[str, List[str]] = {}
+    for thread_id, n in wanted.items():
+        current = int(counters.get(thread_id, 0))
+        out[thread_id] = [f"{current + i:04d}" for i in range(1, n + 1)]
+        counters[thread_id] = current + n
+    if any(wanted.values()):
+        save_json(state_path, state)
+    return out
 
 
 def build_body(target: str, text: str, notes: str | None) -> str:
@@ -78,30 +101,182 @@ def build_body(target: str, text: str, notes: str | None) -> str:
     return "\n".join(lines) + "\n"
 
 
-def unique_inbox_path(inbox: Path, thread_id: str, task_id: str, target: str) -> Path:
+def unique_inbox_path(
+    inbox: Path,
+    thread_id: str,
+    task_id: str,
+    target: str,
+    taken: Set[Path] | None = None,
+) -> Path:
     stamp = now_utc_stamp()
+    taken = taken if taken is not None else set()
     candidate = inbox / f"{stamp}_{thread_id}_{task_id}_to_{target}.work.md"
-    if not candidate.exists():
+    if candidate not in taken and not candidate.exists():
         return candidate
     for i in range(1, 1000):
         c = inbox / f"{stamp}_{thread_id}_{task_id}_{i:03d}_to_{target}.work.md"
-        if not c.exists():
+        if c not in taken and not c.exists():
             return c
     raise RuntimeError("unable to allocate work file path")
 
 
-def read_meta(path: Path) -> Dict[str, Any]:
-    meta, _ = parse_frontmatter(read_text(path))
+def limit_value(value: object) -> int | str:
+    """timeout_s / max_retries value: a number, or `auto` for the router to tune from history."""
+    return "auto" if is_auto(value) else int(str(value))
+
+
+def build_work_meta(
+    thread_id: str,
+    task_id: str,
+    to: str,
+    assign: str = "",
+    priority: str = "high",
+    timeout_s: int | str = 240,
+    max_retries: int | str = 3,
+    response_lang: str = "ko",
+    codex_assign: str = "",
+    codex_timeout_s: int | str = 0,
+    codex_max_retries: int | str = 0,
+) -> Dict[str, Any]:
+    meta: Dict[str, Any] = {
+        "kind": "work",
+        "thread_id": thread_id,
+        "task_id": task_id,
+        "from": "human",
+        "to": to,
+        "assign": assign or ("@직원1" if to == "gemini" else "@직원2"),
+        "priority": priority,
+        "status": "new",
+        "timeout_s": limit_value(timeout_s),
+        "max_retries": limit_value(max_retries),
+        "response_lang": response_lang,
+        "created_at": now_utc_iso(),
+    }
+    if to == "gemini":
+        meta["codex_assign"] = codex_assign or "@직원2"
+        for key, value in (("codex_timeout_s", codex_timeout_s), ("codex_max_retries", codex_max_retries)):
+            value = limit_value(value)
+            if value == "auto" or value > 0:
+                meta[key] = value
     return meta
 
 
+# Plan task keys consumed by build_work_meta/build_body; any other scalar key is copied into the frontmatter.
+PLAN_META_ARGS = (
+    "assign",
+    "priority",
+    "timeout_s",
+    "max_retries",
+    "response_lang",
+    "codex_assign",
+    "codex_timeout_s",
+    "codex_max_retries",
+)
+PLAN_RESERVED = {"tasks", "to", "thread_id", "task_id", "text", "text_file", "notes", *PLAN_META_ARGS}
+
+
+def plan_items(plan: Dict[str, Any], base_dir: Path) -> List[Tuple[Dict[str, Any], str]]:
+    """Resolve a wave plan into (meta, body) pairs; task ids missing from the plan are left empty."""
+    tasks = plan.get("tasks")
+    if not isinstance(tasks, list) or not tasks:
+        raise ValueError("plan has no tasks")
+    # Top-level keys other than `tasks` are defaults for every task.
+    defaults = {k: v for k, v in plan.items() if k != "tasks"}
+    items: List[Tuple[Dict[str, Any], str]] = []
+    errors: List[str] = []
+    seen: Set[str] = set()
+    for i, raw in enumerate(tasks):
+        if not isinstance(raw, dict):
+            errors.append(f"task[{i}]:not_an_object")
+            continue
+        task = {**defaults, **raw}
+        to = str(task.get("to") or "gemini").strip().lower()
+        if to not in ALLOWED_TARGET_AGENTS:
+            errors.append(f"task[{i}]:invalid_to:{to}")
+            continue
+        text = str(task.get("text") or "").strip()
+        if task.get("text_file"):
+            text = read_text(base_dir / str(task["text_file"])).strip()
+        if not text:
+            errors.append(f"task[{i}]:empty_text")
+            continue
+        thread_id = str(task.get("thread_id") or "manual").strip()
+        task_id = str(task.get("task_id") or "").strip()
+        kwargs = {k: task[k] for k in PLAN_META_ARGS if task.get(k) not in (None, "")}
+        try:
+            meta = build_work_meta(thread_id, task_id, to, **kwargs)
+        except (TypeError, ValueError) as exc:
+            errors.append(f"task[{i}]:{exc}")
+            continue
+        meta.update({k: v for k, v in task.items() if k not in PLAN_RESERVED and not isinstance(v, (dict, list))})
+        if isinstance(task.get("depends_on"), list):
+            meta["depends_on"] = ",".join(str(d) for d in task["depends_on"])
+        problems = validate_work_meta({**meta, "task_id": task_id or "0"})
+        if problems:
+            errors.append(f"task[{i}]:{','.join(problems)}")
+            continue
+        if task_id:
+            key = f"{thread_id}::{task_id}::{to}"
+            if key in seen:
+                errors.append(f"task[{i}]:duplicate:{key}")
+                continue
+            seen.add(key)
+        items.append((meta, build_body(to, text, str(task.get("notes") or "") or None)))
+    if errors:
+        raise ValueError("; ".join(errors))
+    return items
+
+
+def submit_items(dirs: Dict[str, Path], items: List[Tuple[Dict[str, Any], str]]) -> List[Tuple[Dict[str, Any], Path]]:
+    """Allocate ids and write every work file in one locked transaction."""
+    wanted: Dict[str, int] = {}
+    for meta, _ in items:
+        if not meta["task_id"]:
+            wanted[meta["thread_id"]] = wanted.get(meta["thread_id"], 0) + 1
+    with submit_lock(dirs):
+        ids = allocate_task_ids(dirs["state"] / "submit_state.json", wanted)
+        taken: Set[Path] = set()
+        out: List[Tuple[Dict[str, Any], Path]] = []
+        for meta, body in items:
+            if not meta["task_id"]:
+                meta["task_id"] = ids[meta["thread_id"]].pop(0)
+            path = unique_inbox_path(dirs["inbox"], meta["thread_id"], meta["task_id"], meta["to"], taken)
+            taken.add(path)
+            out.append((meta, path))
+        atomic_write_many(
+            [(path, render_markdown(meta, body).encode("utf-8")) for (meta, path), (_, body) in zip(out, items)]
+        )
+    return out
+
+
+def submit_plan(dirs: Dict[str, Path], plan_path: Path) -> List[Tuple[Dict[str, Any], Path]]:
+    plan = json.loads(read_text(plan_path))
+    if not isinstance(plan, dict):
+        raise ValueError("plan must be a JSON object")
+    return submit_items(dirs, plan_items(plan, plan_path.parent))
+
+
+def read_meta(path: Path) -> Dict[str, Any]:
+    return META_CACHE.get(path)
+
+
 def find_result(
     dirs: Dict[str, Path],
     thread_id: str,
     task_id: str,
     expected_actor: str,
 ) -> Tuple[str, Path] | None:
-    for p in sorted(dirs["done"].glob("*.result.md"), reverse=True):
+    for rec in lookup_outputs(dirs["state"], thread_id, task_id):
+        output = Path(str(rec.get("output") or ""))
+        if rec.get("target") != expected_actor:
+            continue
+        # Packed docs are recorded as `<segment>@<offset>+<length>`; see read_output.
+        if not output.is_file() and not LOCATOR_RE.match(str(output)):
+            continue
+        status = "done" if rec.get("status") == "done" else "error"
+        return (status, output)
+
+    for p in sorted(iter_docs(dirs["done"], "*.result.md", thread_id), key=lambda x: x.name, reverse=True):
         try:
             meta = read_meta(p)
         except Exception:
@@ -111,7 +286,7 @@ def find_result(
             if actor == expected_actor:
                 return ("done", p)
 
-    for p in sorted(dirs["error"].glob("*.error.md"), reverse=True):
+    for p in sorted(iter_docs(dirs["error"], "*.error.md", thread_id), key=lambda x: x.name, reverse=True):
         try:
             meta = read_meta(p)
         except Exception:
@@ -123,6 +298,11 @@ def find_result(
     return None
 
 
+def read_output(path: Path) -> str:
+    data = read_locator(path)
+    return read_text(path) if data is None else data.decode("utf-8", errors="replace")
+
+
 def run_router_once(repo_root: Path, workers: int) -> int:
     cmd = [
         sys.executable,
@@ -139,6 +319,50 @@ def run_router_once(repo_root: Path, workers: int) -> int:
     return proc.returncode
 
 
+def plan_main(args: argparse.Namespace, repo_root: Path, dirs: Dict[str, Path]) -> int:
+    started = time.monotonic()
+    try:
+        submitted = submit_plan(dirs, Path(args.plan))
+    except (OSError, ValueError) as exc:
+        print(f"[error] plan rejected: {exc}", file=sys.stderr)
+        return 2
+    for _, path in submitted:
+        print(f"[submit] created={path}")
+    print(f"[submit] plan={args.plan} tasks={len(submitted)} elapsed_ms={int((time.monotonic() - started) * 1000)}")
+
+    if args.run_once:
+        ticks = args.ticks if args.ticks > 0 else (2 if any(m["to"] == "gemini" for m, _ in submitted) else 1)
+        for i in range(ticks):
+            rc = run_router_once(repo_root, workers=max(1, args.workers))
+            if rc != 0:
+                print(f"[run-once] non_zero={rc} tick={i+1}/{ticks}", file=sys.stderr)
+                return rc
+
+    if args.wait:
+        pending = {
+            (str(m["thread_id"]), str(m["task_id"])): ("codex" if m["to"] == "gemini" else str(m["to"]))
+            for m, _ in submitted
+        }
+        failed = 0
+        start = time.time()
+        while pending and time.time() - start <= max(1, args.wait_timeout):
+            for (thread_id, task_id), actor in list(pending.items()):
+                found = find_result(dirs, thread_id, task_id, actor)
+                if found is None:
+                    continue
+                status, path = found
+                failed += status != "done"
+                print(f"[result] status={status} actor={actor} task={thread_id}::{task_id} path={path}")
+                del pending[(thread_id, task_id)]
+            if pending:
+                time.sleep(1)
+        if pending:
+            print(f"[result] timeout waiting for {len(pending)} task(s)", file=sys.stderr)
+            return 124
+        return 1 if failed else 0
+    return 0
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Submit a bridge work item for real usage flow.")
     parser.add_argument("text", nargs="*", help="지시문. 비워두면 --text-file 또는 stdin 사용")
@@ -147,14 +371,15 @@ def main() -> int:
     parser.add_argument("--task-id", default="")
     parser.add_argument("--assign", default="")
     parser.add_argument("--codex-assign", default="", help="to=gemini일 때 후속 codex assign")
-    parser.add_argument("--codex-timeout-s", type=int, default=0, help="to=gemini일 때 후속 codex timeout_s")
-    parser.add_argument("--codex-max-retries", type=int, default=0, help="to=gemini일 때 후속 codex max_retries")
+    parser.add_argument("--codex-timeout-s", type=limit_value, default=0, help="to=gemini일 때 후속 codex timeout_s (auto 가능)")
+    parser.add_argument("--codex-max-retries", type=limit_value, default=0, help="to=gemini일 때 후속 codex max_retries (auto 가능)")
     parser.add_argument("--priority", default="high")
-    parser.add_argument("--timeout-s", type=int, default=240)
-    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--timeout-s", type=limit_value, default=240, help="초 단위 또는 auto (이력 기반)")
+    parser.add_argument("--max-retries", type=limit_value, default=3, help="횟수 또는 auto (이력 기반)")
     parser.add_argument("--response-lang", choices=("ko", "en"), default="ko")
     parser.add_argument("--notes", default="")
     parser.add_argument("--text-file", default="")
+    parser.add_argument("--plan", default="", help="wave plan JSON: 모든 task를 한 번에 제출")
     parser.add_argument("--run-once", action="store_true", help="생성 직후 router run-once 실행")
     parser.add_argument("--ticks", type=int, default=0, help="run-once 반복 횟수 (0이면 to별 기본값)")
     parser.add_argument("--workers", type=int, default=2)
@@ -164,6 +389,8 @@ def main() -> int:
 
     repo_root = repo_root_from_here()
     dirs = ensure_layout(repo_root)
+    if args.plan:
+        return plan_main(args, repo_root, dirs)
 
     text = " ".join(args.text).strip()
     if args.text_file:
@@ -176,39 +403,22 @@ def main() -> int:
         return 2
 
     thread_id = args.thread_id.strip() or "manual"
-    if args.task_id.strip():
-        task_id = args.task_id.strip()
-    else:
-        task_id = next_task_id(dirs["state"] / "submit_state.json", thread_id)
-
-    assign = args.assign.strip()
-    if not assign:
-        assign = "@직원1" if args.to == "gemini" else "@직원2"
-
-    meta = {
-        "kind": "work",
-        "thread_id": thread_id,
-        "task_id": task_id,
-        "from": "human",
-        "to": args.to,
-        "assign": assign,
-        "priority": args.priority,
-        "status": "new",
-        "timeout_s": int(args.timeout_s),
-        "max_retries": int(args.max_retries),
-        "response_lang": args.response_lang,
-        "created_at": now_utc_iso(),
-    }
-    if args.to == "gemini":
-        meta["codex_assign"] = args.codex_assign.strip() or "@직원2"
-        if args.codex_timeout_s > 0:
-            meta["codex_timeout_s"] = int(args.codex_timeout_s)
-        if args.codex_max_retries > 0:
-            meta["codex_max_retries"] = int(args.codex_max_retries)
-
+    meta = build_work_meta(
+        thread_id,
+        args.task_id.strip(),
+        args.to,
+        assign=args.assign.strip(),
+        priority=args.priority,
+        timeout_s=args.timeout_s,
+        max_retries=args.max_retries,
+        response_lang=args.response_lang,
+        codex_assign=args.codex_assign.strip(),
+        codex_timeout_s=args.codex_timeout_s,
+        codex_max_retries=args.codex_max_retries,
+    )
     body = build_body(args.to, text, args.notes or None)
-    work_path = unique_inbox_path(dirs["inbox"], thread_id, task_id, args.to)
-    write_text(work_path, render_markdown(meta, body))
+    [(meta, work_path)] = submit_items(dirs, [(meta, body)])
+    task_id = str(meta["task_id"])
     print(f"[submit] created={work_path}")
 
     ticks = args.ticks
@@ -230,7 +440,7 @@ def main() -> int:
             if found is not None:
                 status, path = found
                 print(f"[result] status={status} actor={expected_actor} path={path}")
-                print(read_text(path))
+                print(read_output(path))
                 return 0 if status == "done" else 1
             time.sleep(1)
         print("[result] timeout waiting for final result", file=sys.stderr)
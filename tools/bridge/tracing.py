@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, ContextManager, Dict, Iterator, List, Tuple
+
+from common import ensure_dir, now_utc_stamp
+
+ATTEMPT_LOG_RE = re.compile(r"^(?P<stem>.+)\.attempt(?P<n>\d+)\.(?P<target>[a-z]+)\.stdout\.log(?:\.gz)?$")
+
+
+def _us(seconds: float) -> int:
+    return int(seconds * 1_000_000)
+
+
+class TraceRecorder:
+    """Streams Chrome Trace Event JSON for one router session; disabled recorders cost a None check."""
+
+    def __init__(self) -> None:
+        self.path: Path | None = None
+        self._fh: IO[str] | None = None
+        self._lock = threading.Lock()
+        self._slots: Dict[int, int] = {}
+        self._first = True
+
+    @property
+    def enabled(self) -> bool:
+        return self._fh is not None
+
+    def start(self, traces_dir: Path) -> Path:
+        ensure_dir(traces_dir)
+        self.path = traces_dir / f"{now_utc_stamp()}_{os.getpid()}.trace.json"
+        # The JSON array form may be left unterminated; Perfetto and chrome://tracing accept that after a crash.
+        self._fh = self.path.open("w", encoding="utf-8")
+        self._fh.write("[\n")
+        self._emit({"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "bridge-router"}})
+        return self.path
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._fh is None:
+                return
+            self._fh.write("\n]\n")
+            self._fh.close()
+            self._fh = None
+
+    def _slot(self) -> int:
+        ident = threading.get_ident()
+        slot = self._slots.get(ident)
+        if slot is None:
+            slot = len(self._slots)
+            self._slots[ident] = slot
+            name = "router" if threading.current_thread() is threading.main_thread() else f"worker-{slot}"
+            self._emit_locked({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": slot, "args": {"name": name}})
+        return slot
+
+    def _emit_locked(self, event: Dict[str, Any]) -> None:
+        if self._fh is None:
+            return
+        if not self._first:
+            self._fh.write(",\n")
+        self._first = False
+        self._fh.write(json.dumps(event, ensure_ascii=False))
+        self._fh.flush()
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self._emit_locked(event)
+
+    def complete(self, name: str, cat: str, start: float, dur_s: float, args: Dict[str, Any] | None = None) -> None:
+        if self._fh is None:
+            return
+        with self._lock:
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": _us(start),
+                "dur": max(1, _us(dur_s)),
+                "pid": os.getpid(),
+                "tid": self._slot(),
+            }
+            if args:
+                event["args"] = args
+            self._emit_locked(event)
+
+    def instant(self, name: str, cat: str, args: Dict[str, Any] | None = None) -> None:
+        if self._fh is None:
+            return
+        with self._lock:
+            event = {"name": name, "cat": cat, "ph": "i", "s": "t", "ts": _us(time.time()), "pid": os.getpid(), "tid": self._slot()}
+            if args:
+                event["args"] = args
+            self._emit_locked(event)
+
+    @contextmanager
+    def _span(self, name: str, cat: str, args: Dict[str, Any] | None) -> Iterator[None]:
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.complete(name, cat, start, time.time() - start, args)
+
+    def span(self, name: str, cat: str = "bridge", **args: Any) -> ContextManager[None]:
+        if self._fh is None:
+            return nullcontext()
+        return self._span(name, cat, args or None)
+
+    def stage_listener(self, **args: Any) -> Any:
+        if self._fh is None:
+            return None
+
+        def on_stage(name: str, start: float, dur_s: float) -> None:
+            self.complete(name, "stage", start, dur_s, args or None)
+
+        return on_stage
+
+
+TRACER = TraceRecorder()
+
+
+def _epoch(iso: object) -> float | None:
+    try:
+        dt = datetime.fromisoformat(str(iso))
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _attempt_log_times(logs_dir: Path) -> Dict[str, List[Tuple[int, str, float]]]:
+    found: Dict[str, List[Tuple[int, str, float]]] = {}
+    for dirpath, _, filenames in os.walk(logs_dir):
+        for name in filenames:
+            m = ATTEMPT_LOG_RE.match(name)
+            if not m:
+                continue
+            try:
+                mtime = os.stat(os.path.join(dirpath, name)).st_mtime
+            except OSError:
+                continue
+            found.setdefault(m.group("stem"), []).append((int(m.group("n")), m.group("target"), mtime))
+    return found
+
+
+def rebuild_from_index(
+    idx: Dict[str, Any],
+    logs_dir: Path | None = None,
+    since: float | None = None,
+    thread_id: str | None = None,
+) -> List[Dict[str, Any]]:
+    rows: List[Tuple[float, float, str, Dict[str, Any]]] = []
+    for key, rec in idx.get("processed", {}).items():
+        if not isinstance(rec, dict):
+            continue
+        if thread_id is not None and not key.startswith(f"{thread_id}::"):
+            continue
+        end = _epoch(rec.get("at"))
+        start = _epoch(rec.get("picked_at"))
+        if end is None or start is None:
+            continue
+        if since is not None and end < since:
+            continue
+        rows.append((start, end, key, rec))
+    rows.sort()
+
+    attempt_times = _attempt_log_times(logs_dir) if logs_dir is not None and logs_dir.is_dir() else {}
+    events: List[Dict[str, Any]] = [
+        {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "workers (rebuilt)"}},
+        {"name": "process_name", "ph": "M", "pid": 2, "args": {"name": "queue wait"}},
+    ]
+    # Greedy interval partitioning: each lane is one busy worker slot, so lane count equals peak concurrency.
+    lanes: List[Tuple[float, int]] = []
+    queue_lanes: List[Tuple[float, int]] = []
+    lane_count = 0
+    queue_lane_count = 0
+    for start, end, key, rec in rows:
+        if lanes and lanes[0][0] <= start:
+            _, lane = heapq.heappop(lanes)
+        else:
+            lane = lane_count
+            lane_count += 1
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": lane, "args": {"name": f"slot-{lane}"}})
+        heapq.heappush(lanes, (end, lane))
+
+        args = {
+            "key": key,
+            "status": rec.get("status"),
+            "error_code": rec.get("error_code"),
+            "attempts": rec.get("attempts"),
+            "exec_ms": rec.get("exec_ms"),
+        }
+        events.append(
+            {
+                "name": key,
+                "cat": str(rec.get("actor") or "task"),
+                "ph": "X",
+                "ts": _us(start),
+                "dur": max(1, _us(end - start)),
+                "pid": 1,
+                "tid": lane,
+                "args": {k: v for k, v in args.items() if v is not None},
+            }
+        )
+
+        # Stage offsets are reconstructed back-to-back from pick-up; their order is the recorded order.
+        cursor = start
+        for stage, ms in (rec.get("stages_ms") or {}).items():
+            if stage == "claim_wait" or not ms:
+                continue
+            events.append(
+                {"name": stage, "cat": "stage", "ph": "X", "ts": _us(cursor), "dur": max(1, int(ms) * 1000), "pid": 1, "tid": lane}
+            )
+            cursor += int(ms) / 1000.0
+
+        stem = Path(str(rec.get("source") or "")).stem
+        for n, target, mtime in sorted(attempt_times.get(stem, [])):
+            events.append(
+                {"name": f"attempt{n} end", "cat": target, "ph": "i", "s": "t", "ts": _us(mtime), "pid": 1, "tid": lane}
+            )
+
+        created = _epoch(rec.get("created_at"))
+        if created is not None and created < start:
+            if queue_lanes and queue_lanes[0][0] <= created:
+                _, qlane = heapq.heappop(queue_lanes)
+            else:
+                qlane = queue_lane_count
+                queue_lane_count += 1
+            heapq.heappush(queue_lanes, (start, qlane))
+            events.append(
+                {"name": key, "cat": "queue", "ph": "X", "ts": _us(created), "dur": max(1, _us(start - created)), "pid": 2, "tid": qlane}
+            )
+    return events